@@ -10,6 +10,5 @@
 
 # END HEADER
 
-
 def load():
     pass
@@ -20,10 +20,11 @@ import numpy as np
 from hypothesis import strategy
 from hypothesis.specifiers import integers_in_range
 from hypothesis.searchstrategy import SearchStrategy
+from hypothesis.internal.ddmin import chunk_simplifier
 from hypothesis.internal.compat import hrange, reduce, text_type, \
     binary_type
 from hypothesis.searchstrategy.strategies import check_length, \
-    check_data_type
+    check_data_type, simplicity_ranks
 
 ArrayDescription = namedtuple('ArrayDescription', ('dtype', 'shape'))
 
@@ -76,6 +77,10 @@ class ArrayStrategy(SearchStrategy):
     def simplifiers(self, random, template):
         assert isinstance(template, tuple)
         yield self.simplify_with_example_cloning
+        # Arrays have a fixed shape so we can't delete elements, but we can
+        # narrow down which of them matter in the same way, by replacing
+        # blocks of them with the simplest element.
+        yield self.chunk_cloning_simplifier()
         yield self.shared_simplification(self.element_strategy.full_simplify)
 
         for i in self.indices_roughly_from_worst_to_best(random, template):
@@ -103,55 +108,60 @@ class ArrayStrategy(SearchStrategy):
                 return False
         return False
 
+    def simplicity_key(self, template):
+        return tuple(map(self.element_strategy.simplicity_key, template))
+
+    def chunk_cloning_simplifier(self):
+        # The last template we found the simplest element of, and that
+        # element, as a pass over a template asks for every chunk of it.
+        # This lives in the closure rather than on the strategy, which is
+        # shared between every simplification that uses it.
+        last_simplest = [None, None]
+
+        def clone_simplest_into_chunk(x, start, end):
+            if last_simplest[0] is not x:
+                last_simplest[:] = [
+                    x, min(x, key=self.element_strategy.simplicity_key)]
+            chunk = (last_simplest[1],) * (end - start)
+            if x[start:end] == chunk:
+                return x
+            return x[:start] + chunk + x[end:]
+        return chunk_simplifier(
+            len, clone_simplest_into_chunk, name='clone_chunks')
+
     def simplify_with_example_cloning(self, random, x):
         assert isinstance(x, tuple)
         if len(x) <= 1:
             return
 
-        best = x[0]
-        any_shrinks = False
-        for t in x:
-            if self.element_strategy.strictly_simpler(
-                t, best
-            ):
-                any_shrinks = True
-                best = t
-            if not any_shrinks:
-                any_shrinks = self.element_strategy.strictly_simpler(best, t)
-
-        if any_shrinks:
-            yield (best,) * len(x)
+        ranks = simplicity_ranks(self.element_strategy, x)
+        if max(ranks) > 0:
+            yield (x[ranks.index(0)],) * len(x)
 
         for _ in hrange(20):
             result = list(x)
-            pivot = random.choice(x)
+            pivot = random.randint(0, len(x) - 1)
             for _ in hrange(10):
-                new_pivot = random.choice(x)
-                if self.element_strategy.strictly_simpler(new_pivot, pivot):
+                new_pivot = random.randint(0, len(x) - 1)
+                if ranks[new_pivot] < ranks[pivot]:
                     pivot = new_pivot
             indices = [
                 j for j in hrange(len(x))
-                if self.element_strategy.strictly_simpler(pivot, x[j])]
+                if ranks[pivot] < ranks[j]]
             if not indices:
                 break
-            random.shuffle(indices)
-            indices = indices[:random.randint(1, len(x) - 1)]
+            indices = random.sample(
+                indices, min(len(indices), random.randint(1, len(x) - 1)))
             for j in indices:
-                result[j] = pivot
+                result[j] = x[pivot]
             yield tuple(result)
 
     def indices_roughly_from_worst_to_best(self, random, x):
-        pivot = random.choice(x)
-        bad = []
-        good = []
-        y = list(hrange(len(x)))
-        random.shuffle(y)
-        for t in y:
-            if self.element_strategy.strictly_simpler(x[t], pivot):
-                good.append(t)
-            else:
-                bad.append(t)
-        return bad + good
+        ranks = simplicity_ranks(self.element_strategy, x)
+        indices = list(hrange(len(x)))
+        random.shuffle(indices)
+        indices.sort(key=ranks.__getitem__, reverse=True)
+        return indices
 
     def shared_indices(self, random, template):
         same_valued_indices = {}
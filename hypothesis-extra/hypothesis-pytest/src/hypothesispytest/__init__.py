@@ -13,6 +13,47 @@
 import pytest
 
 
+def pytest_addoption(parser):
+    group = parser.getgroup('hypothesis', 'Hypothesis')
+    group.addoption(
+        '--hypothesis-used-keys',
+        action='store',
+        metavar='PATH',
+        help=(
+            'Write the database keys that tests used to PATH at the end of '
+            'the run, for python -m hypothesis.database.corpus prune.'
+        ),
+    )
+    group.addoption(
+        '--hypothesis-replay-only',
+        action='store_true',
+        help=(
+            'Only replay the examples saved in the database for each test, '
+            'without generating new ones. Sets the replay_only setting.'
+        ),
+    )
+
+
+def pytest_configure(config):
+    if config.getoption('hypothesis_replay_only'):
+        from hypothesis.settings import Settings
+        Settings.default.replay_only = True
+
+
+def pytest_sessionfinish(session):
+    path = session.config.getoption('hypothesis_used_keys')
+    if path is None:
+        return
+    from hypothesis.settings import Settings, databases
+    from hypothesis.database.corpus import write_keys
+    used = set()
+    for database in list(databases.values()) + [Settings.default.database]:
+        if database is not None:
+            used.update(database.used_keys)
+    with open(path, 'wb') as stream:
+        write_keys(stream, used)
+
+
 class StoringReporter(object):
 
     def __init__(self):
@@ -0,0 +1,57 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+from hypothesis.settings import Settings
+from hypothesis.database.keys import database_key
+
+pytest_plugins = str('pytester')
+
+
+TESTSUITE = """
+from hypothesis import given
+
+@given(int)
+def test_ints(x):
+    pass
+
+@given([bool])
+def test_lists_of_bools(xs):
+    pass
+"""
+
+
+def test_writes_the_keys_tests_used(testdir):
+    script = testdir.makepyfile(TESTSUITE)
+    keys = testdir.tmpdir.join('keys')
+    result = testdir.runpytest(script, '--hypothesis-used-keys', str(keys))
+    assert result.ret == 0
+    written = keys.read().splitlines()
+    assert database_key(((), {'x': int})) in written
+    assert database_key(((), {'xs': [bool]})) in written
+
+
+FAILING_TESTSUITE = """
+from hypothesis import given
+
+@given(int)
+def test_fails(x):
+    assert False
+"""
+
+
+def test_replay_only_does_not_generate_examples(testdir):
+    script = testdir.makepyfile(FAILING_TESTSUITE)
+    try:
+        result = testdir.runpytest(script, '--hypothesis-replay-only')
+    finally:
+        Settings.default.replay_only = False
+    assert result.ret == 0
@@ -1,6 +1,3 @@
-from __future__ import division, print_function, absolute_import, \
-    unicode_literals
-
 # coding=utf-8
 
 # Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
@@ -0,0 +1,70 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+"""Compare the time taken to produce and reify templates with and without
+compiling the strategy first.
+
+Run with python misc/benchmark_compiler.py
+
+"""
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+import time
+from random import Random
+
+from hypothesis import Settings, strategy
+from hypothesis.internal.compat import text_type
+from hypothesis.searchstrategy.compiler import compile_strategy
+from hypothesis.searchstrategy.strategies import BuildContext
+
+SPECIFIERS = [
+    [(int, float, text_type)],
+    [(bool, int)],
+    [[bool]],
+    ([int], {bool}, text_type),
+    {'a': [int], 'b': (bool, float)},
+]
+
+PARAMETERS = 50
+RUNS = 20
+REPEATS = 5
+
+
+def best_time(strategy, produce_template, reify):
+    parameters = [
+        strategy.draw_parameter(Random(i)) for i in range(PARAMETERS)]
+    best = float('inf')
+    for _ in range(REPEATS):
+        random = Random(0)
+        start = time.time()
+        for _ in range(RUNS):
+            for parameter in parameters:
+                reify(produce_template(BuildContext(random), parameter))
+        best = min(best, time.time() - start)
+    return best
+
+
+def main():
+    settings = Settings(average_list_length=25.0)
+    for specifier in SPECIFIERS:
+        strat = strategy(specifier, settings)
+        compiled = compile_strategy(strat)
+        generic = best_time(strat, strat.produce_template, strat.reify)
+        fast = best_time(strat, compiled.produce_template, compiled.reify)
+        print('%-50r generic %.3fs compiled %.3fs (%.1fx)' % (
+            specifier, generic, fast, generic / fast))
+
+
+if __name__ == '__main__':
+    main()
@@ -20,9 +20,9 @@ import inspect
 import functools
 import traceback
 from random import Random
+from contextlib import contextmanager
 from collections import namedtuple
 
-from hypothesis.extra import load_entry_points
 from hypothesis.errors import Flaky, Timeout, NoSuchExample, \
     Unsatisfiable, InvalidArgument, UnsatisfiedAssumption, \
     DefinitelyNoSuchExample
@@ -32,11 +32,17 @@ from hypothesis.executors import executor
 from hypothesis.reporting import report, debug_report, verbose_report, \
     current_verbosity
 from hypothesis.specifiers import just
+from hypothesis.statistics import NoStatistics, new_run_statistics
 from hypothesis.utils.show import show
+from hypothesis.internal.compat import hrange
 from hypothesis.internal.tracker import Tracker
+from hypothesis.internal.parallel import Worker, can_fork, ForkedCall, \
+    as_completed
 from hypothesis.internal.reflection import arg_string, copy_argspec, \
     function_digest, get_pretty_function_description
-from hypothesis.internal.examplesource import ParameterSource
+from hypothesis.internal.examplesource import new_parameter_source
+from hypothesis.internal.simplifierstats import SimplifierStatistics
+from hypothesis.searchstrategy.compiler import compile_strategy
 from hypothesis.searchstrategy.strategies import BuildContext, strategy
 
 [assume]
@@ -49,9 +55,124 @@ def time_to_call_it_a_day(settings, start_time):
     return time.time() >= start_time + settings.timeout
 
 
+def search_for_template(
+    search_strategy, random, condition, tracker, settings, start_time,
+    max_examples, max_parameter_tries=None, run_statistics=None,
+):
+    """Generate fresh templates from search_strategy until one satisfies
+    condition, max_examples distinct templates have been tracked or we run out
+    of time.
+
+    Returns a pair (template, satisfying_examples) where template is None if
+    no satisfying template was found and satisfying_examples is the number of
+    templates considered which did not raise UnsatisfiedAssumption.
+
+    """
+    if run_statistics is None:
+        run_statistics = NoStatistics()
+    satisfying_examples = 0
+    build_context = BuildContext(random)
+    produce_template = compile_strategy(search_strategy).produce_template
+
+    parameter_source = new_parameter_source(
+        context=build_context, strategy=search_strategy,
+        min_parameters=max(2, int(float(max_examples) / 10)),
+        max_tries=max_parameter_tries, statistics=run_statistics,
+        vectorize=settings.vectorize_parameters,
+    )
+
+    for parameter in parameter_source:  # pragma: no branch
+        if len(tracker) >= search_strategy.size_upper_bound:
+            break
+        if len(tracker) >= max_examples:
+            break
+
+        if time_to_call_it_a_day(settings, start_time):
+            break
+
+        with run_statistics.timing('produce_template'):
+            example = produce_template(build_context, parameter)
+        with run_statistics.timing('track'):
+            duplicate = tracker.track(example) > 1
+        if duplicate:
+            run_statistics.duplicates += 1
+            parameter_source.mark_bad()
+            continue
+        run_statistics.examples += 1
+        try:
+            if condition(example):
+                return example, satisfying_examples
+        except UnsatisfiedAssumption:
+            run_statistics.rejected += 1
+            parameter_source.mark_bad()
+            continue
+        satisfying_examples += 1
+    return None, satisfying_examples
+
+
+WorkerSummary = namedtuple('WorkerSummary', (
+    'basic_template', 'satisfying_examples', 'examples_tracked',
+))
+
+
+def search_in_workers(
+    search_strategy, random, condition, tracker, settings, start_time,
+    max_parameter_tries=None,
+):
+    """Split the remaining max_examples budget between settings.workers forked
+    processes, each of which runs search_for_template with its own Random.
+
+    Returns a pair (template, summaries) where template is the first satisfying
+    template reported by any worker (or None) and summaries is a list of the
+    WorkerSummary of every worker that finished. Workers share start_time, so
+    the timeout applies to the search as a whole.
+
+    """
+    remaining = settings.max_examples - len(tracker)
+    base_count = len(tracker)
+    workers = min(settings.workers, remaining)
+
+    def run_worker(worker_random, budget):
+        def run():
+            template, satisfying_examples = search_for_template(
+                search_strategy, worker_random, condition, tracker,
+                settings, start_time, max_examples=base_count + budget,
+                max_parameter_tries=max_parameter_tries,
+            )
+            if template is not None:
+                template = search_strategy.to_basic(template)
+            return WorkerSummary(
+                basic_template=template,
+                satisfying_examples=satisfying_examples,
+                examples_tracked=len(tracker) - base_count,
+            )
+        return run
+
+    calls = []
+    for i in hrange(workers):
+        budget = remaining // workers + int(i < remaining % workers)
+        worker_random = Random(random.getrandbits(64))
+        calls.append(ForkedCall(run_worker(worker_random, budget)))
+
+    summaries = []
+    try:
+        for call in as_completed(calls):
+            summary = call.result()
+            summaries.append(summary)
+            if summary.basic_template is not None:
+                return (
+                    search_strategy.from_basic(summary.basic_template),
+                    summaries
+                )
+    finally:
+        for call in calls:
+            call.kill()
+    return None, summaries
+
+
 def find_satisfying_template(
     search_strategy, random, condition, tracker, settings, storage=None,
-    max_parameter_tries=None,
+    max_parameter_tries=None, run_statistics=None, replay_only=False,
 ):
     """Attempt to find a template for search_strategy such that condition is
     truthy.
@@ -64,6 +185,16 @@ def find_satisfying_template(
     settings.max_examples examples have been considered or settings.timeout
     seconds have passed (if settings.timeout > 0).
 
+    If settings.workers is greater than 1 and the platform supports it, fresh
+    examples are searched for in that many forked processes at once and the
+    first satisfying template any of them finds is returned.
+
+    If run_statistics is not None, generation is recorded in it. This is not
+    possible for searches that happen in worker processes.
+
+    If replay_only is True then only the examples in storage are considered,
+    and NoSuchExample is raised if none of them satisfy condition.
+
     May raise a variety of exceptions depending on exact circumstances, but
     these will all subclass either Unsatisfiable (to indicate not enough
     examples were found which did not raise UnsatisfiedAssumption to consider
@@ -81,12 +212,15 @@ def find_satisfying_template(
     start_time = time.time()
 
     if storage:
-        for example in storage.fetch():
+        # The most recently saved examples are the ones most likely to still
+        # fail, and the first one that does ends the replay.
+        for example in storage.fetch(order='recent', limit=max_examples):
             if time_to_call_it_a_day(settings, start_time):
                 break
             tracker.track(example)
             try:
                 if condition(example):
+                    storage.touch(example)
                     return example
                 satisfying_examples += 1
             except UnsatisfiedAssumption:
@@ -94,41 +228,58 @@ def find_satisfying_template(
             if len(tracker) >= max_examples:
                 break
 
-    build_context = BuildContext(random)
-
-    parameter_source = ParameterSource(
-        context=build_context, strategy=search_strategy,
-        min_parameters=max(2, int(float(max_examples) / 10)),
-        max_tries=max_parameter_tries,
-    )
-
-    for parameter in parameter_source:  # pragma: no branch
-        if len(tracker) >= search_strategy.size_upper_bound:
-            break
-        if len(tracker) >= max_examples:
-            break
-
-        if time_to_call_it_a_day(settings, start_time):
-            break
+    if replay_only:
+        description = get_pretty_function_description(condition)
+        if storage is None:
+            report(
+                'No examples of %s were replayed because there is no '
+                'example database to replay them from' % (description,))
+        elif not len(tracker):
+            report(
+                'No examples of %s were replayed because none are saved in '
+                'the example database' % (description,))
+        else:
+            verbose_report(
+                'Replayed %d saved examples without finding one that '
+                'satisfies %s' % (len(tracker), description))
+        raise NoSuchExample(description)
 
-        example = search_strategy.produce_template(
-            build_context, parameter
+    # Search spaces small enough to be exhausted within our budget aren't
+    # worth farming out, and are best tracked by a single process.
+    if (
+        settings.workers > 1 and can_fork and
+        len(tracker) < max_examples and
+        search_strategy.size_upper_bound > max_examples
+    ):
+        example, summaries = search_in_workers(
+            search_strategy, random, condition, tracker, settings,
+            start_time, max_parameter_tries=max_parameter_tries,
         )
-        if tracker.track(example) > 1:
-            parameter_source.mark_bad()
-            continue
-        try:
-            if condition(example):
-                return example
-        except UnsatisfiedAssumption:
-            parameter_source.mark_bad()
-            continue
-        satisfying_examples += 1
+        if example is not None:
+            tracker.track(example)
+        found = sum(w.satisfying_examples for w in summaries)
+        tracked = [w.examples_tracked for w in summaries]
+        # Every worker starts from a copy of our tracker, so a worker which
+        # exhausted the search space will have tracked everything in it.
+        exhausted = len(tracker) + max(tracked or [0])
+        examples_considered = len(tracker) + sum(tracked)
+    else:
+        example, found = search_for_template(
+            search_strategy, random, condition, tracker, settings,
+            start_time, max_examples=max_examples,
+            max_parameter_tries=max_parameter_tries,
+            run_statistics=run_statistics,
+        )
+        exhausted = examples_considered = len(tracker)
+    if example is not None:
+        return example
+    satisfying_examples += found
+
     run_time = time.time() - start_time
     timed_out = settings.timeout >= 0 and run_time >= settings.timeout
     if (
         satisfying_examples and
-        len(tracker) >= search_strategy.size_lower_bound
+        exhausted >= search_strategy.size_lower_bound
     ):
         raise DefinitelyNoSuchExample(
             get_pretty_function_description(condition),
@@ -141,7 +292,7 @@ def find_satisfying_template(
                 ' Only found %d examples (%d satisfying assumptions) in %.2fs.'
             ) % (
                 get_pretty_function_description(condition),
-                len(tracker), satisfying_examples, run_time
+                examples_considered, satisfying_examples, run_time
             ))
         else:
             raise Unsatisfiable((
@@ -149,13 +300,187 @@ def find_satisfying_template(
                 'Only %d out of %d examples considered satisfied assumptions'
             ) % (
                 get_pretty_function_description(condition),
-                satisfying_examples, len(tracker)))
+                satisfying_examples, examples_considered))
     else:
         raise NoSuchExample(get_pretty_function_description(condition))
 
 
+def first_simpler_template(
+    candidates, random, f, tracker, settings, start_time, pool=None
+):
+    """Find the first template from candidates which has not previously been
+    tracked and satisfies f.
+
+    If pool is not None it must be a ShrinkPool for f, which will be used to
+    evaluate candidates in parallel once calls to f are slow enough for that
+    to be worthwhile.
+
+    Returns a pair (template, timed_out). template is None if no candidate
+    was found, either because they ran out or because we ran out of time.
+
+    """
+    if pool is not None and pool.worthwhile:
+        return first_simpler_template_in_workers(
+            candidates, random, tracker, settings, start_time, pool
+        )
+    for s in candidates:
+        if tracker.track(s) > 1:
+            continue
+        call_start = time.time()
+        try:
+            if f(s):
+                return s, False
+        except UnsatisfiedAssumption:
+            pass
+        finally:
+            if pool is not None:
+                pool.record(time.time() - call_start, 1)
+        if time_to_call_it_a_day(settings, start_time):
+            return None, True
+    return None, False
+
+
+class ShrinkPool(object):
+
+    """A fixed set of forked worker processes which evaluate f on candidate
+    templates for search_strategy, started once and then reused for every
+    batch of candidates.
+
+    For cheap tests sending candidates to another process costs more than
+    it saves, so the workers are only used (and started) once we have seen
+    at least warmup_calls calls to f which took min_call_time seconds each
+    on average.
+
+    Templates are sent to the workers as basic data, so they never need to
+    be picklable themselves. Each worker is sent a chunk of candidates at a
+    time, sized from how long calls to f have taken so far so that a chunk
+    takes about chunk_time seconds: For cheap tests this shares the cost of
+    a round trip between many calls, while for slow ones it stops workers
+    from being busy with stale candidates once a success has been found.
+
+    """
+
+    chunk_time = 0.01
+    max_chunk_size = 64
+    warmup_calls = 10
+    min_call_time = 0.001
+
+    def __init__(self, search_strategy, f, workers):
+        self.search_strategy = search_strategy
+        self.f = f
+        self.n_workers = workers
+        self.workers = []
+        self.calls = 0
+        self.runtime = 0.0
+
+    @property
+    def worthwhile(self):
+        return (
+            self.calls >= self.warmup_calls and
+            self.runtime >= self.min_call_time * self.calls
+        )
+
+    @property
+    def chunk_size(self):
+        if not self.runtime:
+            return 1
+        return max(1, min(
+            self.max_chunk_size,
+            int(self.chunk_time * self.calls / self.runtime),
+        ))
+
+    @property
+    def batch_size(self):
+        return self.n_workers * self.chunk_size
+
+    def record(self, runtime, calls):
+        """Note that calls calls to f took runtime seconds in total, whether
+        they were made here or in the workers."""
+        self.runtime += runtime
+        self.calls += calls
+
+    def send(self, batch):
+        """Start evaluating every template in batch. Candidates are dealt out
+        to workers in turn, so the first few are all evaluated at once."""
+        if not self.workers:
+            self.start()
+        n = len(self.workers)
+        for i, worker in enumerate(self.workers):
+            worker.send(map(self.search_strategy.to_basic, batch[i::n]))
+
+    def start(self):
+        search_strategy = self.search_strategy
+        f = self.f
+
+        def evaluate(basic):
+            try:
+                return bool(f(search_strategy.from_basic(basic)))
+            except UnsatisfiedAssumption:
+                return False
+        self.workers = [Worker(evaluate) for _ in hrange(self.n_workers)]
+
+    def result(self, i):
+        """Wait for the result of the i'th template of the last batch sent.
+        Results must be asked for in order."""
+        return self.workers[i % len(self.workers)].result()
+
+    def discard_pending(self):
+        for worker in self.workers:
+            worker.discard_pending()
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+
+def first_simpler_template_in_workers(
+    candidates, random, tracker, settings, start_time, pool
+):
+    """As first_simpler_template, but evaluates up to pool.batch_size
+    candidates at a time in the workers of pool.
+
+    The result is the same as the serial version: Candidates are considered
+    in order, only those up to and including the first success are tracked,
+    time is checked after each failure, and random is left in the state it
+    would have been in had we stopped drawing candidates at that success.
+
+    """
+    candidates = iter(candidates)
+    while True:
+        batch = []
+        states = []
+        in_batch = Tracker()
+        for s in candidates:
+            if s in tracker or in_batch.track(s) > 1:
+                continue
+            batch.append(s)
+            states.append(random.getstate())
+            if len(batch) >= pool.batch_size:
+                break
+        if not batch:
+            return None, False
+        sent_at = time.time()
+        pool.send(batch)
+        results = 0
+        try:
+            for i, (s, state) in enumerate(zip(batch, states)):
+                tracker.track(s)
+                result = pool.result(i)
+                results += 1
+                if result:
+                    random.setstate(state)
+                    return s, False
+                if time_to_call_it_a_day(settings, start_time):
+                    return None, True
+        finally:
+            # Anything still being worked on is of no further interest.
+            pool.discard_pending()
+            pool.record((time.time() - sent_at) * pool.n_workers, results)
+
+
 def simplify_template_such_that(
-    search_strategy, random, t, f, tracker, settings, start_time
+    search_strategy, random, t, f, tracker, settings, start_time,
+    statistics=None,
 ):
     """Perform a greedy search to produce a "simplest" version of a template
     that satisfies some predicate.
@@ -169,78 +494,137 @@ def simplify_template_such_that(
     If f throws UnsatisfiedAssumption this will be treated the same as if
     it returned False.
 
+    If statistics is not None it should be a SimplifierStatistics. Each round
+    of simplification will then run passes in the order it suggests, and the
+    number of calls to f and successful shrinks of each pass are recorded in
+    it.
+
     """
     assert isinstance(random, Random)
 
     yield t
     successful_shrinks = 0
 
-    changed = True
-    while changed and successful_shrinks < settings.max_shrinks:
-        changed = False
-        for simplify in search_strategy.simplifiers(random, t):
-            debug_report('Applying simplification pass %s' % (
-                simplify.__name__,
-            ))
-            while True:
-                simpler = simplify(random, t)
-                for s in simpler:
-                    if tracker.track(s) > 1:
-                        continue
-                    try:
-                        if f(s):
-                            successful_shrinks += 1
-                            changed = True
-                            yield s
-                            t = s
+    pool = None
+    if settings.workers > 1 and can_fork:
+        pool = ShrinkPool(search_strategy, f, settings.workers)
+    try:
+        changed = True
+        while changed and successful_shrinks < settings.max_shrinks:
+            changed = False
+            simplifiers = search_strategy.simplifiers(random, t)
+            if statistics is not None:
+                simplifiers = statistics.order(random, simplifiers)
+            for simplify in simplifiers:
+                debug_report('Applying simplification pass %s' % (
+                    simplify.__name__,
+                ))
+                initial_calls = len(tracker)
+                initial_shrinks = successful_shrinks
+                try:
+                    while True:
+                        s, timed_out = first_simpler_template(
+                            simplify(random, t), random, f, tracker,
+                            settings, start_time, pool,
+                        )
+                        if timed_out:
+                            return
+                        if s is None:
                             break
-                    except UnsatisfiedAssumption:
-                        pass
-                    if time_to_call_it_a_day(settings, start_time):
-                        return
-                else:
+                        successful_shrinks += 1
+                        changed = True
+                        yield s
+                        t = s
+                finally:
+                    if statistics is not None:
+                        statistics.record(
+                            simplify.__name__,
+                            calls=len(tracker) - initial_calls,
+                            successes=successful_shrinks - initial_shrinks,
+                        )
+
+                if successful_shrinks >= settings.max_shrinks:
                     break
+    finally:
+        if pool is not None:
+            pool.close()
 
-            if successful_shrinks >= settings.max_shrinks:
-                break
+
+def load_simplifier_statistics(storage):
+    statistics = SimplifierStatistics()
+    if storage is not None:
+        try:
+            saved = storage.fetch_metadata('simplifier-statistics')
+            if saved is not None:
+                statistics.merge_basic(saved)
+        except ValueError:
+            pass
+    return statistics
+
+
+@contextmanager
+def batched_writes(storage):
+    """Let the backend of storage, if there is one, buffer the writes made in
+    this block and save them together."""
+    if storage is None:
+        yield
+    else:
+        with storage.batch():
+            yield
 
 
 def best_satisfying_template(
     search_strategy, random, condition, settings, storage, tracker=None,
-    max_parameter_tries=None,
+    max_parameter_tries=None, run_statistics=None, replay_only=False,
 ):
     """Find and then minimize a satisfying template.
 
     First look in storage if it is not None, then attempt to generate
-    one. May throw all the exceptions of find_satisfying_template. Once
-    an example has been found it will be further minimized.
+    one unless replay_only is True. May throw all the exceptions of
+    find_satisfying_template. Once an example has been found it will be
+    further minimized.
 
     """
     if tracker is None:
-        tracker = Tracker()
+        tracker = Tracker(max_exact_size=settings.max_exact_tracking)
+    if run_statistics is None:
+        run_statistics = NoStatistics()
     start_time = time.time()
 
     successful_shrinks = -1
-    with settings:
+    with settings, batched_writes(storage):
         satisfying_example = find_satisfying_template(
             search_strategy, random, condition, tracker, settings, storage,
             max_parameter_tries=max_parameter_tries,
+            run_statistics=run_statistics, replay_only=replay_only,
         )
 
-        for simpler in simplify_template_such_that(
-            search_strategy, random, satisfying_example, condition, tracker,
-            settings, start_time,
-        ):
-            successful_shrinks += 1
-            satisfying_example = simpler
-            if time_to_call_it_a_day(settings, start_time):
-                # It's very hard to reliably hit this line even though we have
-                # tests for it. No cover prevents this from causing a flaky
-                # build.
-                break  # pragma: no cover
+        if settings.adaptive_simplification:
+            statistics = load_simplifier_statistics(storage)
+        else:
+            statistics = None
+
+        tracked_before_shrinking = len(tracker)
+        with run_statistics.timing('shrink'):
+            for simpler in simplify_template_such_that(
+                search_strategy, random, satisfying_example, condition,
+                tracker, settings, start_time, statistics=statistics,
+            ):
+                successful_shrinks += 1
+                satisfying_example = simpler
+                if time_to_call_it_a_day(settings, start_time):
+                    # It's very hard to reliably hit this line even though we
+                    # have tests for it. No cover prevents this from causing a
+                    # flaky build.
+                    break  # pragma: no cover
+        run_statistics.shrink_calls += len(tracker) - tracked_before_shrinking
+        run_statistics.successful_shrinks += successful_shrinks
 
         if storage is not None:
             storage.save(satisfying_example)
+            if statistics is not None:
+                storage.save_metadata(
+                    'simplifier-statistics', statistics.to_basic())
     if not successful_shrinks:
         verbose_report('Could not shrink example')
     elif successful_shrinks == 1:
@@ -289,10 +673,14 @@ def example(*args, **kwargs):
 
 def reify_and_execute(
     search_strategy, template, test,
-    print_example=False, always_print=False,
+    print_example=False, always_print=False, run_statistics=None,
 ):
+    if run_statistics is None:
+        run_statistics = NoStatistics()
+
     def run():
-        args, kwargs = search_strategy.reify(template)
+        with run_statistics.timing('reify'):
+            args, kwargs = compile_strategy(search_strategy).reify(template)
         if print_example:
             report(
                 lambda: 'Falsifying example: %s(%s)' % (
@@ -311,7 +699,8 @@ def reify_and_execute(
                     )
                 )
             )
-        return test(*args, **kwargs)
+        with run_statistics.timing('test'):
+            return test(*args, **kwargs)
     return run
 
 
@@ -445,6 +834,9 @@ def given(*generator_arguments, **generator_kwargs):
             )
 
             search_strategy = strategy(given_specifier, settings)
+            run_statistics = new_run_statistics('%s.%s' % (
+                test.__module__, getattr(test, '__qualname__', test.__name__)
+            ))
 
             if settings.database:
                 storage = settings.database.storage_for(
@@ -456,7 +848,8 @@ def given(*generator_arguments, **generator_kwargs):
                 try:
                     test_runner(reify_and_execute(
                         search_strategy, xs, test,
-                        always_print=settings.max_shrinks <= 0
+                        always_print=settings.max_shrinks <= 0,
+                        run_statistics=run_statistics,
                     ))
                     return False
                 except UnsatisfiedAssumption as e:
@@ -475,7 +868,8 @@ def given(*generator_arguments, **generator_kwargs):
             try:
                 falsifying_template = best_satisfying_template(
                     search_strategy, random, is_template_example,
-                    settings, storage
+                    settings, storage, run_statistics=run_statistics,
+                    replay_only=settings.replay_only,
                 )
             except NoSuchExample:
                 return
@@ -508,12 +902,17 @@ def find(specifier, condition, settings=None, random=None):
     )
 
     search = strategy(specifier, settings)
+    reify = compile_strategy(search).reify
     random = random or Random()
     successful_examples = [0]
+    run_statistics = new_run_statistics(
+        get_pretty_function_description(condition))
 
     def template_condition(template):
-        result = search.reify(template)
-        success = condition(result)
+        with run_statistics.timing('reify'):
+            result = reify(template)
+        with run_statistics.timing('test'):
+            success = condition(result)
 
         if success:
             successful_examples[0] += 1
@@ -534,12 +933,13 @@ def find(specifier, condition, settings=None, random=None):
         return success
 
     template_condition.__name__ = condition.__name__
-    tracker = Tracker()
+    tracker = Tracker(max_exact_size=settings.max_exact_tracking)
 
     try:
-        return search.reify(best_satisfying_template(
+        return reify(best_satisfying_template(
             search, random, template_condition, settings, None,
             tracker=tracker, max_parameter_tries=2,
+            run_statistics=run_statistics,
         ))
     except Timeout:
         raise
@@ -550,6 +950,3 @@ def find(specifier, condition, settings=None, random=None):
                 search.size_upper_bound,
             )
         raise NoSuchExample(get_pretty_function_description(condition))
-
-
-load_entry_points()
@@ -10,10 +10,11 @@
 
 # END HEADER
 
-from hypothesis.utils.show import show
+from hypothesis.database.keys import database_key, legacy_database_key
+from hypothesis.internal.compat import binary_type
 from hypothesis.searchstrategy.strategies import BadData, strategy
-from hypothesis.database.formats import JSONFormat
-from hypothesis.database.backend import SQLiteBackend
+from hypothesis.database.formats import JSONFormat, BinaryFormat
+from hypothesis.database.backend import SQLiteBackend, WriteBehindBackend
 
 
 class Storage(object):
@@ -32,15 +33,31 @@ class Storage(object):
         self.specifier = specifier
         self.format = format
         self.strategy = strategy
-        self.key = show(specifier)
+        self.key = database_key(specifier, strategy)
 
-    def save(self, value):
-        converted = self.strategy.to_basic(value)
-        serialized = self.format.serialize_basic(converted)
-        self.backend.save(self.key, serialized)
+    def serialize(self, value):
+        return self.format.serialize_basic(self.strategy.to_basic(value))
 
-    def fetch(self):
-        for data in self.backend.fetch(self.key):
+    def save(self, value):
+        self.backend.save(self.key, self.serialize(value))
+        if self.database.max_examples_per_key is not None:
+            self.backend.evict(self.key, self.database.max_examples_per_key)
+
+    def touch(self, value):
+        """Record that a fetched example was useful, making it less likely to
+        be evicted."""
+        self.backend.touch(self.key, self.serialize(value))
+
+    def fetch(self, order=None, limit=None):
+        """Yield the examples saved for this specifier, deleting any that can
+        no longer be read. order and limit are as for
+        Backend.fetch_ordered."""
+        if self.key not in self.database.migrated_keys:
+            self.migrate_legacy_examples()
+            self.database.migrated_keys.add(self.key)
+        for data in self.backend.fetch_ordered(
+            self.key, order=order, limit=limit
+        ):
             try:
                 deserialized = self.strategy.from_basic(
                     self.format.deserialize_data(data))
@@ -50,6 +67,46 @@ class Storage(object):
 
             yield deserialized
 
+    def migrate_legacy_examples(self):
+        """Move any examples saved under the key older versions of Hypothesis
+        used for this specifier to the current one.
+
+        Computing the legacy key is expensive, so once this has been done we
+        record it in the metadata for this key and never do it again for
+        this database.
+
+        """
+        if self.fetch_metadata('migrated') is not None:
+            return
+        legacy_key = legacy_database_key(self.specifier)
+        with self.batch():
+            for data in list(self.backend.fetch(legacy_key)):
+                self.backend.save(self.key, data)
+                self.backend.delete(legacy_key, data)
+            self.save_metadata('migrated', True)
+
+    def batch(self):
+        """A context manager within which writes may be buffered and made
+        all at once at the end."""
+        return self.backend.batch()
+
+    def metadata_key(self, name):
+        return 'hypothesis-metadata:%s:%s' % (name, self.key)
+
+    def save_metadata(self, name, value):
+        """Save a single basic value under this name, replacing anything
+        previously saved under it."""
+        key = self.metadata_key(name)
+        for data in list(self.backend.fetch(key)):
+            self.backend.delete(key, data)
+        self.backend.save(key, self.format.serialize_basic(value))
+
+    def fetch_metadata(self, name):
+        """Return the basic value last saved under this name, or None if
+        there is no such value."""
+        for data in self.backend.fetch(self.metadata_key(name)):
+            return self.format.deserialize_data(data)
+
 
 class ExampleDatabase(object):
 
@@ -57,6 +114,15 @@ class ExampleDatabase(object):
 
     Maps specifiers to storage for them.
 
+    If max_examples_per_key is not None, saving an example for a specifier
+    evicts all but that many of those saved for it. If max_size is not None,
+    compact() evicts examples until the rest total at most that size, as
+    measured by the backend.
+
+    If write_behind is True, writes to the backend are made in a background
+    thread so that saving examples never waits for I/O. See
+    WriteBehindBackend for details.
+
     """
 
     def __repr__(self):
@@ -68,9 +134,25 @@ class ExampleDatabase(object):
         self,
         backend=None,
         format=None,
+        max_examples_per_key=None,
+        max_size=None,
+        write_behind=False,
     ):
         self.backend = backend or SQLiteBackend()
-        self.format = format or JSONFormat()
+        if write_behind:
+            self.backend = WriteBehindBackend(self.backend)
+        self.max_examples_per_key = max_examples_per_key
+        self.max_size = max_size
+        # Keys we have already moved examples saved under legacy keys to.
+        self.migrated_keys = set()
+        # Keys of every storage we have handed out.
+        self.used_keys = set()
+        if format is None:
+            if self.backend.data_type() == binary_type:
+                format = BinaryFormat()
+            else:
+                format = JSONFormat()
+        self.format = format
         if self.format.data_type() != self.backend.data_type():
             raise ValueError((
                 'Inconsistent data types: format provides data of type %s '
@@ -80,13 +162,20 @@ class ExampleDatabase(object):
 
     def storage_for(self, specifier, search_strategy=None):
         """Get a storage object corresponding to this specifier."""
-        return Storage(
+        storage = Storage(
             specifier=specifier,
             database=self,
             backend=self.backend,
             format=self.format,
             strategy=search_strategy or strategy(specifier),
         )
+        self.used_keys.add(storage.key)
+        return storage
+
+    def compact(self):
+        """Evict examples down to max_size and reclaim unused space in the
+        backend. Returns the number of examples evicted."""
+        return self.backend.compact(max_size=self.max_size)
 
     def close(self):
         self.backend.close()
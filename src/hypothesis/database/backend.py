@@ -13,11 +13,21 @@
 from __future__ import division, print_function, absolute_import, \
     unicode_literals
 
+import os
+import time
+import errno
+import atexit
+import weakref
 import sqlite3
+import hashlib
+import tempfile
+import threading
 from abc import abstractmethod
+from itertools import islice
 from contextlib import contextmanager
 
-from hypothesis.internal.compat import text_type
+from hypothesis.settings import mkdir_p
+from hypothesis.internal.compat import text_type, binary_type
 
 
 class Backend(object):
@@ -55,83 +65,894 @@ class Backend(object):
     def fetch(self, key):
         """yield the values matching this key."""
 
+    def fetch_ordered(self, key, order=None, limit=None):
+        """yield at most limit (or all, if limit is None) of the values
+        matching this key, in the given order. The supported orders are:
+
+        * None: Whatever order is convenient for the backend.
+        * 'recent': Most recently saved first.
+        * 'smallest': Shortest first.
+
+        The default implementation fetches everything and sorts it in
+        memory. It cannot tell when things were saved, so 'recent' is the
+        same as None.
+
+        """
+        check_order(order)
+        values = self.fetch(key)
+        if order == 'smallest':
+            values = sorted(values, key=len)
+        return islice(values, limit)
+
+    def keys(self):
+        """yield every key that has values saved for it.
+
+        This method is optional. The default implementation raises
+        NotImplementedError, as there is no way to implement it in terms of
+        the other methods.
+
+        """
+        raise NotImplementedError(
+            '%s does not support listing keys' % (type(self).__name__,))
+
+    def touch(self, key, value):
+        """Record that this value was fetched and was useful, e.g. because it
+        still fails. Backends which keep track of this should prefer to keep
+        values that have been useful recently when evicting.
+
+        This method is optional and does nothing by default.
+
+        """
+
+    def evict(self, key, keep):
+        """Delete all but the keep most recently saved or touched values for
+        this key.
+
+        The default implementation uses fetch_ordered and delete.
+
+        """
+        for value in list(islice(
+            self.fetch_ordered(key, order='recent'), keep, None
+        )):
+            self.delete(key, value)
+
+    def compact(self, max_size=None):
+        """Delete the least recently saved or touched values across all keys
+        until the values stored total at most max_size (if it is not None),
+        then reclaim any space that this or earlier deletes have freed.
+        Returns the number of values deleted.
+
+        This method is optional and does nothing by default.
+
+        """
+        return 0
+
+    def close(self):
+        """Release any resources held by this backend."""
+
+    @contextmanager
+    def batch(self):
+        """Within this block the backend may buffer saves and deletes and
+        write them all at once at the end. Values saved in the block must
+        still be visible to fetch.
+
+        The default implementation writes everything immediately.
+
+        """
+        yield
+
 
 class SQLiteBackend(Backend):
 
-    def __init__(self, path=':memory:'):
+    """A Backend storing values in an SQLite database at path.
+
+    Each thread (and each process, after a fork) gets its own connection,
+    except for in-memory databases, which are only visible to the
+    connection that created them and so share a single one. Connections to
+    files use the given journal_mode and synchronous level. Write ahead
+    logging lets readers proceed while another process is writing, and
+    with it synchronous=NORMAL only syncs at checkpoints rather than on
+    every commit.
+
+    Inside a batch() block saves and deletes are buffered and written in a
+    single transaction when the outermost block exits, when a fetch needs
+    to see them, or once the oldest buffered write is more than
+    flush_interval seconds old.
+
+    Values are stored along with their size and the time they were last
+    saved, both indexed, so fetch_ordered can stream them in any of its
+    orders without sorting. We also record how many times and when each
+    was last touched. Eviction keeps the values most recently saved or
+    touched, breaking ties in favour of those touched most often.
+
+    """
+
+    def __init__(
+        self, path=':memory:', journal_mode='wal', synchronous='normal',
+        flush_interval=1.0,
+    ):
         self.path = path
+        self.resave_query = RESAVE % {'table': self.table}
+        self.save_query = SAVE % {'table': self.table}
+        self.delete_query = DELETE % {'table': self.table}
+        self.touch_query = TOUCH % {'table': self.table}
+        self.evict_query = EVICT % {'table': self.table}
+        self.fetch_pages = dict(
+            (order, paged_query(self.table, column, direction))
+            for order, (column, direction) in PAGE_ORDERS.items()
+        )
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.flush_interval = flush_interval
         self.db_created = False
-        self.__connection = None
+        self.lock = threading.RLock()
+        self.local = threading.local()
+        self.connections = []
+        self.generation = 0
+        self.batch_depth = 0
+        self.pending = []
+        self.pending_since = None
 
     def connection(self):
-        if self.__connection is None:
-            self.__connection = sqlite3.connect(self.path)
-        return self.__connection
+        if self.path == ':memory:':
+            owner = self
+            key = self.generation
+        else:
+            # Never reuse a connection to a file inherited over a fork.
+            owner = self.local
+            key = (self.generation, os.getpid())
+        if getattr(owner, 'connection_key', None) != key:
+            with self.lock:
+                owner.current_connection = self.connect()
+                owner.connection_key = key
+                self.connections.append(owner.current_connection)
+        return owner.current_connection
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        if self.path != ':memory:':
+            try:
+                if self.journal_mode is not None:
+                    conn.execute(
+                        'pragma journal_mode=%s' % (self.journal_mode,))
+                if self.synchronous is not None:
+                    conn.execute(
+                        'pragma synchronous=%s' % (self.synchronous,))
+            except sqlite3.DatabaseError:
+                # Some filesystems do not support write ahead logging, in
+                # which case SQLite's defaults are fine.
+                pass
+        return conn
 
     def close(self):
-        if self.__connection is not None:
-            c = self.__connection
-            self.__connection = None
-            c.close()
+        with self.lock:
+            self.flush()
+            connections = self.connections
+            self.connections = []
+            self.generation += 1
+            self.db_created = False
+            for c in connections:
+                c.close()
 
     def __repr__(self):
         return '%s(%s)' % (self.__class__.__name__, self.path)
 
+    table = 'hypothesis_data_mapping'
+    value_type = 'text'
+
     def data_type(self):
         return text_type
 
+    def to_db(self, value):
+        """Convert a value to what we pass to SQLite."""
+        return value
+
+    def from_db(self, value):
+        """Convert a value read from SQLite back to data_type()."""
+        return value
+
     @contextmanager
     def cursor(self):
-        conn = self.connection()
-        cursor = conn.cursor()
-        try:
+        with self.lock:
+            conn = self.connection()
+            cursor = conn.cursor()
             try:
-                yield cursor
-            finally:
-                cursor.close()
-        except:
-            conn.rollback()
-            raise
-        else:
-            conn.commit()
+                try:
+                    yield cursor
+                finally:
+                    cursor.close()
+            except:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+
+    @contextmanager
+    def batch(self):
+        with self.lock:
+            self.batch_depth += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.batch_depth -= 1
+                if not self.batch_depth:
+                    self.flush()
+
+    def write(self, operation, arguments):
+        self.create_db_if_needed()
+        with self.lock:
+            self.pending.append((operation, arguments))
+            if self.pending_since is None:
+                self.pending_since = time.time()
+            if (
+                not self.batch_depth or
+                time.time() >= self.pending_since + self.flush_interval
+            ):
+                self.flush()
+
+    def flush(self):
+        """Write all buffered saves and deletes in a single transaction."""
+        with self.lock:
+            if not self.pending:
+                return
+            pending = self.pending
+            self.pending = []
+            self.pending_since = None
+            with self.cursor() as cursor:
+                for operation, arguments in pending:
+                    cursor.execute(operation, arguments)
 
     def save(self, key, value):
+        # Saving a value that is already present moves it to the front of
+        # the 'recent' order, keeping its hit count.
+        size = len(value)
+        value = self.to_db(value)
+        now = time.time()
+        with self.batch():
+            self.write(self.resave_query, (now, key, value))
+            self.write(self.save_query, (key, value, size, now))
+
+    def delete(self, key, value):
+        self.write(self.delete_query, (key, self.to_db(value)))
+
+    def touch(self, key, value):
+        self.write(self.touch_query, (time.time(), key, self.to_db(value)))
+
+    def evict(self, key, keep):
+        self.write(self.evict_query, (key, key, keep))
+
+    def compact(self, max_size=None):
+        """Evict values until their total size is at most max_size, then
+        vacuum the database file."""
         self.create_db_if_needed()
-        with self.cursor() as cursor:
+        deleted = 0
+        with self.lock:
+            self.flush()
+            if max_size is not None:
+                with self.cursor() as cursor:
+                    cursor.execute(TOTAL_SIZE % {'table': self.table})
+                    excess = (cursor.fetchone()[0] or 0) - max_size
+                    if excess > 0:
+                        cursor.execute(
+                            LEAST_VALUABLE % {'table': self.table})
+                        doomed = []
+                        for rowid, size in cursor:
+                            if excess <= 0:
+                                break
+                            doomed.append((rowid,))
+                            excess -= size
+                        cursor.executemany(
+                            'delete from %s where rowid = ?' % (self.table,),
+                            doomed)
+                        deleted = len(doomed)
+            # Vacuuming can't happen inside a transaction, but the cursor
+            # has already committed. It also needs the database to itself,
+            # so if another process is using it we'll just do it next time.
             try:
-                cursor.execute("""
-                    insert into hypothesis_data_mapping(key, value)
-                    values(?, ?)
-                """, (key, value))
-            except sqlite3.IntegrityError:
+                self.connection().execute('vacuum')
+            except sqlite3.OperationalError:
                 pass
+        return deleted
 
-    def delete(self, key, value):
+    def keys(self):
         self.create_db_if_needed()
-        with self.cursor() as cursor:
-            cursor.execute("""
-                delete from hypothesis_data_mapping
-                where key = ? and value = ?
-            """, (key, value))
+        with self.lock:
+            self.flush()
+            with self.cursor() as cursor:
+                cursor.execute(
+                    'select distinct key from %s' % (self.table,))
+                keys = [row[0] for row in cursor.fetchall()]
+        return iter(keys)
 
     def fetch(self, key):
+        return self.fetch_ordered(key)
+
+    def fetch_ordered(self, key, order=None, limit=None):
+        """Lazily yield values for key.
+
+        Values are read a page at a time, each page starting where the
+        last one ended, so no lock or transaction is held between values
+        and it is fine to save or delete while iterating.
+
+        """
+        check_order(order)
         self.create_db_if_needed()
-        with self.cursor() as cursor:
-            cursor.execute("""
-                select value from hypothesis_data_mapping
-                where key = ?
-            """, (key,))
-            return [value for (value,) in cursor]
+        first_page, next_page, position = self.fetch_pages[order]
+        last = None
+        remaining = limit
+        while remaining is None or remaining > 0:
+            page_size = PAGE_SIZE
+            if remaining is not None:
+                page_size = min(page_size, remaining)
+            if last is None:
+                query, arguments = first_page, (key, page_size)
+            else:
+                query = next_page
+                arguments = (key,) + position(last) + (page_size,)
+            with self.lock:
+                self.flush()
+                with self.cursor() as cursor:
+                    cursor.execute(query, arguments)
+                    rows = cursor.fetchall()
+            for row in rows:
+                yield self.from_db(row[0])
+            if len(rows) < page_size:
+                break
+            last = rows[-1]
+            if remaining is not None:
+                remaining -= len(rows)
 
     def create_db_if_needed(self):
         if self.db_created:
             return
         with self.cursor() as cursor:
             cursor.execute("""
-                create table if not exists hypothesis_data_mapping(
+                create table if not exists %s(
                     key text,
-                    value text,
+                    value %s,
+                    size integer,
+                    saved_at real,
+                    hits integer default 0,
+                    last_hit real default 0,
                     unique(key, value)
                 )
-            """)
+            """ % (self.table, self.value_type))
+            cursor.execute('pragma table_info(%s)' % (self.table,))
+            columns = set(row[1] for row in cursor.fetchall())
+            # Databases created by older versions lack the metadata columns.
+            if 'size' not in columns:
+                cursor.execute("""
+                    alter table %s add column size integer
+                """ % (self.table,))
+            if 'saved_at' not in columns:
+                cursor.execute("""
+                    alter table %s add column saved_at real
+                """ % (self.table,))
+            if 'hits' not in columns:
+                cursor.execute("""
+                    alter table %s add column hits integer default 0
+                """ % (self.table,))
+                cursor.execute("""
+                    alter table %s add column last_hit real default 0
+                """ % (self.table,))
+            cursor.execute("""
+                update %s
+                set size = coalesce(size, length(value)),
+                    saved_at = coalesce(saved_at, 0)
+                where size is null or saved_at is null
+            """ % (self.table,))
+            for column in ('saved_at', 'size'):
+                cursor.execute("""
+                    create index if not exists %(table)s_%(column)s
+                    on %(table)s(key, %(column)s)
+                """ % {'table': self.table, 'column': column})
         self.db_created = True
+
+
+class BinarySQLiteBackend(SQLiteBackend):
+
+    """An SQLiteBackend storing binary data in a BLOB column, for use with
+    formats such as BinaryFormat.
+
+    This uses its own table, so can share a database file with a text
+    SQLiteBackend.
+
+    """
+
+    table = 'hypothesis_binary_data_mapping'
+    value_type = 'blob'
+
+    def data_type(self):
+        return binary_type
+
+    def to_db(self, value):
+        return sqlite3.Binary(value)
+
+    def from_db(self, value):
+        return binary_type(value)
+
+
+class DirectoryBackend(Backend):
+
+    """A Backend storing each value in its own file under the directory at
+    path.
+
+    Each key gets a directory named for a hash of it, sharded by the first
+    two characters of that hash so no one directory gets too large, and
+    each value is stored in a file in there named for a hash of its
+    contents. Saving writes the value to a temporary file and renames it
+    into place, so concurrent readers never see a partial file and saving
+    the same value twice just replaces it with an identical copy. None of
+    this needs a lock, so any number of processes can share a directory.
+    The key itself is saved alongside its values, so that keys() can list
+    them.
+
+    The 'recent' order uses file modification times, which may only be
+    accurate to a second or so on some filesystems. Touching a value
+    updates its modification time, so it also counts as recent.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, self.path)
+
+    def data_type(self):
+        return binary_type
+
+    def key_path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, digest[:2], digest[2:])
+
+    def value_path(self, key, value):
+        return os.path.join(
+            self.key_path(key), hashlib.sha1(value).hexdigest())
+
+    def save(self, key, value):
+        path = self.value_path(key, value)
+        try:
+            # Saving a value that is already present moves it to the front
+            # of the 'recent' order.
+            os.utime(path, None)
+            return
+        except OSError:
+            pass
+        directory = os.path.dirname(path)
+        mkdir_p(directory)
+        key_path = os.path.join(directory, KEY_FILE_NAME)
+        if not os.path.exists(key_path):
+            write_atomically(key_path, key.encode('utf-8'))
+        write_atomically(path, value)
+
+    def delete(self, key, value):
+        remove_if_present(self.value_path(key, value))
+
+    def touch(self, key, value):
+        try:
+            os.utime(self.value_path(key, value), None)
+        except OSError:
+            pass
+
+    def compact(self, max_size=None):
+        """Delete the files with the oldest modification times until the
+        rest total at most max_size bytes, along with any temporary files
+        left behind by processes that died while saving.
+
+        Empty directories are left alone, as another process may be about
+        to save into them.
+
+        """
+        values = []
+        stale = time.time() - STALE_TEMPORARY_FILE_AGE
+        for directory, _, names in os.walk(self.path):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if is_value_file_name(name):
+                    values.append((stat.st_mtime, path, stat.st_size))
+                elif name[0] == '.' and stat.st_mtime < stale:
+                    remove_if_present(path)
+        deleted = 0
+        if max_size is not None:
+            excess = sum(size for _, _, size in values) - max_size
+            for _, path, size in sorted(values):
+                if excess <= 0:
+                    break
+                remove_if_present(path)
+                excess -= size
+                deleted += 1
+        return deleted
+
+    def keys(self):
+        for shard in list_directory(self.path):
+            shard_path = os.path.join(self.path, shard)
+            for name in list_directory(shard_path):
+                directory = os.path.join(shard_path, name)
+                names = list_directory(directory)
+                if (
+                    KEY_FILE_NAME not in names or
+                    not any(map(is_value_file_name, names))
+                ):
+                    continue
+                key_path = os.path.join(directory, KEY_FILE_NAME)
+                try:
+                    with open(key_path, 'rb') as f:
+                        key = f.read()
+                except (IOError, OSError):
+                    continue
+                yield key.decode('utf-8')
+
+    def fetch(self, key):
+        return self.fetch_ordered(key)
+
+    def fetch_ordered(self, key, order=None, limit=None):
+        """Lazily yield values for key, skipping any that are deleted before
+        they can be read."""
+        check_order(order)
+        directory = self.key_path(key)
+        paths = [
+            os.path.join(directory, n) for n in list_directory(directory)
+            if is_value_file_name(n)
+        ]
+        if order is not None:
+            stats = {}
+            for path in paths:
+                try:
+                    stats[path] = os.stat(path)
+                except OSError:
+                    pass
+            paths = list(stats)
+            if order == 'recent':
+                paths.sort(
+                    key=lambda p: (stats[p].st_mtime, p), reverse=True)
+            else:
+                paths.sort(key=lambda p: (stats[p].st_size, p))
+        for path in islice(paths, limit):
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except (IOError, OSError):
+                continue
+            yield data
+
+
+class WriteBehindBackend(Backend):
+
+    """A Backend wrapping another one, which writes to it in a background
+    thread so that saving never has to wait for I/O.
+
+    Writes are queued, and later writes for the same value replace earlier
+    ones, so e.g. a save followed by a delete only deletes. The background
+    thread applies everything queued so far in a single batch. If more than
+    max_pending writes are queued then writing blocks until the background
+    thread catches up.
+
+    Fetching overlays the queued writes on what the wrapped backend returns,
+    so never needs to wait for them, except for the 'smallest' order, which
+    first flushes. Everything queued is written when flush() or close() is
+    called, and at interpreter exit. If the background thread fails to
+    write then the next call to either raises its error.
+
+    """
+
+    def __init__(self, backend, max_pending=1000):
+        self.backend = backend
+        self.max_pending = max_pending
+        self.condition = threading.Condition()
+        self.write_lock = threading.Lock()
+        # Queued writes, keyed on what they write to so that later writes
+        # replace earlier ones. Each maps to (sequence, method, arguments),
+        # the sequence number recording the order they were queued in.
+        self.pending = {}
+        # Writes that the background thread is in the middle of applying.
+        self.writing = {}
+        self.sequence = 0
+        self.error = None
+        self.thread = None
+        self.pid = None
+        self.closed = False
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.backend)
+
+    def data_type(self):
+        return self.backend.data_type()
+
+    def queue(self, target, method, arguments):
+        with self.condition:
+            self.check_process()
+            self.pending.pop(target, None)
+            self.sequence += 1
+            self.pending[target] = (self.sequence, method, arguments)
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.write_in_background,
+                    name='hypothesis-database-writer',
+                )
+                self.thread.daemon = True
+                self.thread.start()
+                live_write_behind_backends[id(self)] = self
+            self.condition.notify_all()
+            while len(self.pending) > self.max_pending and not self.closed:
+                self.condition.wait()
+
+    def check_process(self):
+        """A forked child has none of our threads and must not write what
+        its parent queued, as the parent will do that itself."""
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.pending = {}
+            self.writing = {}
+            self.thread = None
+
+    def write_in_background(self):
+        while True:
+            with self.condition:
+                while not (self.pending or self.closed):
+                    self.condition.wait()
+                if self.closed:
+                    return
+            try:
+                self.write_pending()
+            except Exception as e:
+                with self.condition:
+                    self.error = e
+
+    def write_pending(self):
+        with self.write_lock:
+            with self.condition:
+                self.writing = self.pending
+                self.pending = {}
+                self.condition.notify_all()
+            try:
+                with self.backend.batch():
+                    for _, method, arguments in sorted(self.writing.values()):
+                        getattr(self.backend, method)(*arguments)
+            finally:
+                with self.condition:
+                    self.writing = {}
+
+    def flush(self):
+        """Write everything queued so far, raising any error the background
+        thread has hit."""
+        with self.condition:
+            self.check_process()
+            error = self.error
+            self.error = None
+        if error is not None:
+            raise error
+        self.write_pending()
+
+    def save(self, key, value):
+        self.queue(('value', key, value), 'save', (key, value))
+
+    def delete(self, key, value):
+        with self.condition:
+            self.pending.pop(('touch', key, value), None)
+        self.queue(('value', key, value), 'delete', (key, value))
+
+    def touch(self, key, value):
+        self.queue(('touch', key, value), 'touch', (key, value))
+
+    def evict(self, key, keep):
+        self.queue(('evict', key), 'evict', (key, keep))
+
+    def compact(self, max_size=None):
+        self.flush()
+        return self.backend.compact(max_size=max_size)
+
+    def keys(self):
+        self.flush()
+        return self.backend.keys()
+
+    def fetch(self, key):
+        return self.fetch_ordered(key)
+
+    def fetch_ordered(self, key, order=None, limit=None):
+        check_order(order)
+        if order == 'smallest':
+            self.flush()
+            return self.backend.fetch_ordered(key, order=order, limit=limit)
+        return islice(self.fetch_with_queued_writes(key, order), limit)
+
+    def fetch_with_queued_writes(self, key, order):
+        with self.condition:
+            queued = sorted(
+                (sequence, method, arguments)
+                for writes in (self.writing, self.pending)
+                for target, (sequence, method, arguments) in writes.items()
+                if target[0] == 'value' and target[1] == key
+            )
+        # Later writes take precedence, and the most recently saved values
+        # come first.
+        saved = []
+        overridden = set()
+        for _, method, (_, value) in reversed(queued):
+            if value in overridden:
+                continue
+            overridden.add(value)
+            if method == 'save':
+                saved.append(value)
+        for value in saved:
+            yield value
+        for value in self.backend.fetch_ordered(key, order=order):
+            if value not in overridden:
+                yield value
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+            thread = self.thread
+            self.thread = None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        try:
+            self.flush()
+        finally:
+            self.closed = False
+            live_write_behind_backends.pop(id(self), None)
+            self.backend.close()
+
+
+live_write_behind_backends = weakref.WeakValueDictionary()
+
+
+@atexit.register
+def flush_write_behind_backends():
+    for backend in list(live_write_behind_backends.values()):
+        backend.flush()
+
+
+# Temporary files older than this many seconds are assumed to have been
+# abandoned.
+STALE_TEMPORARY_FILE_AGE = 60 * 60
+
+
+# The name of the file each key's directory stores the key in. This can never
+# be the name of a value's file, which is always a 40 character digest.
+KEY_FILE_NAME = 'key'
+
+
+def is_value_file_name(name):
+    return name[0] != '.' and name != KEY_FILE_NAME
+
+
+def list_directory(path):
+    """Return the names in the directory at path, or [] if there is no such
+    directory."""
+    try:
+        return os.listdir(path)
+    except OSError as e:
+        if e.errno not in (errno.ENOENT, errno.ENOTDIR):
+            raise
+        return []
+
+
+def write_atomically(path, data):
+    """Write data to a temporary file and then rename it to path, so nothing
+    ever sees a partially written file."""
+    fd, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix='.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        try:
+            os.rename(temp_path, path)
+        except OSError:
+            # On Windows rename will not replace an existing file, but if
+            # another process got there first there is nothing to do.
+            if not os.path.exists(path):
+                raise
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+
+def remove_if_present(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def check_order(order):
+    if order not in (None, 'recent', 'smallest'):
+        raise ValueError('Unknown order %r' % (order,))
+
+
+# The sqlite3 module caches prepared statements per connection keyed on
+# their text, so each backend builds its queries once and always uses the
+# same strings.
+RESAVE = """
+    update %(table)s
+    set saved_at = ?
+    where key = ? and value = ?
+"""
+
+SAVE = """
+    insert or ignore into %(table)s(key, value, size, saved_at)
+    values(?, ?, ?, ?)
+"""
+
+DELETE = """
+    delete from %(table)s
+    where key = ? and value = ?
+"""
+
+TOUCH = """
+    update %(table)s
+    set hits = hits + 1, last_hit = ?
+    where key = ? and value = ?
+"""
+
+# The order in which values are evicted, least valuable first.
+EVICTION_ORDER = 'max(saved_at, last_hit) %(direction)s, hits %(direction)s'
+
+EVICT = """
+    delete from %%(table)s
+    where key = ? and rowid not in (
+        select rowid from %%(table)s
+        where key = ?
+        order by %s, rowid desc
+        limit ?
+    )
+""" % (EVICTION_ORDER % {'direction': 'desc'},)
+
+TOTAL_SIZE = """
+    select sum(size) from %(table)s
+"""
+
+LEAST_VALUABLE = """
+    select rowid, size from %%(table)s
+    order by %s, rowid asc
+""" % (EVICTION_ORDER % {'direction': 'asc'},)
+
+PAGE_SIZE = 100
+
+# The column to sort by for each order, and in which direction. Ties are
+# broken by rowid in the same direction.
+PAGE_ORDERS = {
+    # Without an order we might as well use one that has an index.
+    None: ('saved_at', 'asc'),
+    'recent': ('saved_at', 'desc'),
+    'smallest': ('size', 'asc'),
+}
+
+
+def paged_query(table, sort_column, direction):
+    """Returns a triple of two queries and a function for fetching values for
+    a key from table sorted by sort_column and then rowid, in the given
+    direction.
+
+    The first query fetches the first page and takes the arguments (key,
+    page_size). The second fetches the page following a row, taking (key,
+    *position, page_size) where position is the result of calling the
+    function on the last row of the previous page.
+
+    """
+    comparison = '>' if direction == 'asc' else '<'
+    select = """
+        select value, %(column)s, rowid from %(table)s
+        where key = ? %(after)s
+        order by %(column)s %(direction)s, rowid %(direction)s
+        limit ?
+    """
+    after = (
+        'and (%(column)s %(cmp)s ? or '
+        '(%(column)s = ? and rowid %(cmp)s ?))'
+    ) % {'column': sort_column, 'cmp': comparison}
+    arguments = {
+        'table': table, 'column': sort_column, 'direction': direction,
+    }
+    return (
+        select % dict(arguments, after=''),
+        select % dict(arguments, after=after),
+        lambda row: (row[1], row[1], row[2]),
+    )
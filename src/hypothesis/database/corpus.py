@@ -0,0 +1,254 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+"""Exporting the contents of an example database to an archive, importing
+archives into a database, and pruning keys that are no longer used.
+
+An archive is a stream of (key, basic data) records, so is independent of
+the format and backend of the database it came from. It is either JSON
+lines, with a header line followed by one record per line, or binary,
+with a header followed by each record as its length and its BinaryFormat
+encoding.
+
+These are also available from the command line:
+
+    python -m hypothesis.database.corpus export DATABASE ARCHIVE [--binary]
+    python -m hypothesis.database.corpus import DATABASE ARCHIVE...
+    python -m hypothesis.database.corpus prune DATABASE KEYS_FILE
+
+where DATABASE is a path as for the database_file setting and KEYS_FILE
+lists the keys to keep, one per line.
+
+"""
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+import os
+import sys
+import json
+
+from hypothesis.errors import BadData
+from hypothesis.database import ExampleDatabase
+from hypothesis.database.backend import SQLiteBackend, DirectoryBackend
+from hypothesis.database.formats import BinaryFormat, write_varint, \
+    read_stream_varint
+from hypothesis.internal.compat import text_type, binary_type
+
+CORPUS_VERSION = 1
+
+BINARY_HEADER = b'\x00hypothesis-corpus\x01'
+
+JSON_HEADER_FIELD = 'hypothesis-corpus'
+
+METADATA_PREFIX = 'hypothesis-metadata:'
+
+
+def iter_examples(database):
+    """Yield a (key, basic data) pair for everything saved in database,
+    skipping anything that can't be read."""
+    for key in database.backend.keys():
+        for data in database.backend.fetch(key):
+            try:
+                yield key, database.format.deserialize_data(data)
+            except BadData:
+                continue
+
+
+def export_corpus(database, stream, binary=False):
+    """Write everything saved in database to the binary file object stream as
+    an archive, returning the number of records written."""
+    count = 0
+    if binary:
+        format = BinaryFormat()
+        stream.write(BINARY_HEADER)
+        for key, value in iter_examples(database):
+            encoded = format.serialize_basic([key, value])
+            length = bytearray()
+            write_varint(length, len(encoded))
+            stream.write(binary_type(length))
+            stream.write(encoded)
+            count += 1
+    else:
+        stream.write(json_line({JSON_HEADER_FIELD: CORPUS_VERSION}))
+        for key, value in iter_examples(database):
+            stream.write(json_line({'key': key, 'value': value}))
+            count += 1
+    return count
+
+
+def json_line(value):
+    return (json.dumps(value, sort_keys=True) + '\n').encode('utf-8')
+
+
+def read_corpus(stream):
+    """Yield the (key, basic data) records of the archive in the binary file
+    object stream."""
+    header = stream.read(len(BINARY_HEADER))
+    if header == BINARY_HEADER:
+        return read_binary_corpus(stream)
+    return read_json_corpus(header + stream.readline(), stream)
+
+
+def read_binary_corpus(stream):
+    format = BinaryFormat()
+    while True:
+        try:
+            length = read_stream_varint(stream)
+        except EOFError:
+            raise BadData('Truncated archive')
+        if length is None:
+            return
+        encoded = stream.read(length)
+        if len(encoded) != length:
+            raise BadData('Truncated archive')
+        record = format.deserialize_data(encoded)
+        yield check_record(record)
+
+
+def read_json_corpus(first_line, stream):
+    try:
+        header = json.loads(first_line.decode('utf-8'))
+    except ValueError:
+        header = None
+    if not (
+        isinstance(header, dict) and
+        header.get(JSON_HEADER_FIELD) == CORPUS_VERSION
+    ):
+        raise BadData('Not a Hypothesis corpus archive')
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line.decode('utf-8'))
+            record = [record['key'], record['value']]
+        except (ValueError, TypeError, KeyError):
+            raise BadData('Invalid record %r' % (line,))
+        yield check_record(record)
+
+
+def check_record(record):
+    if not (
+        isinstance(record, list) and len(record) == 2 and
+        isinstance(record[0], text_type)
+    ):
+        raise BadData('Invalid record %r' % (record,))
+    return tuple(record)
+
+
+def import_corpus(database, *streams):
+    """Save every record in the archives in streams to database, returning the
+    number of records read. Records already in database, or in more than one
+    archive, are only saved once."""
+    count = 0
+    with database.backend.batch():
+        for stream in streams:
+            for key, value in read_corpus(stream):
+                database.backend.save(
+                    key, database.format.serialize_basic(value))
+                count += 1
+    return count
+
+
+def base_key(key):
+    """The key of the examples that key holds metadata for, or key itself if
+    it is not a metadata key."""
+    if key.startswith(METADATA_PREFIX):
+        return key[len(METADATA_PREFIX):].split(':', 1)[-1]
+    return key
+
+
+def prune(database, live_keys):
+    """Delete everything saved in database under keys other than live_keys,
+    keeping metadata for live keys. Returns the number of values deleted.
+
+    Every storage that database hands out records its key in
+    database.used_keys, so after running a whole test suite that is the
+    set of keys the suite still uses. The hypothesis-pytest plugin's
+    --hypothesis-used-keys option writes these to a file at the end of a
+    run, which can be passed to the prune command as its KEYS_FILE.
+
+    """
+    live_keys = set(live_keys)
+    deleted = 0
+    with database.backend.batch():
+        for key in list(database.backend.keys()):
+            if base_key(key) in live_keys:
+                continue
+            for data in list(database.backend.fetch(key)):
+                database.backend.delete(key, data)
+                deleted += 1
+    return deleted
+
+
+def write_keys(stream, keys):
+    """Write keys to the binary file object stream, one per line, as a
+    KEYS_FILE for prune."""
+    for key in sorted(keys):
+        stream.write((key + '\n').encode('utf-8'))
+
+
+def read_keys(stream):
+    """Return the keys listed in the binary file object stream, as written by
+    write_keys."""
+    return [line.decode('utf-8').strip() for line in stream if line.strip()]
+
+
+def database_at(path):
+    """An ExampleDatabase for path, as the database_file setting would
+    create."""
+    if os.path.isdir(path):
+        backend = DirectoryBackend(path)
+    else:
+        backend = SQLiteBackend(path)
+    return ExampleDatabase(backend=backend)
+
+
+USAGE = __doc__[__doc__.index('    python -m'):__doc__.index('\n\nwhere')]
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    binary = '--binary' in argv
+    argv = [a for a in argv if a != '--binary']
+    if len(argv) < 3 or argv[0] not in ('export', 'import', 'prune') or (
+        argv[0] != 'import' and len(argv) != 3
+    ):
+        print('Usage:\n' + USAGE, file=sys.stderr)
+        return 1
+    command, path, files = argv[0], argv[1], argv[2:]
+    database = database_at(path)
+    try:
+        if command == 'export':
+            with open(files[0], 'wb') as stream:
+                count = export_corpus(database, stream, binary=binary)
+            print('Exported %d examples' % (count,))
+        elif command == 'import':
+            streams = [open(f, 'rb') for f in files]
+            try:
+                count = import_corpus(database, *streams)
+            finally:
+                for stream in streams:
+                    stream.close()
+            print('Imported %d examples' % (count,))
+        else:
+            with open(files[0], 'rb') as f:
+                live_keys = read_keys(f)
+            count = prune(database, live_keys)
+            print('Pruned %d examples' % (count,))
+    finally:
+        database.close()
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -25,9 +25,12 @@ from __future__ import division, print_function, absolute_import, \
     unicode_literals
 
 import json
+import zlib
 from abc import abstractmethod
 
-from hypothesis.internal.compat import text_type
+from hypothesis.errors import BadData
+from hypothesis.internal.compat import hrange, text_type, binary_type, \
+    decode_utf8, encode_utf8, integer_types
 
 
 class Format(object):
@@ -69,3 +72,204 @@ class JSONFormat(Format):
 
     def deserialize_data(self, data):
         return json.loads(data)
+
+
+# Tags for each kind of basic data in BinaryFormat. Small ints and short
+# texts and lists, which make up most of a typical template, have their
+# value or length packed into the low bits of the tag byte.
+NONE = 0
+FALSE = 1
+TRUE = 2
+NON_NEGATIVE_INT = 3
+NEGATIVE_INT = 4
+TEXT = 5
+LIST = 6
+SHORT_TEXT = 0x20  # 0x20 to 0x3f: text of up to 31 bytes.
+SMALL_INT = 0x40  # 0x40 to 0x7f: ints from 0 to 63.
+SHORT_LIST = 0x80  # 0x80 to 0xbf: lists of up to 63 elements.
+
+UNCOMPRESSED = 0
+COMPRESSED = 1
+
+
+def write_varint(buffer, n):
+    """Append the non-negative integer n to buffer as a little endian base 128
+    varint."""
+    assert n >= 0
+    while True:
+        low = n & 0x7f
+        n >>= 7
+        if n:
+            buffer.append(low | 0x80)
+        else:
+            buffer.append(low)
+            return
+
+
+def read_varint(data, i):
+    """Read a varint from data starting at index i, returning it and the index
+    just past its end."""
+    result = 0
+    shift = 0
+    while True:
+        try:
+            byte = data[i]
+        except IndexError:
+            raise BadData('Truncated varint')
+        i += 1
+        result |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return result, i
+        shift += 7
+
+
+def read_stream_varint(stream):
+    """Read a varint from the binary file object stream, returning None if
+    the stream ends before the varint starts."""
+    result = 0
+    shift = 0
+    while True:
+        byte = stream.read(1)
+        if not byte:
+            if shift:
+                raise EOFError('Truncated varint')
+            return None
+        byte = bytearray(byte)[0]
+        result |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return result
+        shift += 7
+
+
+def write_basic(buffer, value):
+    if value is None:
+        buffer.append(NONE)
+    elif value is False:
+        buffer.append(FALSE)
+    elif value is True:
+        buffer.append(TRUE)
+    elif isinstance(value, integer_types):
+        if 0 <= value < 64:
+            buffer.append(SMALL_INT | value)
+        elif value >= 0:
+            buffer.append(NON_NEGATIVE_INT)
+            write_varint(buffer, value)
+        else:
+            buffer.append(NEGATIVE_INT)
+            write_varint(buffer, -1 - value)
+    elif isinstance(value, text_type):
+        encoded = encode_utf8(value)
+        if len(encoded) < 32:
+            buffer.append(SHORT_TEXT | len(encoded))
+        else:
+            buffer.append(TEXT)
+            write_varint(buffer, len(encoded))
+        buffer.extend(encoded)
+    elif isinstance(value, list):
+        if len(value) < 64:
+            buffer.append(SHORT_LIST | len(value))
+        else:
+            buffer.append(LIST)
+            write_varint(buffer, len(value))
+        for child in value:
+            write_basic(buffer, child)
+    else:
+        raise ValueError('%r is not basic data' % (value,))
+
+
+def read_basic(data, i):
+    try:
+        tag = data[i]
+    except IndexError:
+        raise BadData('Unexpected end of data')
+    i += 1
+    if SMALL_INT <= tag < SMALL_INT + 64:
+        return tag - SMALL_INT, i
+    if SHORT_TEXT <= tag < SHORT_TEXT + 32:
+        return read_text(data, i, tag - SHORT_TEXT)
+    if SHORT_LIST <= tag < SHORT_LIST + 64:
+        return read_list(data, i, tag - SHORT_LIST)
+    if tag == NONE:
+        return None, i
+    if tag == FALSE:
+        return False, i
+    if tag == TRUE:
+        return True, i
+    if tag == NON_NEGATIVE_INT:
+        return read_varint(data, i)
+    if tag == NEGATIVE_INT:
+        n, i = read_varint(data, i)
+        return -1 - n, i
+    if tag == TEXT:
+        length, i = read_varint(data, i)
+        return read_text(data, i, length)
+    if tag == LIST:
+        length, i = read_varint(data, i)
+        return read_list(data, i, length)
+    raise BadData('Unknown tag %d' % (tag,))
+
+
+def read_text(data, i, length):
+    if i + length > len(data):
+        raise BadData('Truncated text')
+    try:
+        text = decode_utf8(binary_type(data[i:i + length]))
+    except UnicodeDecodeError:
+        raise BadData('Invalid UTF-8 in text')
+    return text, i + length
+
+
+def read_list(data, i, length):
+    if length > len(data) - i:
+        # Every element takes at least one byte.
+        raise BadData('Truncated list')
+    result = []
+    for _ in hrange(length):
+        child, i = read_basic(data, i)
+        result.append(child)
+    return result, i
+
+
+class BinaryFormat(Format):
+
+    """A compact binary encoding of basic data.
+
+    Each value is a one byte tag followed by its contents, with integers
+    and lengths that do not fit in the tag written as base 128 varints.
+    Encodings of at least compression_threshold bytes are zlib compressed if
+    that makes them smaller. A leading byte records whether it did.
+
+    """
+
+    def __init__(self, compression_threshold=1024):
+        self.compression_threshold = compression_threshold
+
+    def data_type(self):
+        return binary_type
+
+    def serialize_basic(self, value):
+        buffer = bytearray()
+        write_basic(buffer, value)
+        if len(buffer) >= self.compression_threshold:
+            compressed = zlib.compress(binary_type(buffer))
+            if len(compressed) + 1 < len(buffer):
+                return binary_type(bytearray((COMPRESSED,)) + compressed)
+        return binary_type(bytearray((UNCOMPRESSED,)) + buffer)
+
+    def deserialize_data(self, data):
+        data = bytearray(data)
+        if not data:
+            raise BadData('No data')
+        if data[0] == COMPRESSED:
+            try:
+                data = bytearray(zlib.decompress(binary_type(data[1:])))
+            except zlib.error:
+                raise BadData('Invalid compressed data')
+        elif data[0] == UNCOMPRESSED:
+            data = data[1:]
+        else:
+            raise BadData('Unknown encoding %d' % (data[0],))
+        value, i = read_basic(data, 0)
+        if i != len(data):
+            raise BadData('Trailing data after value')
+        return value
@@ -0,0 +1,154 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+"""Keys under which examples for a specifier are saved in the database.
+
+A key is a digest of the structure of the specifier, prefixed with a
+version number which must be bumped whenever the way we compute the digest
+changes.
+
+"""
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+import types
+import hashlib
+
+import hypothesis.internal.reflection as reflection
+from hypothesis.utils.show import show
+from hypothesis.utils.idkey import IdentitySet
+from hypothesis.internal.compat import text_type, binary_type, \
+    encode_utf8, integer_types
+from hypothesis.searchstrategy.strategies import SearchStrategy
+
+KEY_VERSION = 1
+
+
+def database_key(specifier, strategy=None):
+    """Return the key to save examples for specifier under.
+
+    If strategy is provided it must be the strategy for specifier. The key
+    is then cached on it, so each strategy only ever has its key computed
+    once.
+
+    """
+    try:
+        return strategy.database_key
+    except AttributeError:
+        pass
+    key = 'v%d:%s' % (KEY_VERSION, digest(specifier, IdentitySet()))
+    if strategy is not None:
+        strategy.database_key = key
+    return key
+
+
+def legacy_database_key(specifier):
+    """The key that versions of Hypothesis before keys were versioned saved
+    examples for specifier under."""
+    return show(specifier)
+
+
+def digest(value, seen):
+    """Return a hex digest of the structure of value.
+
+    Every part of the structure is tagged and length prefixed so that
+    different structures never digest the same input. Sets and dicts are
+    digested in an order that does not depend on their iteration order.
+    Functions are digested by their name and their code, so that lambdas,
+    which all share a name, still get distinct digests.
+    Strategies, and other objects with a custom repr, are digested by that
+    repr, as show would describe them. A strategy's attributes are no good
+    for this: besides its arguments they hold caches and other state that
+    it fills in as it is used, whereas its repr only describes the arguments
+    it was built from.
+
+    """
+    hasher = hashlib.sha1()
+
+    def write(tag, data=''):
+        if isinstance(data, text_type):
+            data = encode_utf8(data)
+        hasher.update(('%s%d:' % (tag, len(data))).encode('ascii'))
+        hasher.update(data)
+
+    t = type(value)
+    if value is None or t is bool:
+        write('c', repr(value))
+    elif t in integer_types:
+        write('i', '%d' % (value,))
+    elif t in (float, complex):
+        write('f', repr(value))
+    elif t is text_type:
+        write('t', value)
+    elif t is binary_type:
+        write('b', value)
+    elif isinstance(value, type):
+        write('y', qualified_name(value))
+    elif value in seen:
+        write('r')
+    else:
+        seen.add(value)
+        try:
+            for tag, data in object_structure(value, seen):
+                write(tag, data)
+        finally:
+            seen.remove(value)
+    return hasher.hexdigest()
+
+
+def object_structure(value, seen):
+    t = type(value)
+    if isinstance(value, SearchStrategy):
+        yield 's', repr(value)
+    elif isinstance(value, (list, tuple)):
+        yield 'l', qualified_name(t)
+        for child in value:
+            yield 'e', digest(child, seen)
+    elif isinstance(value, (set, frozenset)):
+        yield 'u', qualified_name(t)
+        for child in sorted(digest(c, seen) for c in value):
+            yield 'e', child
+    elif isinstance(value, dict):
+        yield 'd', qualified_name(t)
+        for item in sorted(
+            digest(k, seen) + digest(v, seen) for k, v in value.items()
+        ):
+            yield 'e', item
+    elif isinstance(value, types.CodeType):
+        yield 'x', value.co_code
+        yield 'i', '%d' % (value.co_firstlineno,)
+        for child in value.co_consts:
+            yield 'e', digest(child, seen)
+    elif hasattr(value, '__code__'):
+        yield 'n', qualified_name(value)
+        yield 'e', digest(value.__code__, seen)
+    elif not hasattr(value, '__dict__') or (
+        reflection.unbind_method(t.__repr__) !=
+        reflection.unbind_method(object.__repr__)
+    ):
+        if hasattr(value, '__name__'):
+            yield 'n', qualified_name(value)
+        else:
+            yield 'o', show(value)
+    else:
+        yield 'a', qualified_name(t)
+        for name, child in sorted(value.__dict__.items()):
+            yield 'k', name
+            yield 'e', digest(child, seen)
+
+
+def qualified_name(value):
+    return '%s.%s' % (
+        getattr(value, '__module__', None),
+        getattr(value, '__qualname__', value.__name__),
+    )
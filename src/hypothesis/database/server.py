@@ -0,0 +1,466 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+"""Sharing an example database between machines over a socket.
+
+An ExampleDatabaseServer serves a backend storing binary data to any number
+of SocketBackend clients, over TCP or a Unix socket. Run one with:
+
+    python -m hypothesis.database.server examples.db host:port
+
+or with a path instead of host:port to listen on a Unix socket.
+
+Requests and responses are both messages: A varint count of fields followed
+by each field as a varint length and that many bytes. A request's fields
+are the name of a Backend method, the key, and then that method's other
+arguments, with numbers written in decimal and None as an empty field. The
+response to a fetch is 'ok' followed by the values fetched, and to anything
+else is 'ok' followed by its result, if any. If a request fails the
+response is 'error' followed by a description of what went wrong.
+
+Responses are sent in the order the requests were received in, so clients
+can pipeline requests, sending several before reading any responses.
+
+"""
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+import os
+import sys
+import time
+import socket
+import threading
+from contextlib import contextmanager
+
+from hypothesis.errors import DatabaseServerError
+from hypothesis.database.backend import Backend, BinarySQLiteBackend, \
+    check_order
+from hypothesis.database.formats import write_varint, read_stream_varint
+from hypothesis.internal.compat import text_type, binary_type
+
+try:
+    import socketserver
+except ImportError:  # pragma: no cover
+    import SocketServer as socketserver
+
+OK = b'ok'
+ERROR = b'error'
+
+# Commands which leave the database in the same state however many times
+# they are run. A touch counts a hit each time, so is not one of them.
+REPEATABLE_COMMANDS = frozenset((
+    b'save', b'delete', b'evict', b'compact', b'keys', b'fetch',
+))
+
+
+def encode_message(fields):
+    buffer = bytearray()
+    write_varint(buffer, len(fields))
+    for field in fields:
+        write_varint(buffer, len(field))
+        buffer.extend(field)
+    return binary_type(buffer)
+
+
+def read_message(stream):
+    """Read a message from stream, returning None if the stream ends before
+    the message starts."""
+    count = read_stream_varint(stream)
+    if count is None:
+        return None
+    fields = []
+    for _ in range(count):
+        length = read_stream_varint(stream)
+        field = stream.read(length) if length else b''
+        if length is None or len(field) != length:
+            raise EOFError('Truncated message')
+        fields.append(field)
+    return fields
+
+
+def encode_number(n):
+    if n is None:
+        return b''
+    return ('%d' % (n,)).encode('ascii')
+
+
+def decode_number(field):
+    if not field:
+        return None
+    return int(field.decode('ascii'))
+
+
+def encode_text(text):
+    if text is None:
+        return b''
+    return text.encode('utf-8')
+
+
+def decode_text(field):
+    if not field:
+        return None
+    return field.decode('utf-8')
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        while True:
+            try:
+                request = read_message(self.rfile)
+            except EOFError:
+                return
+            if request is None:
+                return
+            response = self.server.database_server.respond(request)
+            try:
+                self.wfile.write(encode_message(response))
+            except socket.error:
+                # The client has gone away.
+                return
+
+
+class ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+if hasattr(socketserver, 'ThreadingUnixStreamServer'):
+    class ThreadingUnixStreamServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+class ExampleDatabaseServer(object):
+
+    """Serves requests for backend on address, which is either a (host, port)
+    pair to listen on with TCP or the path of a Unix socket to create.
+
+    Each connection is handled in its own thread, so backend must be safe
+    to use from several threads at once, as SQLiteBackend is.
+
+    """
+
+    def __init__(self, backend, address):
+        if backend.data_type() != binary_type:
+            raise ValueError(
+                'Can only serve backends storing binary data, but %r stores '
+                '%s' % (backend, backend.data_type()))
+        self.backend = backend
+        if isinstance(address, tuple):
+            self.server = ThreadingTCPServer(address, RequestHandler)
+        else:
+            self.server = ThreadingUnixStreamServer(address, RequestHandler)
+        self.server.database_server = self
+        self.thread = None
+
+    def __repr__(self):
+        return '%s(%r, %r)' % (
+            self.__class__.__name__, self.backend, self.address)
+
+    @property
+    def address(self):
+        """The address clients should connect to."""
+        return self.server.server_address
+
+    def respond(self, request):
+        try:
+            method = request[0].decode('ascii')
+            key = request[1].decode('utf-8')
+            arguments = request[2:]
+            if method in ('save', 'delete', 'touch'):
+                value, = arguments
+                getattr(self.backend, method)(key, value)
+                return [OK]
+            if method == 'evict':
+                keep, = arguments
+                self.backend.evict(key, decode_number(keep))
+                return [OK]
+            if method == 'fetch':
+                order, limit = arguments
+                return [OK] + list(self.backend.fetch_ordered(
+                    key, order=decode_text(order),
+                    limit=decode_number(limit)))
+            if method == 'keys':
+                return [OK] + [k.encode('utf-8') for k in self.backend.keys()]
+            if method == 'compact':
+                max_size, = arguments
+                return [OK, encode_number(self.backend.compact(
+                    max_size=decode_number(max_size)))]
+            raise ValueError('Unknown method %r' % (method,))
+        except Exception as e:
+            return [ERROR, ('%s: %s' % (type(e).__name__, e)).encode('utf-8')]
+
+    def serve_forever(self, poll_interval=0.5):
+        """Serve requests until shutdown() is called from another thread,
+        which may take up to poll_interval seconds to notice."""
+        self.server.serve_forever(poll_interval=poll_interval)
+
+    def serve_in_background(self, poll_interval=0.05):
+        """Start serving requests in a daemon thread."""
+        self.thread = threading.Thread(
+            target=self.serve_forever, args=(poll_interval,),
+            name='hypothesis-database-server')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def shutdown(self):
+        """Stop serving requests and close the backend."""
+        if self.thread is not None:
+            self.server.shutdown()
+            self.thread.join()
+            self.thread = None
+        self.server.server_close()
+        if not isinstance(self.address, tuple):
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+        self.backend.close()
+
+
+class Connection(object):
+
+    def __init__(self, address):
+        if isinstance(address, tuple):
+            self.socket = socket.create_connection(address)
+            self.socket.setsockopt(
+                socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.connect(address)
+        self.stream = self.socket.makefile('rb')
+
+    def request_many(self, requests):
+        self.socket.sendall(b''.join(map(encode_message, requests)))
+        responses = []
+        for _ in requests:
+            response = read_message(self.stream)
+            if response is None:
+                raise EOFError('Connection closed by server')
+            responses.append(response)
+        return responses
+
+    def close(self):
+        self.stream.close()
+        self.socket.close()
+
+
+class SocketBackend(Backend):
+
+    """A Backend storing binary data in an ExampleDatabaseServer listening on
+    address.
+
+    Up to pool_size connections are kept open for reuse. Inside a batch()
+    block saves and deletes are buffered and sent together, without waiting
+    for a response to each, when the outermost block exits or a fetch needs
+    to see them. fetch_many fetches several keys in the same way.
+
+    Fetched values are cached for cache_ttl seconds, so values other clients
+    save in that time may not be seen. Writing to a key through this
+    backend clears its cache.
+
+    """
+
+    def __init__(self, address, pool_size=4, cache_ttl=1.0):
+        self.address = address
+        self.pool_size = pool_size
+        self.cache_ttl = cache_ttl
+        self.lock = threading.RLock()
+        self.pool = []
+        self.pid = os.getpid()
+        self.batch_depth = 0
+        self.pending = []
+        self.cache = {}
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.address)
+
+    def data_type(self):
+        return binary_type
+
+    def acquire(self):
+        """Return an idle connection, and whether it was reused."""
+        with self.lock:
+            if self.pid != os.getpid():
+                # Connections inherited over a fork are still in use by our
+                # parent.
+                self.pid = os.getpid()
+                self.pool = []
+            if self.pool:
+                return self.pool.pop(), True
+        return Connection(self.address), False
+
+    def release(self, connection):
+        with self.lock:
+            if len(self.pool) < self.pool_size:
+                self.pool.append(connection)
+                return
+        connection.close()
+
+    def request_many(self, requests):
+        """Send requests, all at once, and return the fields of each
+        response after the status."""
+        if not requests:
+            return []
+        repeatable = all(
+            request[0] in REPEATABLE_COMMANDS for request in requests)
+        while True:
+            connection, reused = self.acquire()
+            try:
+                responses = connection.request_many(requests)
+            except (EOFError, socket.error):
+                connection.close()
+                # The server may have closed an idle connection, in which
+                # case a new one should work. But it may also have failed
+                # after running some of the requests, so we can only send
+                # them again if that would do no harm.
+                if reused and repeatable:
+                    continue
+                raise
+            self.release(connection)
+            break
+        for response in responses:
+            if response[0] != OK:
+                raise DatabaseServerError(
+                    response[1].decode('utf-8', 'replace'))
+        return [response[1:] for response in responses]
+
+    @contextmanager
+    def batch(self):
+        with self.lock:
+            self.batch_depth += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.batch_depth -= 1
+                if not self.batch_depth:
+                    self.flush()
+
+    def write(self, key, request):
+        with self.lock:
+            self.cache.pop(key, None)
+            self.pending.append(request)
+            if not self.batch_depth:
+                self.flush()
+
+    def flush(self):
+        """Send all buffered saves and deletes."""
+        with self.lock:
+            pending = self.pending
+            self.pending = []
+            self.request_many(pending)
+
+    def save(self, key, value):
+        self.write(key, [b'save', encode_text(key), value])
+
+    def delete(self, key, value):
+        self.write(key, [b'delete', encode_text(key), value])
+
+    def touch(self, key, value):
+        self.write(key, [b'touch', encode_text(key), value])
+
+    def evict(self, key, keep):
+        self.write(key, [b'evict', encode_text(key), encode_number(keep)])
+
+    def compact(self, max_size=None):
+        with self.lock:
+            self.flush()
+            self.cache.clear()
+        result, = self.request_many(
+            [[b'compact', b'', encode_number(max_size)]])
+        return decode_number(result[0])
+
+    def keys(self):
+        self.flush()
+        result, = self.request_many([[b'keys', b'']])
+        return iter([k.decode('utf-8') for k in result])
+
+    def fetch(self, key):
+        return self.fetch_ordered(key)
+
+    def fetch_ordered(self, key, order=None, limit=None):
+        return iter(self.fetch_many([key], order=order, limit=limit)[key])
+
+    def fetch_many(self, keys, order=None, limit=None):
+        """Return a dict mapping each of keys to a list of the values
+        fetch_ordered would return for it, fetching all those that are not
+        cached at once."""
+        check_order(order)
+        now = time.time()
+        result = {}
+        with self.lock:
+            self.flush()
+            for key in keys:
+                try:
+                    fetched_at, values = self.cache[key][(order, limit)]
+                except KeyError:
+                    continue
+                if fetched_at + self.cache_ttl >= now:
+                    result[key] = values
+        missing = [key for key in keys if key not in result]
+        responses = self.request_many([
+            [b'fetch', encode_text(key), encode_text(order),
+             encode_number(limit)]
+            for key in missing
+        ])
+        with self.lock:
+            for key, values in zip(missing, responses):
+                self.cache.setdefault(key, {})[(order, limit)] = (
+                    now, values)
+                result[key] = values
+        return result
+
+    def close(self):
+        with self.lock:
+            self.flush()
+            pool = self.pool
+            self.pool = []
+            self.cache.clear()
+        for connection in pool:
+            connection.close()
+
+
+def parse_address(address):
+    """Parse host:port into a TCP address, or anything else into the path of
+    a Unix socket."""
+    host, _, port = address.rpartition(':')
+    if host and port.isdigit():
+        return (host, int(port))
+    return address
+
+
+def main(argv=None):
+    """Serve the example database at the path given as the first argument on
+    the address given as the second."""
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print(
+            'Usage: python -m hypothesis.database.server PATH ADDRESS',
+            file=sys.stderr)
+        return 1
+    path, address = argv
+    server = ExampleDatabaseServer(
+        BinarySQLiteBackend(path), parse_address(text_type(address)))
+    print('Serving %s on %s' % (path, server.address))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -138,3 +138,9 @@ class AbnormalExit(HypothesisException):
 
     """Raised when a test running in a child process exits without returning or
     raising an exception."""
+
+
+class DatabaseServerError(HypothesisException):
+
+    """Raised when an example database server reports that it could not handle
+    a request."""
@@ -10,20 +10,236 @@
 
 # END HEADER
 
+"""Packages that provide hypothesis.extra modules register themselves with
+a 'hypothesis.extra' entry point.
+
+Finding those entry points means importing pkg_resources, which is slow, so
+the results are cached in a manifest in the Hypothesis storage directory
+along with a fingerprint of sys.path. None of this happens when Hypothesis
+is imported: the manifest is only read (or rebuilt, if the fingerprint no
+longer matches) the first time strategy() is asked for a specifier it does
+not know how to handle, or a module under hypothesis.extra that is not in
+this package is imported. That adds the directories listed in the manifest
+to our __path__ so that the hypothesis.extra modules can be found, and
+load_entry_points then loads the packages themselves.
+
+"""
+
 from __future__ import division, print_function, unicode_literals
 
-import pkg_resources
+import os
+import sys
+import json
+import pkgutil
+import importlib
 
+from hypothesis.settings import storage_directory
+from hypothesis.internal.compat import text_type, binary_type
+
+MANIFEST_VERSION = 1
+
+str_types = (text_type, binary_type)
 
 loaded = set()
+manifest = []
+initialized = False
 
+# Until the manifest has been read this stands in our __path__ for the
+# directories of the extras it lists, so that looking for a module there
+# is what reads it.
+MANIFEST_PATH_ENTRY = '<hypothesis.extra manifest>'
 
-def load_entry_points(name=None):
+
+def manifest_file():
+    return os.path.join(storage_directory('extras'), 'manifest.json')
+
+
+def path_fingerprint():
+    """A value that changes whenever a package is likely to have been
+    installed or removed somewhere that we would import it from.
+
+    The current directory is left out: it changes all the time, not least
+    because the Hypothesis storage directory usually lives in it.
+
+    """
+    cwd = os.path.abspath(os.curdir)
+    entries = []
+    for entry in sys.path:
+        entry = os.path.abspath(entry or os.curdir)
+        if entry == cwd:
+            continue
+        try:
+            mtime = os.stat(entry).st_mtime
+        except OSError:
+            mtime = None
+        entries.append([entry, mtime])
+    return [MANIFEST_VERSION, sys.version, entries]
+
+
+def read_manifest(path, fingerprint):
+    """Return the entry points listed in the manifest at path, or None if it
+    is missing, unreadable or was written for a different fingerprint."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('fingerprint') != fingerprint:
+        return None
+    entries = data.get('entry_points')
+    if not isinstance(entries, list):
+        return None
+    for entry in entries:
+        try:
+            valid = (
+                isinstance(entry['name'], str_types) and
+                isinstance(entry['module'], str_types) and
+                isinstance(entry['attrs'], list) and
+                isinstance(entry['path'], list)
+            )
+        except (KeyError, TypeError):
+            valid = False
+        if not valid:
+            return None
+    return entries
+
+
+def write_manifest(path, fingerprint, entries):
+    tmp = '%s.%d' % (path, os.getpid())
+    try:
+        with open(tmp, 'w') as f:
+            json.dump({
+                'fingerprint': fingerprint,
+                'entry_points': entries,
+            }, f)
+        os.rename(tmp, path)
+    except (IOError, OSError):
+        pass
+
+
+def scan_entry_points():
+    """Build manifest entries for all installed entry points. This imports
+    the packages they point at, but does not load them."""
+    import pkg_resources
+
+    entries = []
     for entry_point in pkg_resources.iter_entry_points(
-        group='hypothesis.extra', name=name
+        group='hypothesis.extra'
     ):
         package = entry_point.load()  # pragma: no cover
+        entries.append({  # pragma: no cover
+            'name': entry_point.name,
+            'module': entry_point.module_name,
+            'attrs': list(entry_point.attrs),
+            'path': list(getattr(package, '__path__', ())),
+        })
+    return entries
+
+
+def register_entry_points(entries):
+    for entry in entries:
+        manifest.append(entry)
+        for directory in entry['path']:
+            if directory not in __path__:
+                __path__.append(directory)
+
+
+def resolve(entry):
+    package = importlib.import_module(entry['module'])
+    for attr in entry['attrs']:
+        package = getattr(package, attr)
+    return package
+
+
+def load_entry_points(name=None):
+    """Load every registered package (or only those whose entry point is
+    called name) that has not already been loaded. Returns True if this
+    loaded anything."""
+    initialize()
+    any_loaded = False
+    for entry in manifest:
+        if name is not None and entry['name'] != name:
+            continue
+        package = resolve(entry)
         if package not in loaded:
             loaded.add(package)
-            __path__.extend(package.__path__)
             package.load()
+            any_loaded = True
+    return any_loaded
+
+
+def initialize():
+    """Read the manifest, rebuilding it if it is out of date, and register
+    the entry points it lists. Does nothing after the first call."""
+    global initialized
+    if initialized:
+        return
+    initialized = True
+    uninstall_manifest_finder()
+    path = manifest_file()
+    fingerprint = path_fingerprint()
+    entries = read_manifest(path, fingerprint)
+    if entries is None:
+        entries = scan_entry_points()
+        write_manifest(path, fingerprint, entries)
+    register_entry_points(entries)
+
+
+class ManifestFinder(object):
+
+    """The importer for MANIFEST_PATH_ENTRY, which reads the manifest and
+    then looks for modules in the directories of the extras it lists.
+
+    Being an entry in our __path__ rather than a hook on every import means
+    it is only ever asked for modules under hypothesis.extra, and only ones
+    that could not be found in hypothesis/extra itself.
+
+    """
+
+    @classmethod
+    def path_hook(cls, entry):
+        if entry != MANIFEST_PATH_ENTRY:
+            raise ImportError('Not the hypothesis.extra manifest')
+        return cls()
+
+    def importers(self):
+        initialize()
+        for entry in manifest:
+            for directory in entry['path']:
+                importer = pkgutil.get_importer(directory)
+                if importer is not None:
+                    yield importer
+
+    def find_module(self, fullname, path=None):
+        for importer in self.importers():
+            loader = importer.find_module(fullname)
+            if loader is not None:
+                return loader
+        return None
+
+    def find_spec(self, fullname, target=None):
+        for importer in self.importers():
+            spec = importer.find_spec(fullname, target)
+            if spec is not None:
+                return spec
+        return None
+
+
+def install_manifest_finder():
+    if MANIFEST_PATH_ENTRY not in __path__:
+        __path__.append(MANIFEST_PATH_ENTRY)
+    if ManifestFinder.path_hook not in sys.path_hooks:
+        # Other hooks only accept real paths, so it does not matter that we
+        # come last.
+        sys.path_hooks.append(ManifestFinder.path_hook)
+
+
+def uninstall_manifest_finder():
+    while MANIFEST_PATH_ENTRY in __path__:
+        __path__.remove(MANIFEST_PATH_ENTRY)
+    while ManifestFinder.path_hook in sys.path_hooks:
+        sys.path_hooks.remove(ManifestFinder.path_hook)
+    sys.path_importer_cache.pop(MANIFEST_PATH_ENTRY, None)
+
+
+install_manifest_finder()
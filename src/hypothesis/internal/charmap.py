@@ -0,0 +1,204 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+"""A compact index of which codepoints are in each Unicode category, stored
+as ranges of codepoints.
+
+Building it means looking up the category of every codepoint, which takes
+a noticeable fraction of a second, so it is only built the first time it is
+needed and is then saved in the Hypothesis storage directory for the next
+run to load.
+
+"""
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+import os
+import sys
+import json
+import tempfile
+import unicodedata
+from bisect import bisect_right
+
+from hypothesis.errors import InvalidArgument
+from hypothesis.settings import storage_directory
+from hypothesis.internal.compat import hrange, hunichr
+
+CATEGORIES = (
+    'Cc', 'Cf', 'Cn', 'Co', 'Cs',
+    'Ll', 'Lm', 'Lo', 'Lt', 'Lu',
+    'Mc', 'Me', 'Mn',
+    'Nd', 'Nl', 'No',
+    'Pc', 'Pd', 'Pe', 'Pf', 'Pi', 'Po', 'Ps',
+    'Sc', 'Sk', 'Sm', 'So',
+    'Zl', 'Zp', 'Zs',
+)
+
+_charmap = None
+
+_intervals_for_categories = {}
+
+
+def charmap_file():
+    return os.path.join(
+        storage_directory('unicodedata'),
+        'charmap-%s-%d.json' % (unicodedata.unidata_version, sys.maxunicode)
+    )
+
+
+def build_charmap():
+    result = {}
+    category = unicodedata.category
+    start = 0
+    current = category(hunichr(0))
+    for codepoint in hrange(1, sys.maxunicode + 1):
+        c = category(hunichr(codepoint))
+        if c != current:
+            result.setdefault(current, []).append((start, codepoint - 1))
+            start = codepoint
+            current = c
+    result.setdefault(current, []).append((start, sys.maxunicode))
+    return result
+
+
+def load_charmap(path):
+    with open(path) as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError('Invalid charmap file %s' % (path,))
+    result = {}
+    for category, intervals in data.items():
+        result[category] = [(int(u), int(v)) for u, v in intervals]
+    return result
+
+
+def save_charmap(path, data):
+    # Write to a temporary file and move it into place so that other
+    # processes never see a partly written file.
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'w') as f:
+        json.dump(data, f)
+    os.rename(tmp, path)
+
+
+def charmap():
+    """Return a dict mapping each Unicode category present in this version of
+    Python to a tuple of the (start, end) ranges, inclusive and in ascending
+    order, of the codepoints in it."""
+    global _charmap
+    if _charmap is None:
+        path = charmap_file()
+        try:
+            data = load_charmap(path)
+        except (IOError, OSError, ValueError, TypeError):
+            data = build_charmap()
+            try:
+                save_charmap(path, data)
+            except (IOError, OSError):  # pragma: no cover
+                pass
+        _charmap = dict(
+            (category, tuple(map(tuple, intervals)))
+            for category, intervals in data.items()
+        )
+    return _charmap
+
+
+def expand_categories(categories):
+    """Return the frozenset of the categories named by categories, where a
+    single letter such as 'L' names every category starting with it."""
+    result = set()
+    for name in categories:
+        matching = [c for c in CATEGORIES if c.startswith(name)]
+        if not name or len(name) > 2 or not matching:
+            raise InvalidArgument('Unknown Unicode category %r' % (name,))
+        result.update(matching)
+    return frozenset(result)
+
+
+def intervals_for_categories(categories):
+    """Return an IntervalSet of every codepoint in any of categories, as
+    expanded by expand_categories."""
+    categories = expand_categories(categories)
+    try:
+        return _intervals_for_categories[categories]
+    except KeyError:
+        pass
+    table = charmap()
+    intervals = []
+    for category in categories:
+        intervals.extend(table.get(category, ()))
+    result = IntervalSet(intervals)
+    _intervals_for_categories[categories] = result
+    return result
+
+
+class IntervalSet(object):
+
+    """An ordered set of integers stored as disjoint (start, end) ranges.
+
+    Its size is precomputed, and finding the element at an index or the
+    index of an element takes a binary search over the ranges.
+
+    """
+
+    def __init__(self, intervals):
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+            else:
+                merged.append((start, end))
+        self.intervals = tuple(merged)
+        self.starts = [start for start, _ in merged]
+        self.offsets = []
+        size = 0
+        for start, end in merged:
+            self.offsets.append(size)
+            size += end - start + 1
+        self.size = size
+
+    def __repr__(self):
+        return 'IntervalSet(%r)' % (self.intervals,)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.size
+        if not (0 <= i < self.size):
+            raise IndexError('IntervalSet index out of range')
+        j = bisect_right(self.offsets, i) - 1
+        return self.intervals[j][0] + i - self.offsets[j]
+
+    def __contains__(self, value):
+        j = bisect_right(self.starts, value) - 1
+        return j >= 0 and value <= self.intervals[j][1]
+
+    def index(self, value):
+        """The index of value, which must be in this set."""
+        j = bisect_right(self.starts, value) - 1
+        if j < 0 or value > self.intervals[j][1]:
+            raise ValueError('%r is not in %r' % (value, self))
+        return self.offsets[j] + value - self.intervals[j][0]
+
+    def index_above(self, value):
+        """The index of the smallest element which is at least value, or the
+        size of this set if there is no such element."""
+        j = bisect_right(self.starts, value) - 1
+        if j < 0:
+            return 0
+        start, end = self.intervals[j]
+        if value <= end:
+            return self.offsets[j] + value - start
+        return self.offsets[j] + end - start + 1
@@ -41,3 +41,16 @@ class chooser(object):
             i = random.randint(0, len(self.weights) - 1)
             if random.random() <= self.weights[i]:
                 return i
+
+    def choose_many(self, random, n):
+        """Return a list of n indices, each chosen independently as choose
+        would."""
+        weights = self.weights
+        k = len(weights)
+        uniform = random.random
+        result = []
+        while len(result) < n:
+            i = int(uniform() * k)
+            if uniform() <= weights[i]:
+                result.append(i)
+        return result
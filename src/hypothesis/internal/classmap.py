@@ -13,11 +13,17 @@
 from __future__ import division, print_function, absolute_import, \
     unicode_literals
 
+not_found = object()
+
 
 class ClassMap(object):
 
     def __init__(self):
         self.data = {}
+        # Results of looking up classes that are not in data by walking their
+        # MRO. Cleared whenever data changes.
+        self.resolved = {}
+        self.version = 0
 
     def all_mappings(self, key):
         for c in type.mro(key):
@@ -30,9 +36,20 @@ class ClassMap(object):
         try:
             return self.data[key]
         except KeyError:
+            pass
+        try:
+            result = self.resolved[key]
+        except KeyError:
+            result = not_found
             for m in self.all_mappings(key):
-                return m
-        raise KeyError(key)
+                result = m
+                break
+            self.resolved[key] = result
+        if result is not_found:
+            raise KeyError(key)
+        return result
 
     def __setitem__(self, key, value):
         self.data[key] = value
+        self.resolved.clear()
+        self.version += 1
@@ -27,6 +27,12 @@ if PY3:
     integer_types = (int,)
     hunichr = chr
     from functools import reduce
+
+    def encode_utf8(text):
+        return text.encode('utf-8', 'surrogatepass')
+
+    def decode_utf8(data):
+        return data.decode('utf-8', 'surrogatepass')
 else:
     text_type = unicode
     binary_type = str
@@ -70,5 +76,13 @@ else:
     hunichr = unichr
     reduce = reduce
 
+    # Python 2's UTF-8 codec already lets lone surrogates through, and has
+    # no surrogatepass error handler.
+    def encode_utf8(text):
+        return text.encode('utf-8')
+
+    def decode_utf8(data):
+        return data.decode('utf-8')
+
 importlib_invalidate_caches = getattr(
     importlib, 'invalidate_caches', lambda: ())
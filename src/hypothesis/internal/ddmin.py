@@ -0,0 +1,87 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+"""Simplifying sequences in the style of delta debugging (ddmin): Try
+removing large blocks first, and only work down to smaller blocks once none
+of the larger ones can go.
+
+For a sequence of n elements none of which can be removed this makes about
+2n attempts in total, and one which is mostly junk loses it in a
+logarithmic number of passes rather than one element at a time.
+
+"""
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+from collections import deque
+
+
+# How many of the templates a simplifier has yielded it remembers where to
+# resume from. Accepting an older one just starts again from the top.
+RESUME_LIMIT = 256
+
+
+def chunk_simplifier(length, replace_chunk, name='delete_chunks'):
+    """Return a simplifier which replaces blocks of a template's elements,
+    usually by deleting them.
+
+    length(template) is the number of elements in template, and
+    replace_chunk(template, start, end) is template with the elements at
+    indices start <= i < end replaced. It may return template itself if
+    there is nothing to replace them with, and that block is skipped.
+
+    Blocks are tried from the end of the template backwards, starting with
+    halves and halving the block size each time a whole pass at the
+    current size fails, so single elements are only tried at the end. The
+    simplifier remembers the block size and position it had reached: When a
+    replacement works and it is called again on the result it carries on
+    from there, rather than retrying the larger blocks that already failed.
+
+    """
+    # The most recent templates yielded by the last call, each with the
+    # block size and start of the next block to try if it is the one
+    # accepted. Matching on the template rather than on how far the last
+    # call got means it doesn't matter how many more templates were drawn
+    # after it, as happens when several are tried at once in parallel. We
+    # hold on to the templates themselves, as the ids of discarded ones get
+    # reused.
+    resume = deque(maxlen=RESUME_LIMIT)
+
+    def accept(random, template):
+        n = length(template)
+        size, start = None, None
+        for candidate, candidate_size, candidate_start in resume:
+            if candidate is template:
+                size, start = candidate_size, candidate_start
+                break
+        resume.clear()
+        if not n:
+            return
+        if size is None or size >= n:
+            size = max(n // 2, 1)
+            start = None
+        while True:
+            if start is None or start + size > n:
+                start = ((n - 1) // size) * size
+            while start >= 0:
+                result = replace_chunk(template, start, min(start + size, n))
+                if result is not template:
+                    resume.append((result, size, start - size))
+                    yield result
+                start -= size
+            if size == 1:
+                break
+            size //= 2
+            start = None
+    accept.__name__ = str(name)
+    return accept
@@ -13,6 +13,15 @@
 from __future__ import division, print_function, absolute_import, \
     unicode_literals
 
+from hypothesis.errors import InvalidArgument
+from hypothesis.utils.conventions import not_set
+
+# Below this many parameters the overhead of NumPy outweighs the gains from
+# drawing all scores at once.
+VECTORIZE_AT_MIN_PARAMETERS = 100
+
+INITIAL_CAPACITY = 64
+
 
 class ParameterSource(object):
 
@@ -34,7 +43,7 @@ class ParameterSource(object):
         min_parameters=25, min_tries=2,
         start_invalidating_at=5,
         invalidation_threshold=0.75,
-        max_tries=None,
+        max_tries=None, statistics=None,
     ):
         if max_tries is None:
             max_tries = 50
@@ -58,6 +67,7 @@ class ParameterSource(object):
         self.mark_set = False
         self.started = False
         self.valid_parameters = []
+        self.statistics = statistics
 
     def mark_bad(self):
         """The last example was bad.
@@ -74,12 +84,14 @@ class ParameterSource(object):
         self.bad_counts[self.last_parameter_index] += 1
 
     def new_parameter(self):
-        result = self.strategy.produce_parameter(self.random)
+        if self.statistics is None:
+            result = self.strategy.produce_parameter(self.random)
+        else:
+            with self.statistics.timing('produce_parameter'):
+                result = self.strategy.produce_parameter(self.random)
         self.parameters.append(result)
-        self.bad_counts.append(0)
-        self.counts.append(1)
         index = len(self.parameters) - 1
-        self.valid_parameters.append(index)
+        self.add_arm(index)
         self.last_but_one_parameter_index = self.last_parameter_index
         self.last_parameter_index = index
         self.mark_set = False
@@ -91,11 +103,59 @@ class ParameterSource(object):
         self.counts[index] += 1
         return self.parameters[index]
 
-    def draw_parameter_score(self, i):
+    def add_arm(self, index):
+        self.bad_counts.append(0)
+        self.counts.append(1)
+        self.valid_parameters.append(index)
+
+    def priors(self):
         beta_prior = 2.0 * (
             1.0 + self.total_bad_count
         ) / (1.0 + self.total_count)
         alpha_prior = 2.0 - beta_prior
+        return alpha_prior, beta_prior
+
+    def should_invalidate(self, i):
+        return self.counts[i] >= self.max_tries or (
+            self.counts[i] >= self.start_invalidating_at and
+            self.bad_counts[i] >= (
+                self.invalidation_threshold * self.counts[i])
+        )
+
+    def cull_parameters(self):
+        """Permanently stop considering any parameters that have been tried
+        too often or have proven to be mostly bad."""
+        valid = self.valid_parameters
+        while valid:
+            i = valid[-1]
+            if self.counts[i] == self.bad_counts[i]:
+                valid.pop()
+            else:
+                break
+        self.valid_parameters = [
+            i for i in valid if not self.should_invalidate(i)
+        ]
+
+    def best_parameter(self, best_score):
+        """Return the index of the valid parameter with the highest sampled
+        score if that beats best_score, else -1."""
+        alpha_prior, beta_prior = self.priors()
+        betavariate = self.random.betavariate
+        counts = self.counts
+        bad_counts = self.bad_counts
+        best_index = -1
+        for i in self.valid_parameters:
+            score = betavariate(
+                alpha_prior + counts[i] - bad_counts[i],
+                beta_prior + bad_counts[i],
+            )
+            if score > best_score:
+                best_score = score
+                best_index = i
+        return best_index
+
+    def draw_parameter_score(self, i):
+        alpha_prior, beta_prior = self.priors()
 
         beta = beta_prior + self.bad_counts[i]
         alpha = alpha_prior + self.counts[i] - self.bad_counts[i]
@@ -134,34 +194,8 @@ class ParameterSource(object):
             best_score = self.draw_parameter_score(
                 self.random.randint(0, len(self.parameters) - 1)
             )
-            best_index = -1
-
-            while self.valid_parameters:
-                i = self.valid_parameters[-1]
-                if self.counts[i] == self.bad_counts[i]:
-                    self.valid_parameters.pop()
-                else:
-                    break
-
-            to_invalidate = []
-            for i in self.valid_parameters:
-                if self.counts[i] >= self.max_tries:
-                    to_invalidate.append(i)
-                    continue
-
-                if (
-                    self.counts[i] >= self.start_invalidating_at and
-                    self.bad_counts[i] >= (
-                        self.invalidation_threshold * self.counts[i])
-                ):
-                    to_invalidate.append(i)
-                    continue
-                score = self.draw_parameter_score(i)
-                if score > best_score:
-                    best_score = score
-                    best_index = i
-            for i in to_invalidate:
-                self.valid_parameters.remove(i)
+            self.cull_parameters()
+            best_index = self.best_parameter(best_score)
             if best_index < 0:
                 return self.new_parameter()
             else:
@@ -180,3 +214,132 @@ class ParameterSource(object):
                 self.context, p
             )
             yield self.strategy.reify(template)
+
+
+class VectorizedParameterSource(ParameterSource):
+
+    """A ParameterSource that keeps its counts in NumPy arrays and samples
+    every valid parameter's score in a single batched draw, which makes
+    picking a parameter much cheaper when there are thousands of them.
+
+    valid_parameters is an array of indices recomputed on each pick from a
+    mask of which parameters are still valid.
+
+    """
+
+    def __init__(self, context, strategy, **kwargs):
+        super(VectorizedParameterSource, self).__init__(
+            context, strategy, **kwargs)
+        numpy = load_numpy()
+        assert numpy is not None
+        self.numpy = numpy
+        self.numpy_random = numpy.random.RandomState(
+            self.random.getrandbits(32))
+        self.count_buffer = numpy.zeros(INITIAL_CAPACITY, dtype=numpy.int64)
+        self.bad_count_buffer = numpy.zeros(
+            INITIAL_CAPACITY, dtype=numpy.int64)
+        self.valid_buffer = numpy.zeros(INITIAL_CAPACITY, dtype=bool)
+        self.resize(0)
+        self.valid_parameters = numpy.zeros(0, dtype=numpy.int64)
+
+    def resize(self, n):
+        # counts and bad_counts are views of the first n elements of their
+        # buffers, so updates through them write through.
+        self.counts = self.count_buffer[:n]
+        self.bad_counts = self.bad_count_buffer[:n]
+        self.valid_mask = self.valid_buffer[:n]
+
+    def add_arm(self, index):
+        capacity = len(self.count_buffer)
+        if index >= capacity:
+            numpy = self.numpy
+            self.count_buffer = numpy.concatenate((
+                self.count_buffer, numpy.zeros_like(self.count_buffer)))
+            self.bad_count_buffer = numpy.concatenate((
+                self.bad_count_buffer,
+                numpy.zeros_like(self.bad_count_buffer)))
+            self.valid_buffer = numpy.concatenate((
+                self.valid_buffer, numpy.zeros_like(self.valid_buffer)))
+        self.count_buffer[index] = 1
+        self.bad_count_buffer[index] = 0
+        self.valid_buffer[index] = True
+        self.resize(index + 1)
+
+    def cull_parameters(self):
+        valid = self.valid_mask
+        counts = self.counts
+        bad_counts = self.bad_counts
+        indices = self.numpy.flatnonzero(valid)
+        tail = len(indices)
+        while tail > 0:
+            i = indices[tail - 1]
+            if counts[i] == bad_counts[i]:
+                valid[i] = False
+                tail -= 1
+            else:
+                break
+        valid &= ~(
+            (counts >= self.max_tries) | (
+                (counts >= self.start_invalidating_at) &
+                (bad_counts >= self.invalidation_threshold * counts)
+            )
+        )
+        self.valid_parameters = self.numpy.flatnonzero(valid)
+
+    def best_parameter(self, best_score):
+        indices = self.valid_parameters
+        if not len(indices):
+            return -1
+        alpha_prior, beta_prior = self.priors()
+        counts = self.counts[indices]
+        bad_counts = self.bad_counts[indices]
+        scores = self.numpy_random.beta(
+            alpha_prior + counts - bad_counts,
+            beta_prior + bad_counts,
+        )
+        j = int(scores.argmax())
+        if scores[j] > best_score:
+            return int(indices[j])
+        return -1
+
+
+numpy_module = not_set
+
+
+def load_numpy():
+    """Returns the numpy module, or None if it is not installed. It is only
+    imported the first time this is called."""
+    global numpy_module
+    if numpy_module is not_set:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        numpy_module = numpy
+    return numpy_module
+
+
+def new_parameter_source(
+    context, strategy, min_parameters=25, vectorize=False, **kwargs
+):
+    """Create a ParameterSource, using a VectorizedParameterSource if vectorize
+    is True and we expect to be juggling enough parameters for that to be
+    worth it.
+
+    The two draw different random numbers, so which one is used must never
+    depend on whether NumPy happens to be installed: Asking to vectorize
+    without it is an error.
+
+    """
+    if vectorize and load_numpy() is None:
+        raise InvalidArgument(
+            'vectorize_parameters=True requires NumPy, which is not '
+            'installed')
+    if vectorize and min_parameters >= VECTORIZE_AT_MIN_PARAMETERS:
+        cls = VectorizedParameterSource
+    else:
+        cls = ParameterSource
+    return cls(
+        context=context, strategy=strategy, min_parameters=min_parameters,
+        **kwargs
+    )
@@ -0,0 +1,67 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+from collections import OrderedDict
+
+
+class LRUCache(object):
+
+    """A mapping which holds at most max_size entries, throwing away the
+    least recently used one to make room for a new one.
+
+    Lookups through get count as using an entry, and the cache keeps count
+    of how many of them found one (hits) and how many didn't (misses).
+
+    """
+
+    def __init__(self, max_size):
+        if max_size <= 0:
+            raise ValueError(
+                'Cache size must be positive but got %r' % (max_size,))
+        self.max_size = max_size
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return 'LRUCache(max_size=%d, size=%d, hits=%d, misses=%d)' % (
+            self.max_size, len(self.data), self.hits, self.misses,
+        )
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        try:
+            value = self.data.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        # Reinserting moves the entry to the most recently used end.
+        self.data[key] = value
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key, value):
+        self.data.pop(key, None)
+        while len(self.data) >= self.max_size:
+            self.data.popitem(last=False)
+        self.data[key] = value
+
+    def clear(self):
+        self.data.clear()
@@ -0,0 +1,281 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+"""Helpers for running parts of a search in forked worker processes.
+
+Workers are plain forks of the current process, so the functions they run
+may be arbitrary closures: Nothing but their result ever needs to be
+pickled. Anything a worker reports is relayed to the parent's reporter.
+
+"""
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+import os
+import pickle
+import select
+import signal
+import struct
+import traceback
+from collections import deque, namedtuple
+
+from hypothesis.errors import AbnormalExit
+from hypothesis.reporting import with_reporter, current_reporter
+
+can_fork = hasattr(os, 'fork')
+
+Report = namedtuple('Report', ('data',))
+Result = namedtuple('Result', ('value',))
+Error = namedtuple('Error', ('exception',))
+
+
+def write_message(fd, message):  # pragma: no cover
+    data = pickle.dumps(message)
+    data = struct.pack(b'!Q', len(data)) + data
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def read_message(fd):  # pragma: no cover
+    """Read a message written by write_message from fd, blocking until it is
+    all there. Returns None if fd is closed first."""
+    def read_exactly(n):
+        data = b''
+        while len(data) < n:
+            chunk = os.read(fd, n - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+    header = read_exactly(8)
+    if header is None:
+        return None
+    length, = struct.unpack(b'!Q', header)
+    data = read_exactly(length)
+    if data is None:
+        return None
+    return pickle.loads(data)
+
+
+def report_to(fd):  # pragma: no cover
+    def writer(s):
+        write_message(fd, Report(s))
+    return writer
+
+
+class ForkedCall(object):
+
+    """Calls function() in a forked child process.
+
+    The parent process must eventually call either wait() or kill() in order
+    to reap the child.
+
+    """
+
+    def __init__(self, function):
+        r, w = os.pipe()
+        self.pid = os.fork()
+        if not self.pid:  # pragma: no cover
+            os.close(r)
+            try:
+                try:
+                    with with_reporter(report_to(w)):
+                        message = Result(function())
+                except BaseException as e:
+                    message = Error(e)
+                write_message(w, message)
+            except:
+                traceback.print_exc()
+            finally:
+                os._exit(0)
+        os.close(w)
+        self.fd = r
+        self.buffer = b''
+        self.outcome = None
+        self.finished = False
+
+    def fileno(self):
+        return self.fd
+
+    def poll(self):
+        """Read whatever the child has written so far, blocking if it has
+        written nothing. Returns True once the child has finished and its
+        outcome is available."""
+        if self.finished:
+            return True
+        data = os.read(self.fd, 65536)
+        self.buffer += data
+        while len(self.buffer) >= 8:
+            length, = struct.unpack(b'!Q', self.buffer[:8])
+            if len(self.buffer) < 8 + length:
+                break
+            message = pickle.loads(self.buffer[8:8 + length])
+            self.buffer = self.buffer[8 + length:]
+            if isinstance(message, Report):
+                current_reporter()(message.data)
+            else:
+                self.outcome = message
+                data = b''
+                break
+        if not data:
+            self.finished = True
+            os.close(self.fd)
+            os.waitpid(self.pid, 0)
+        return self.finished
+
+    def wait(self):
+        while not self.poll():
+            pass
+
+    def result(self):
+        """Wait for the child and return the value its function returned,
+        raising whatever it raised instead if it did not return normally."""
+        self.wait()
+        if isinstance(self.outcome, Result):
+            return self.outcome.value
+        if isinstance(self.outcome, Error):
+            raise self.outcome.exception
+        raise AbnormalExit()
+
+    def kill(self):
+        if self.finished:
+            return
+        self.finished = True
+        try:
+            os.kill(self.pid, signal.SIGKILL)
+        except OSError:  # pragma: no cover
+            pass
+        os.close(self.fd)
+        os.waitpid(self.pid, 0)
+
+
+def as_completed(calls):
+    """Yield each of these ForkedCalls as soon as its child has finished."""
+    pending = list(calls)
+    while pending:
+        ready, _, _ = select.select(pending, (), ())
+        for call in ready:
+            if call.poll():
+                pending.remove(call)
+                yield call
+
+
+class Worker(object):
+
+    """A forked child process which calls function on every argument it is
+    sent, sending back each outcome in order.
+
+    Arguments and return values are pickled, but function itself never is.
+    The child exits once close() is called or the parent goes away.
+
+    """
+
+    def __init__(self, function):
+        task_r, task_w = os.pipe()
+        r, w = os.pipe()
+        self.pid = os.fork()
+        if not self.pid:  # pragma: no cover
+            os.close(task_w)
+            os.close(r)
+            try:
+                with with_reporter(report_to(w)):
+                    while True:
+                        arguments = read_message(task_r)
+                        if arguments is None:
+                            break
+                        for argument in arguments:
+                            try:
+                                message = Result(function(argument))
+                            except BaseException as e:
+                                message = Error(e)
+                            write_message(w, message)
+            except:
+                traceback.print_exc()
+            finally:
+                os._exit(0)
+        os.close(task_r)
+        os.close(w)
+        self.tasks = task_w
+        self.fd = r
+        self.buffer = b''
+        self.outcomes = deque()
+        self.pending = 0
+        self.unwanted = 0
+        self.finished = False
+
+    def fileno(self):
+        return self.fd
+
+    def send(self, arguments):
+        """Queue up function calls on each of arguments."""
+        arguments = list(arguments)
+        self.pending += len(arguments)
+        try:
+            write_message(self.tasks, arguments)
+        except OSError:
+            # The child has died, which result() will report.
+            self.close()
+
+    def discard_pending(self):
+        """Throw away the outcomes of every call sent so far as they arrive,
+        rather than returning them from result()."""
+        self.unwanted = self.pending
+
+    def poll(self):
+        """Read whatever the child has written so far, blocking if it has
+        written nothing."""
+        data = os.read(self.fd, 65536)
+        if not data:
+            self.close()
+            return
+        self.buffer += data
+        while len(self.buffer) >= 8:
+            length, = struct.unpack(b'!Q', self.buffer[:8])
+            if len(self.buffer) < 8 + length:
+                break
+            message = pickle.loads(self.buffer[8:8 + length])
+            self.buffer = self.buffer[8 + length:]
+            if isinstance(message, Report):
+                current_reporter()(message.data)
+            else:
+                self.outcomes.append(message)
+
+    def result(self):
+        """Wait for the outcome of the oldest call still wanted and return
+        what it returned, raising whatever it raised instead if it did not
+        return normally."""
+        while True:
+            while not self.outcomes:
+                if self.finished:
+                    raise AbnormalExit()
+                self.poll()
+            outcome = self.outcomes.popleft()
+            self.pending -= 1
+            if self.unwanted:
+                self.unwanted -= 1
+                continue
+            if isinstance(outcome, Result):
+                return outcome.value
+            raise outcome.exception
+
+    def close(self):
+        if self.finished:
+            return
+        self.finished = True
+        try:
+            os.kill(self.pid, signal.SIGKILL)
+        except OSError:  # pragma: no cover
+            pass
+        os.close(self.tasks)
+        os.close(self.fd)
+        os.waitpid(self.pid, 0)
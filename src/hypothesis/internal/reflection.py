@@ -23,6 +23,7 @@ import sys
 import types
 import hashlib
 import inspect
+import tempfile
 from functools import wraps
 
 from hypothesis.settings import storage_directory
@@ -309,9 +310,17 @@ def source_exec_as_module(source):
         hashlib.sha1(source.encode('utf-8')).hexdigest(),
     )
     filepath = os.path.join(d, name + '.py')
-    f = open(filepath, 'w')
-    f.write(source)
-    f.close()
+    # Write to a temporary file and move it into place, so that another
+    # process importing the same module never sees it partly written.
+    fd, temppath = tempfile.mkstemp(dir=d, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        f.write(source)
+    try:
+        os.rename(temppath, filepath)
+    except OSError:  # pragma: no cover
+        # Windows won't rename over an existing file, but if there is one
+        # it already has this source.
+        os.unlink(temppath)
     assert os.path.exists(filepath)
     with open(filepath) as r:
         assert r.read() == source
@@ -0,0 +1,99 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+from hypothesis.errors import BadData
+from hypothesis.internal.compat import hrange, text_type, integer_types
+
+
+class SimplifierStatistics(object):
+
+    """Keeps track of how productive each simplification pass has been, keyed
+    by the pass's __name__, and uses that to decide which order to run passes
+    in.
+
+    Ordering is a form of Thompson sampling: Each pass that has been run
+    before is scored by a draw from a Beta distribution over its rate of
+    successful shrinks per call to the test function, and passes are run in
+    decreasing order of score. Passes we know nothing about are always run
+    first, in the order the strategy provided them.
+
+    """
+
+    def __init__(self, max_persisted=100):
+        self.calls = {}
+        self.successes = {}
+        self.max_persisted = max_persisted
+
+    def __len__(self):
+        return len(self.calls)
+
+    def record(self, name, calls, successes):
+        """Note that running the pass called name cost this many calls to the
+        test function and produced this many successful shrinks."""
+        assert 0 <= successes <= calls
+        self.calls[name] = self.calls.get(name, 0) + calls
+        self.successes[name] = self.successes.get(name, 0) + successes
+
+    def success_rate(self, name):
+        calls = self.calls.get(name, 0)
+        if not calls:
+            return None
+        return self.successes[name] / calls
+
+    def score(self, random, name):
+        calls = self.calls.get(name, 0)
+        if not calls:
+            return 1.0
+        successes = self.successes[name]
+        return random.betavariate(1 + successes, 1 + calls - successes)
+
+    def order(self, random, simplifiers):
+        """Return a list of these simplifiers in the order they should be
+        run."""
+        simplifiers = list(simplifiers)
+        scores = [self.score(random, s.__name__) for s in simplifiers]
+        indices = sorted(
+            hrange(len(simplifiers)), key=lambda i: (-scores[i], i))
+        return [simplifiers[i] for i in indices]
+
+    def to_basic(self):
+        """Convert the most used max_persisted entries to basic data."""
+        names = sorted(self.calls, key=lambda n: (-self.calls[n], n))
+        return [
+            [name, self.calls[name], self.successes[name]]
+            for name in names[:self.max_persisted]
+        ]
+
+    def merge_basic(self, data):
+        """Add previously saved statistics in basic data form to these ones,
+        raising BadData if they are not in the format produced by
+        to_basic."""
+        if not isinstance(data, list):
+            raise BadData('Expected a list but got %r' % (data,))
+        entries = []
+        for entry in data:
+            if not (isinstance(entry, list) and len(entry) == 3):
+                raise BadData('Invalid statistics entry %r' % (entry,))
+            name, calls, successes = entry
+            if not (
+                isinstance(name, text_type) and
+                isinstance(calls, integer_types) and
+                isinstance(successes, integer_types) and
+                0 <= successes <= calls
+            ):
+                raise BadData('Invalid statistics entry %r' % (entry,))
+            entries.append(entry)
+        for name, calls, successes in entries:
+            self.record(name, calls, successes)
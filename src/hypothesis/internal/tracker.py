@@ -13,60 +13,226 @@
 from __future__ import division, print_function, absolute_import, \
     unicode_literals
 
+import math
+import struct
 import hashlib
 import collections
 
 import marshal
-from hypothesis.internal.compat import text_type, binary_type
+from hypothesis.internal.compat import hrange, text_type, binary_type, \
+    integer_types
 
+# Ints in this range are tracked as themselves: Equality on them is exact and
+# their hash is cheap, so there is no need to digest them.
+SMALL_INT_BOUND = 2 ** 63
 
-def flatten(o):
-    result = []
-    stack = [o]
+# How many atoms to collect before feeding them to the digest.
+CHUNK_SIZE = 256
 
-    while stack:
-        t = stack.pop()
-        if (not isinstance(t, type)) and hasattr(t, '__trackas__'):
-            t = t.__trackas__()
-        if isinstance(t, type):
-            t = ('type', getattr(t, '__qualname__', t.__name__))
-        if isinstance(t, (text_type, binary_type)):
-            result.append(t)
-        elif isinstance(t, collections.Mapping):
-            result.append(type(t).__name__)
-            result.append(len(t))
-            stack.extend(list(t.items()))
-        elif isinstance(t, collections.Iterable):
-            result.append(type(t).__name__)
-            x = list(t)
-            result.append(len(x))
-            stack.extend(x)
-        else:
-            result.append(t)
-    return result
+ATOMIC_TYPES = frozenset(integer_types + (
+    bool, float, complex, text_type, binary_type, type(None),
+))
+SEQUENCE_TYPES = frozenset((tuple, list))
 
 
 def object_to_tracking_key(o):
-    k = marshal.dumps(flatten(o))
+    """Compute a compact key for o such that two objects have the same key
+    exactly when they would flatten to the same sequence of atoms.
+
+    Small ints are their own key. Anything else is walked depth first,
+    with the atoms found marshalled and fed to a SHA1 digest in fixed size
+    chunks, so we never build a flattened copy of the whole of a large
+    template in memory. Results small enough not to be worth hashing are
+    returned as is.
+
+    """
+    if type(o) in integer_types and -SMALL_INT_BOUND <= o < SMALL_INT_BOUND:
+        return o
+    digest = None
+    chunk = []
+    stack = [o]
 
-    if len(k) < 20:
+    while stack:
+        t = stack.pop()
+        tt = type(t)
+        if tt in ATOMIC_TYPES:
+            chunk.append(t)
+        elif tt in SEQUENCE_TYPES:
+            chunk.append(tt.__name__)
+            chunk.append(len(t))
+            stack.extend(t)
+        else:
+            if hasattr(t, '__trackas__') and not isinstance(t, type):
+                t = t.__trackas__()
+            if isinstance(t, type):
+                t = ('type', getattr(t, '__qualname__', t.__name__))
+            if isinstance(t, (text_type, binary_type)):
+                chunk.append(t)
+            elif isinstance(t, collections.Mapping):
+                chunk.append(type(t).__name__)
+                chunk.append(len(t))
+                stack.extend(list(t.items()))
+            elif isinstance(t, collections.Iterable):
+                chunk.append(type(t).__name__)
+                x = list(t)
+                chunk.append(len(x))
+                stack.extend(x)
+            else:
+                chunk.append(t)
+        if len(chunk) >= CHUNK_SIZE:
+            if digest is None:
+                digest = hashlib.sha1()
+            digest.update(marshal.dumps(chunk))
+            chunk = []
+    k = marshal.dumps(chunk)
+    if digest is None:
+        if len(k) < 20:
+            return k
+        digest = hashlib.sha1()
+    digest.update(k)
+    return digest.digest()
+
+
+def key_to_digest(k):
+    if isinstance(k, binary_type) and len(k) == 20:
         return k
-    else:
-        return hashlib.sha1(k).digest()
+    return hashlib.sha1(marshal.dumps(k)).digest()
+
+
+class BloomFilter(object):
+
+    """A fixed size probabilistic set of digests. Membership tests may return
+    false positives, at a rate of roughly false_positive_rate as long as no
+    more than capacity distinct values have been added, but never false
+    negatives."""
+
+    def __init__(self, capacity, false_positive_rate):
+        assert capacity > 0
+        assert 0 < false_positive_rate < 1
+        self.capacity = capacity
+        self.false_positive_rate = false_positive_rate
+        n_bits = int(math.ceil(
+            -capacity * math.log(false_positive_rate) / (math.log(2) ** 2)
+        ))
+        self.n_hashes = max(1, int(round(n_bits / capacity * math.log(2))))
+        self.n_bits = n_bits
+        self.bits = bytearray((n_bits + 7) // 8)
+        self.count = 0
+
+    def indices(self, digest):
+        # Kirsch-Mitzenmacher: Two independent hashes are enough to simulate
+        # as many as we need.
+        h1, h2 = struct.unpack(b'!QQ', digest[:16])
+        h2 |= 1
+        return [(h1 + i * h2) % self.n_bits for i in hrange(self.n_hashes)]
+
+    def __contains__(self, digest):
+        bits = self.bits
+        for i in self.indices(digest):
+            if not bits[i >> 3] & (1 << (i & 7)):
+                return False
+        return True
+
+    def add(self, digest):
+        """Add digest to the filter, returning True if it was (probably) not
+        already present."""
+        bits = self.bits
+        added = False
+        for i in self.indices(digest):
+            byte = i >> 3
+            mask = 1 << (i & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
 
 
 class Tracker(object):
 
-    def __init__(self):
+    """Keeps track of which objects have been seen before.
+
+    Tracking is exact by default, keeping a set of compact keys for each
+    object. If max_exact_size is not None then once more than that many
+    objects have been tracked the keys are moved into a BloomFilter sized
+    for capacity objects (sixteen times max_exact_size by default), after
+    which track will occasionally report an object it has not seen as a
+    duplicate. Whenever the newest filter fills up another one of twice the
+    capacity and half the false positive rate is added, so the overall false
+    positive rate stays below twice false_positive_rate. Memory use still
+    grows linearly with the number of objects tracked, but at a few bytes
+    per object rather than a whole key.
+
+    """
+
+    def __init__(
+        self, max_exact_size=None, capacity=None,
+        false_positive_rate=0.001,
+    ):
         self.contents = set()
+        self.filters = []
+        self.max_exact_size = max_exact_size
+        if capacity is None and max_exact_size is not None:
+            capacity = 16 * max_exact_size
+        self.capacity = capacity
+        self.false_positive_rate = false_positive_rate
+        self.count = 0
+
+    @property
+    def exact(self):
+        return not self.filters
 
     def __len__(self):
-        return len(self.contents)
+        return self.count
+
+    def __contains__(self, x):
+        k = object_to_tracking_key(x)
+        if not self.filters:
+            return k in self.contents
+        return self.in_filters(key_to_digest(k))
 
     def track(self, x):
         k = object_to_tracking_key(x)
+        if self.filters:
+            digest = key_to_digest(k)
+            if self.in_filters(digest):
+                return 2
+            self.add_to_filters(digest)
+            self.count += 1
+            return 1
         if k in self.contents:
             return 2
-        else:
-            self.contents.add(k)
-            return 1
+        self.contents.add(k)
+        self.count += 1
+        if (
+            self.max_exact_size is not None and
+            self.count > self.max_exact_size
+        ):
+            self.switch_to_filter()
+        return 1
+
+    def in_filters(self, digest):
+        for f in self.filters:
+            if digest in f:
+                return True
+        return False
+
+    def add_to_filters(self, digest):
+        current = self.filters[-1]
+        if current.count >= current.capacity:
+            current = BloomFilter(
+                capacity=2 * current.capacity,
+                false_positive_rate=current.false_positive_rate / 2,
+            )
+            self.filters.append(current)
+        current.add(digest)
+
+    def switch_to_filter(self):
+        self.filters = [BloomFilter(
+            capacity=max(self.capacity, self.count),
+            false_positive_rate=self.false_positive_rate,
+        )]
+        for k in self.contents:
+            self.add_to_filters(key_to_digest(k))
+        self.contents = set()
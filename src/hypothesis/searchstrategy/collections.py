@@ -21,9 +21,11 @@ from hypothesis.settings import Settings
 from hypothesis.specifiers import Dictionary
 from hypothesis.utils.show import show
 from hypothesis.internal.compat import hrange
+from hypothesis.internal.ddmin import chunk_simplifier
 from hypothesis.searchstrategy.strategies import EFFECTIVELY_INFINITE, \
     SearchStrategy, MappedSearchStrategy, strategy, check_type, \
-    check_length, check_data_type, one_of_strategies
+    check_length, check_data_type, simplicity_ranks, one_of_strategies, \
+    length_simplicity_key
 
 
 def safe_mul(x, y):
@@ -90,6 +92,15 @@ class TupleStrategy(SearchStrategy):
             for g, v in zip(es, pv)
         ])
 
+    def produce_templates(self, context, pv, n):
+        if not self.element_strategies:
+            return [self.newtuple(())] * n
+        columns = [
+            g.draw_templates(context, v, n)
+            for g, v in zip(self.element_strategies, pv)
+        ]
+        return [self.newtuple(row) for row in zip(*columns)]
+
     def strictly_simpler(self, x, y):
         for i, (u, v) in enumerate(zip(x, y)):
             s = self.element_strategies[i]
@@ -99,6 +110,12 @@ class TupleStrategy(SearchStrategy):
                 return False
         return False
 
+    def simplicity_key(self, template):
+        return tuple(
+            s.simplicity_key(x)
+            for s, x in zip(self.element_strategies, template)
+        )
+
     def simplifier_for_index(self, i, simplifier):
         def accept(random, template):
             assert len(template) == len(self.element_strategies)
@@ -187,12 +204,8 @@ class ListStrategy(SearchStrategy):
         if self.element_strategy is None:
             return ()
         length = dist.geometric(context.random, 1.0 / (1 + pv.average_length))
-        result = []
-        for _ in hrange(length):
-            result.append(
-                self.element_strategy.draw_template(
-                    context, pv.child_parameter))
-        return tuple(result)
+        return tuple(self.element_strategy.draw_templates(
+            context, pv.child_parameter, length))
 
     def simplifiers(self, random, template):
         if not self.element_strategy:
@@ -208,11 +221,9 @@ class ListStrategy(SearchStrategy):
                 random, template[0]
             ):
                 yield self.simplifier_for_index(0, simplify)
-        yield self.simplify_to_mid
-        yield self.simplify_with_random_discards
+        yield chunk_simplifier(len, self.delete_chunk)
         yield self.simplify_with_example_cloning
         yield self.simplify_arrange_by_pivot
-        yield self.simplify_with_single_deletes
         yield self.simplify_to_singletons
 
         yield self.shared_simplification(self.element_strategy.full_simplify)
@@ -259,19 +270,22 @@ class ListStrategy(SearchStrategy):
                 return False
         return False
 
+    def simplicity_key(self, template):
+        return length_simplicity_key(self, template)
+
     def simplify_arrange_by_pivot(self, random, x):
         if len(x) <= 1:
             return
+        ranks = simplicity_ranks(self.element_strategy, x)
         for _ in hrange(10):
-            pivot = random.choice(x)
+            pivot = random.choice(ranks)
             left = []
             center = []
             right = []
-            simpler = self.element_strategy.strictly_simpler
-            for y in x:
-                if simpler(y, pivot):
+            for y, rank in zip(x, ranks):
+                if rank < pivot:
                     left.append(y)
-                elif simpler(pivot, y):
+                elif rank > pivot:
                     right.append(y)
                 else:
                     center.append(y)
@@ -285,80 +299,37 @@ class ListStrategy(SearchStrategy):
         if len(x) <= 1:
             return
 
-        best = x[0]
-        any_shrinks = False
-        for t in x:
-            if self.element_strategy.strictly_simpler(
-                t, best
-            ):
-                any_shrinks = True
-                best = t
-            if not any_shrinks:
-                any_shrinks = self.element_strategy.strictly_simpler(best, t)
-
-        if any_shrinks:
-            yield (best,) * len(x)
+        ranks = simplicity_ranks(self.element_strategy, x)
+        if max(ranks) > 0:
+            yield (x[ranks.index(0)],) * len(x)
 
         for _ in hrange(20):
             result = list(x)
-            pivot = random.choice(x)
+            pivot = random.randint(0, len(x) - 1)
             for _ in hrange(10):
-                new_pivot = random.choice(x)
-                if self.element_strategy.strictly_simpler(new_pivot, pivot):
+                new_pivot = random.randint(0, len(x) - 1)
+                if ranks[new_pivot] < ranks[pivot]:
                     pivot = new_pivot
             indices = [
                 j for j in hrange(len(x))
-                if self.element_strategy.strictly_simpler(pivot, x[j])]
+                if ranks[pivot] < ranks[j]]
             if not indices:
                 break
-            random.shuffle(indices)
-            indices = indices[:random.randint(1, len(x) - 1)]
+            indices = random.sample(
+                indices, min(len(indices), random.randint(1, len(x) - 1)))
             for j in indices:
-                result[j] = pivot
+                result[j] = x[pivot]
             yield tuple(result)
 
-    def simplify_to_mid(self, random, x):
-        if len(x) <= 1:
-            return
-
-        mid = len(x) // 2
-        yield x[:mid]
-        yield x[mid:]
-
-    def simplify_with_random_discards(self, random, x):
-        assert isinstance(x, tuple)
-        if len(x) <= 3:
-            return
-
-        for _ in hrange(10):
-            results = []
-            for t in x:
-                if random.randint(0, 1):
-                    results.append(t)
-            yield tuple(results)
+    def delete_chunk(self, x, start, end):
+        return x[:start] + x[end:]
 
     def indices_roughly_from_worst_to_best(self, random, x):
-        pivot = random.choice(x)
-        bad = []
-        good = []
-        y = list(hrange(len(x)))
-        random.shuffle(y)
-        for t in y:
-            if self.element_strategy.strictly_simpler(x[t], pivot):
-                good.append(t)
-            else:
-                bad.append(t)
-        return bad + good
-
-    def simplify_with_single_deletes(self, random, x):
-        assert isinstance(x, tuple)
-        if len(x) <= 1:
-            return
-
-        for i in self.indices_roughly_from_worst_to_best(random, x):
-            y = list(x)
-            del y[i]
-            yield tuple(y)
+        ranks = simplicity_ranks(self.element_strategy, x)
+        indices = list(hrange(len(x)))
+        random.shuffle(indices)
+        indices.sort(key=ranks.__getitem__, reverse=True)
+        return indices
 
     def shared_indices(self, template):
         same_valued_indices = {}
@@ -490,6 +461,9 @@ class SetStrategy(SearchStrategy):
     def strictly_simpler(self, x, y):
         return self.list_strategy.strictly_simpler(x, y)
 
+    def simplicity_key(self, template):
+        return self.list_strategy.simplicity_key(template)
+
     def convert_simplifier(self, simplifier):
         def accept(random, template):
             for value in simplifier(random, tuple(template)):
@@ -0,0 +1,394 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+"""Compiling a tree of strategies into a single function for producing
+templates and another for reifying them.
+
+Generating a value for something like [(int, float, text_type)] normally
+goes through a method call on every strategy in the tree for every value,
+unpacking namedtuple parameters at each level. For strategies of types we
+know the implementation of, we instead generate Python source which does the
+same thing inline, and only call back into the strategy objects for the
+parts of the tree we don't know how to compile.
+
+The generated source depends only on the shape of the tree. Strategies and
+other values it needs are passed in as arguments, so trees of the same shape
+share a module.
+
+"""
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+from collections import namedtuple
+
+from hypothesis.internal.reflection import unbind_method, \
+    source_exec_as_module
+from hypothesis.searchstrategy.misc import JustStrategy, BoolStrategy, \
+    SampledFromStrategy
+from hypothesis.searchstrategy.numbers import FloatStrategy, \
+    BoundedIntStrategy, WideRangeIntStrategy, WrapperFloatStrategy, \
+    IntegersFromStrategy, RandomGeometricIntStrategy
+from hypothesis.searchstrategy.strings import OneCharStringStrategy
+from hypothesis.searchstrategy.strategies import OneOfStrategy, \
+    MappedSearchStrategy
+from hypothesis.searchstrategy.collections import SetStrategy, \
+    ListStrategy, TupleStrategy
+
+CompiledStrategy = namedtuple(
+    'CompiledStrategy', ('produce_template', 'reify'))
+
+# Beyond this depth we stop inlining and call the strategy instead, so as to
+# stay well clear of the limits on how deeply Python source can nest.
+MAX_DEPTH = 20
+
+COMPILED_SCRIPT = """
+from __future__ import division
+
+from math import log, log1p
+
+from hypothesis.internal.compat import hrange
+
+
+def accept(%(constants)s):
+    def produce_template(context, parameter):
+        random = context.random
+        uniform = random.random
+        choice = random.choice
+        randint = random.randint
+%(produce)s
+        return t0
+
+    def reify(t0):
+        return %(reify)s
+
+    return produce_template, reify
+""".lstrip()
+
+
+def compile_strategy(strategy):
+    """Return a CompiledStrategy whose produce_template and reify behave as
+    those methods of strategy do.
+
+    The result is cached on strategy, so each strategy is only compiled
+    once. If there is nothing in strategy we know how to compile, the
+    result just calls its methods.
+
+    """
+    try:
+        return strategy.compiled_strategy
+    except AttributeError:
+        pass
+    if (
+        handler_for(strategy, 'produce_template') is None and
+        handler_for(strategy, 'reify') is None
+    ):
+        result = CompiledStrategy(strategy.produce_template, strategy.reify)
+    else:
+        compiler = Compiler()
+        compiler.produce(strategy, 'parameter', 't0', 2, 0)
+        reify = compiler.reify(strategy, 't0', 0)
+        source = COMPILED_SCRIPT % {
+            'constants': ', '.join(
+                'c%d' % (i,) for i in range(len(compiler.constants))),
+            'produce': '\n'.join(compiler.lines),
+            'reify': reify,
+        }
+        result = CompiledStrategy(*source_exec_as_module(source).accept(
+            *compiler.constants))
+    strategy.compiled_strategy = result
+    return result
+
+
+def handler_for(strategy, method):
+    """Return the name of the Compiler methods that compile calls to method
+    of strategy, or None if it must be called instead.
+
+    A strategy is handled as one of its base classes is for a method if it
+    does not override that class's implementation of the method.
+
+    """
+    strategy_type = type(strategy)
+    implementation = unbind_method(getattr(strategy_type, method))
+    for base in strategy_type.__mro__:
+        name = HANDLERS.get(base)
+        if name is not None and implementation is unbind_method(
+            getattr(base, method)
+        ):
+            return name
+    return None
+
+
+class Compiler(object):
+
+    def __init__(self):
+        self.constants = []
+        self.lines = []
+        self.names = 0
+
+    def constant(self, value):
+        """Return the name the generated code can refer to value by."""
+        for i, c in enumerate(self.constants):
+            if c is value:
+                return 'c%d' % (i,)
+        self.constants.append(value)
+        return 'c%d' % (len(self.constants) - 1,)
+
+    def fresh(self, prefix):
+        self.names += 1
+        return '%s%d' % (prefix, self.names)
+
+    def emit(self, indent, line):
+        self.lines.append('    ' * indent + line)
+
+    def produce(self, strategy, parameter, target, indent, depth):
+        """Emit code at this indent which assigns a template for strategy,
+        produced from the parameter in the variable named parameter, to the
+        variable named target."""
+        name = handler_for(strategy, 'produce_template')
+        if name is None or depth >= MAX_DEPTH:
+            self.emit(indent, '%s = %s.produce_template(context, %s)' % (
+                target, self.constant(strategy), parameter))
+        else:
+            getattr(self, 'produce_' + name)(
+                strategy, parameter, target, indent, depth + 1)
+
+    def is_composite(self, strategy):
+        """Is strategy one whose templates are produced from those of other
+        strategies that we can compile?"""
+        name = handler_for(strategy, 'produce_template')
+        if name == 'mapped':
+            return self.is_composite(strategy.mapped_strategy)
+        return name in COMPOSITES
+
+    def reify(self, strategy, template, depth):
+        """Return an expression for the reification by strategy of the
+        template in the expression template."""
+        name = handler_for(strategy, 'reify')
+        if name is None or depth >= MAX_DEPTH:
+            return '%s.reify(%s)' % (self.constant(strategy), template)
+        return getattr(self, 'reify_' + name)(strategy, template, depth + 1)
+
+    def produce_tuple(self, strategy, parameter, target, indent, depth):
+        parts = []
+        for i, element in enumerate(strategy.element_strategies):
+            element_parameter = self.fresh('p')
+            part = self.fresh('t')
+            self.emit(indent, '%s = %s[%d]' % (
+                element_parameter, parameter, i))
+            self.produce(element, element_parameter, part, indent, depth)
+            parts.append(part)
+        self.emit(indent, '%s = %s' % (
+            target, self.tuple_expression(strategy, parts)))
+
+    def reify_tuple(self, strategy, template, depth):
+        return self.tuple_expression(strategy, [
+            self.reify(element, '%s[%d]' % (template, i), depth)
+            for i, element in enumerate(strategy.element_strategies)
+        ])
+
+    def tuple_expression(self, strategy, parts):
+        if strategy.tuple_type is tuple:
+            if len(parts) == 1:
+                return '(%s,)' % (parts[0],)
+            return '(%s)' % (', '.join(parts),)
+        return '%s(%s)' % (
+            self.constant(strategy.tuple_type), ', '.join(parts))
+
+    def produce_list(self, strategy, parameter, target, indent, depth):
+        element = strategy.element_strategy
+        if element is None:
+            self.emit(indent, '%s = ()' % (target,))
+            return
+        length = self.fresh('n')
+        element_parameter = self.fresh('p')
+        # This is dist.geometric inlined.
+        self.emit(indent, '%s = int(log(uniform()) / log1p(-1.0 / (1 + %s.'
+                  'average_length)))' % (length, parameter))
+        self.emit(indent, '%s = %s.child_parameter' % (
+            element_parameter, parameter))
+        if not self.is_composite(element):
+            # Leaves all have fast batch implementations, which beat
+            # anything we could inline.
+            self.emit(indent, '%s = tuple(%s.draw_templates(context, %s, %s))'
+                      % (target, self.constant(element), element_parameter,
+                         length))
+            return
+        elements = self.fresh('l')
+        part = self.fresh('t')
+        self.emit(indent, '%s = []' % (elements,))
+        self.emit(indent, 'for _ in hrange(%s):' % (length,))
+        self.produce(element, element_parameter, part, indent + 1, depth)
+        self.emit(indent + 1, '%s.append(%s)' % (elements, part))
+        self.emit(indent, '%s = tuple(%s)' % (target, elements))
+
+    def reify_list(self, strategy, template, depth):
+        if strategy.element_strategy is None:
+            return '[]'
+        element = self.fresh('x')
+        return '[%s for %s in %s]' % (
+            self.reify(strategy.element_strategy, element, depth),
+            element, template)
+
+    def produce_set(self, strategy, parameter, target, indent, depth):
+        elements = self.fresh('t')
+        self.produce(
+            strategy.list_strategy, parameter, elements, indent, depth)
+        self.emit(indent, '%s = %s.convert_template(%s)' % (
+            target, self.constant(strategy), elements))
+
+    def reify_set(self, strategy, template, depth):
+        return 'set(%s)' % (
+            self.reify(strategy.list_strategy, template, depth),)
+
+    def produce_one_of(self, strategy, parameter, target, indent, depth):
+        child = self.fresh('i')
+        weights = self.fresh('w')
+        children = strategy.element_strategies
+        # This is chooser.choose inlined.
+        self.emit(indent, '%s = %s.chooser.weights' % (weights, parameter))
+        self.emit(indent, 'while True:')
+        self.emit(indent + 1, '%s = int(uniform() * %d)' % (
+            child, len(children)))
+        self.emit(indent + 1, 'if uniform() <= %s[%s]:' % (weights, child))
+        self.emit(indent + 2, 'break')
+        for i, element in enumerate(children):
+            if i == 0:
+                self.emit(indent, 'if %s == 0:' % (child,))
+            elif i < len(children) - 1:
+                self.emit(indent, 'elif %s == %d:' % (child, i))
+            else:
+                self.emit(indent, 'else:')
+            element_parameter = self.fresh('p')
+            part = self.fresh('t')
+            self.emit(indent + 1, '%s = %s.child_parameters[%d]' % (
+                element_parameter, parameter, i))
+            self.produce(element, element_parameter, part, indent + 1, depth)
+            self.emit(indent + 1, '%s = (%d, %s)' % (target, i, part))
+
+    def reify_one_of(self, strategy, template, depth):
+        value = '%s[1]' % (template,)
+        branches = [
+            self.reify(child, value, depth)
+            for child in strategy.element_strategies
+        ]
+        if len(set(branches)) == 1:
+            # e.g. the children are all floats, which reify to themselves.
+            return branches[0]
+        expression = branches[-1]
+        for i in range(len(branches) - 2, -1, -1):
+            expression = '%s if %s[0] == %d else %s' % (
+                branches[i], template, i, expression)
+        return '(%s)' % (expression,)
+
+    def produce_mapped(self, strategy, parameter, target, indent, depth):
+        self.produce(
+            strategy.mapped_strategy, parameter, target, indent, depth)
+
+    def reify_mapped(self, strategy, template, depth):
+        return '%s.pack(%s)' % (
+            self.constant(strategy),
+            self.reify(strategy.mapped_strategy, template, depth))
+
+    def produce_wrapper_float(
+        self, strategy, parameter, target, indent, depth
+    ):
+        template = self.fresh('t')
+        self.produce(strategy.sub_strategy, parameter, template, indent, depth)
+        self.emit(indent, '%s = %s' % (
+            target, self.reify(strategy.sub_strategy, template, depth)))
+
+    def produce_bool(self, strategy, parameter, target, indent, depth):
+        self.emit(indent, '%s = uniform() <= %s' % (target, parameter))
+
+    def produce_bounded_int(self, strategy, parameter, target, indent, depth):
+        if strategy.start == strategy.end:
+            self.emit(indent, '%s = %d' % (target, strategy.start))
+        else:
+            self.emit(indent, '%s = choice(%s)' % (target, parameter))
+
+    def produce_geometric_int(
+        self, strategy, parameter, target, indent, depth
+    ):
+        self.emit(indent, '%s = int(log(uniform()) / log1p(-%s.p))' % (
+            target, parameter))
+        self.emit(indent, 'if uniform() <= %s.negative_probability:' % (
+            parameter,))
+        self.emit(indent + 1, '%s = -%s' % (target, target))
+
+    def produce_wide_range_int(
+        self, strategy, parameter, target, indent, depth
+    ):
+        self.emit(indent, '%s = %s.center + randint(-%s.width, %s.width)' % (
+            target, parameter, parameter, parameter))
+
+    def produce_just(self, strategy, parameter, target, indent, depth):
+        self.emit(indent, '%s = None' % (target,))
+
+    def reify_just(self, strategy, template, depth):
+        return '%s.value' % (self.constant(strategy),)
+
+    def produce_sampled_from(
+        self, strategy, parameter, target, indent, depth
+    ):
+        if len(strategy.elements) == 1:
+            self.emit(indent, '%s = 0' % (target,))
+        else:
+            self.emit(indent, '%s = %s.choose(random)' % (target, parameter))
+
+    def reify_sampled_from(self, strategy, template, depth):
+        return '%s.elements[%s]' % (self.constant(strategy), template)
+
+    def produce_one_char(self, strategy, parameter, target, indent, depth):
+        self.emit(indent, '%s = choice(%s)' % (target, parameter))
+
+    def reify_identity(self, strategy, template, depth):
+        return template
+
+    def reify_int(self, strategy, template, depth):
+        return 'int(%s)' % (template,)
+
+    def produce_integers_from(
+        self, strategy, parameter, target, indent, depth
+    ):
+        self.emit(indent, '%s = %d + int(log(uniform()) / log1p(-%s))' % (
+            target, strategy.lower_bound, parameter))
+
+    reify_wrapper_float = reify_identity
+    reify_float = reify_identity
+    reify_bool = reify_identity
+    reify_bounded_int = reify_identity
+    reify_integers_from = reify_identity
+    reify_one_char = reify_identity
+    reify_geometric_int = reify_int
+    reify_wide_range_int = reify_int
+
+
+COMPOSITES = frozenset(('tuple', 'list', 'set', 'one_of', 'wrapper_float'))
+
+HANDLERS = {
+    TupleStrategy: 'tuple',
+    ListStrategy: 'list',
+    SetStrategy: 'set',
+    OneOfStrategy: 'one_of',
+    MappedSearchStrategy: 'mapped',
+    WrapperFloatStrategy: 'wrapper_float',
+    FloatStrategy: 'float',
+    BoolStrategy: 'bool',
+    BoundedIntStrategy: 'bounded_int',
+    RandomGeometricIntStrategy: 'geometric_int',
+    WideRangeIntStrategy: 'wide_range_int',
+    IntegersFromStrategy: 'integers_from',
+    JustStrategy: 'just',
+    SampledFromStrategy: 'sampled_from',
+    OneCharStringStrategy: 'one_char',
+}
@@ -41,6 +41,9 @@ class BoolStrategy(SearchStrategy):
     def strictly_simpler(self, x, y):
         return (not x) and y
 
+    def simplicity_key(self, template):
+        return template
+
     def basic_simplify(self, random, value):
         if value:
             yield False
@@ -51,6 +54,10 @@ class BoolStrategy(SearchStrategy):
     def produce_template(self, context, p):
         return dist.biased_coin(context.random, p)
 
+    def produce_templates(self, context, p, n):
+        uniform = context.random.random
+        return [uniform() <= p for _ in hrange(n)]
+
     def to_basic(self, value):
         check_type(bool, value)
         return int(value)
@@ -147,6 +154,9 @@ class SampledFromStrategy(SearchStrategy):
     def strictly_simpler(self, x, y):
         return x < y
 
+    def simplicity_key(self, template):
+        return template
+
     def __repr__(self):
         return 'SampledFromStrategy(%r)' % (self.elements,)
 
@@ -161,6 +171,11 @@ class SampledFromStrategy(SearchStrategy):
             return 0
         return pv.choose(context.random)
 
+    def produce_templates(self, context, pv, n):
+        if len(self.elements) == 1:
+            return [0] * n
+        return pv.choose_many(context.random, n)
+
     def reify(self, template):
         return self.elements[template]
 
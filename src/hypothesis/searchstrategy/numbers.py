@@ -70,6 +70,9 @@ class IntStrategy(SearchStrategy):
             return False
         return 0 <= x < y
 
+    def simplicity_key(self, template):
+        return (template < 0, abs(template))
+
     def try_negate(self, random, x):
         if x >= 0:
             return
@@ -202,6 +205,21 @@ class RandomGeometricIntStrategy(IntStrategy):
             value = -value
         return value
 
+    def produce_templates(self, context, parameter, n):
+        # Inlines dist.geometric and dist.biased_coin, drawing from the
+        # random in the same order.
+        uniform = context.random.random
+        log = math.log
+        denom = math.log1p(-parameter.p)
+        negative_probability = parameter.negative_probability
+        result = []
+        for _ in hrange(n):
+            value = int(log(uniform()) / denom)
+            if uniform() <= negative_probability:
+                value = -value
+            result.append(value)
+        return result
+
 
 class WideRangeIntStrategy(IntStrategy):
     Parameter = namedtuple(
@@ -246,6 +264,9 @@ class BoundedIntStrategy(SearchStrategy):
     def strictly_simpler(self, x, y):
         return x < y
 
+    def simplicity_key(self, template):
+        return template
+
     def produce_parameter(self, random):
         n = 1 + dist.geometric(random, 0.01)
         results = []
@@ -272,6 +293,12 @@ class BoundedIntStrategy(SearchStrategy):
             return self.start
         return context.random.choice(parameter)
 
+    def produce_templates(self, context, parameter, n):
+        if self.start == self.end:
+            return [self.start] * n
+        choice = context.random.choice
+        return [choice(parameter) for _ in hrange(n)]
+
     def basic_simplify(self, random, x):
         if x == self.start:
             return
@@ -308,24 +335,16 @@ class FloatStrategy(SearchStrategy):
         return '%s()' % (self.__class__.__name__,)
 
     def strictly_simpler(self, x, y):
-        if is_integral(x):
-            if not is_integral(y):
-                return True
-            return self.int_strategy.strictly_simpler(int(x), int(y))
-        if is_integral(y):
-            return False
-        if math.isnan(x):
-            return False
-        if math.isnan(y):
-            return True
-        if math.isinf(x) and not math.isinf(y):
-            return False
-        if y > 0:
-            return 0 <= x < y
-        else:
-            # The y == 0 case is handled by is_integral(y)
-            assert y < 0
-            return x > y
+        return self.simplicity_key(x) < self.simplicity_key(y)
+
+    def simplicity_key(self, template):
+        if is_integral(template):
+            return (0, self.int_strategy.simplicity_key(int(template)))
+        if math.isnan(template):
+            return (3,)
+        if math.isinf(template):
+            return (2, template < 0)
+        return (1, template < 0, abs(template))
 
     def to_basic(self, value):
         check_type(float, value)
@@ -425,6 +444,11 @@ class WrapperFloatStrategy(FloatStrategy):
         return self.sub_strategy.reify(
             self.sub_strategy.produce_template(context, pv))
 
+    def produce_templates(self, context, pv, n):
+        return list(map(
+            self.sub_strategy.reify,
+            self.sub_strategy.draw_templates(context, pv, n)))
+
 
 class JustIntFloats(FloatStrategy):
 
@@ -438,6 +462,10 @@ class JustIntFloats(FloatStrategy):
     def produce_template(self, context, pv):
         return float(self.int_strategy.draw_template(context, pv))
 
+    def produce_templates(self, context, pv, n):
+        return list(map(
+            float, self.int_strategy.draw_templates(context, pv, n)))
+
 
 def compose_float(sign, exponent, fraction):
     as_long = (sign << 63) | (exponent << 52) | fraction
@@ -470,6 +498,27 @@ class FullRangeFloats(FloatStrategy):
             context.random.getrandbits(52)
         )
 
+    def produce_templates(self, context, pv, n):
+        if not n:
+            return []
+        random = context.random
+        uniform = random.random
+        # Draw the random bits for every exponent and fraction at once and
+        # slice them up, which is much cheaper than n getrandbits calls.
+        exponents = random.getrandbits(11 * n)
+        fractions = random.getrandbits(52 * n)
+        as_longs = []
+        for i in hrange(n):
+            sign = int(uniform() <= pv.negative_probability)
+            if uniform() <= pv.subnormal_probability:
+                exponent = 0
+            else:
+                exponent = (exponents >> (11 * i)) & 0x7ff
+            fraction = (fractions >> (52 * i)) & 0xfffffffffffff
+            as_longs.append((sign << 63) | (exponent << 52) | fraction)
+        return list(struct.unpack(
+            str('!%dd' % (n,)), struct.pack(str('!%dQ' % (n,)), *as_longs)))
+
 
 class FixedBoundedFloatStrategy(FloatStrategy):
 
@@ -495,20 +544,29 @@ class FixedBoundedFloatStrategy(FloatStrategy):
             leftwards=dist.biased_coin(random, 0.5)
         )
 
-    def produce_template(self, context, pv):
-        random = context.random
+    def interval(self, pv):
         cut = self.lower_bound + pv.cut * (self.upper_bound - self.lower_bound)
         if pv.leftwards:
-            left = self.lower_bound
-            right = cut
+            return self.lower_bound, cut
         else:
-            left = cut
-            right = self.upper_bound
-        return left + random.random() * (right - left)
+            return cut, self.upper_bound
+
+    def produce_template(self, context, pv):
+        left, right = self.interval(pv)
+        return left + context.random.random() * (right - left)
+
+    def produce_templates(self, context, pv, n):
+        left, right = self.interval(pv)
+        width = right - left
+        uniform = context.random.random
+        return [left + uniform() * width for _ in hrange(n)]
 
     def strictly_simpler(self, x, y):
         return x < y
 
+    def simplicity_key(self, template):
+        return template
+
     def simplifiers(self, random, template):
         yield self.basic_simplify
 
@@ -555,6 +613,12 @@ class BoundedFloatStrategy(FloatStrategy):
             context, pv.spread
         ) * pv.length
 
+    def produce_templates(self, context, pv, n):
+        return [
+            pv.left + x * pv.length
+            for x in self.inner_strategy.draw_templates(context, pv.spread, n)
+        ]
+
 
 class GaussianFloatStrategy(FloatStrategy):
 
@@ -572,6 +636,11 @@ class GaussianFloatStrategy(FloatStrategy):
         mean, sd = param
         return context.random.normalvariate(mean, sd)
 
+    def produce_templates(self, context, param, n):
+        mean, sd = param
+        normalvariate = context.random.normalvariate
+        return [normalvariate(mean, sd) for _ in hrange(n)]
+
 
 class ExponentialFloatStrategy(FloatStrategy):
 
@@ -599,6 +668,12 @@ class ExponentialFloatStrategy(FloatStrategy):
             value = -value
         return pv.zero_point + value
 
+    def produce_templates(self, context, pv, n):
+        expovariate = context.random.expovariate
+        sign = -1 if pv.negative else 1
+        return [
+            pv.zero_point + sign * expovariate(pv.lambd) for _ in hrange(n)]
+
 
 class NastyFloats(SampledFromStrategy):
 
@@ -16,14 +16,17 @@ from __future__ import division, print_function, absolute_import, \
 from random import Random
 from collections import namedtuple
 
+from hypothesis.extra import load_entry_points
 from hypothesis.errors import BadData, NoExamples, WrongFormat, \
     UnsatisfiedAssumption
 from hypothesis.control import assume
 from hypothesis.settings import Settings
-from hypothesis.specifiers import OneOf
-from hypothesis.internal.compat import hrange, integer_types
+from hypothesis.specifiers import Just, OneOf, SampledFrom
+from hypothesis.internal.compat import hrange, text_type, binary_type, \
+    integer_types
 from hypothesis.utils.extmethod import ExtMethod
 from hypothesis.internal.chooser import chooser
+from hypothesis.internal.lrucache import LRUCache
 
 
 class BuildContext(object):
@@ -32,13 +35,175 @@ class BuildContext(object):
         self.random = random
 
 
+ATOMIC_SPECIFIER_TYPES = frozenset(integer_types + (
+    bool, text_type, binary_type, type(None),
+))
+
+
+class Identity(object):
+
+    """Cache key component for an object that can only be matched by
+    identity."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, Identity) and self.value is other.value
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return id(self.value)
+
+
+class StrictlySimplerKey(object):
+
+    """Simplicity key for a template of a strategy which has no cheaper one,
+    ordering it by the strategy's strictly_simpler."""
+
+    __slots__ = ('strategy', 'template')
+
+    def __init__(self, strategy, template):
+        self.strategy = strategy
+        self.template = template
+
+    def __lt__(self, other):
+        return self.strategy.strictly_simpler(self.template, other.template)
+
+    def __gt__(self, other):
+        return other.__lt__(self)
+
+    def __le__(self, other):
+        return not other.__lt__(self)
+
+    def __ge__(self, other):
+        return not self.__lt__(other)
+
+    def __eq__(self, other):
+        return not (self.__lt__(other) or other.__lt__(self))
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+
+def value_cache_key(value):
+    """Cache key for a value that ends up in generated data, e.g. the argument
+    to just. Only immutable values are compared by equality: a strategy
+    built for one mutable value must never hand out another."""
+    t = type(value)
+    if t in integer_types:
+        # Equal ints and longs are interchangeable on Python 2, and which of
+        # them arithmetic gives back depends on how big the operands were.
+        return (int, value)
+    if t in ATOMIC_SPECIFIER_TYPES:
+        return (t, value)
+    if t in (float, complex):
+        return (t, repr(value))
+    if t is tuple:
+        return (t, tuple(map(value_cache_key, value)))
+    return Identity(value)
+
+
+def compares_by_value(key):
+    """Whether key, as returned by value_cache_key, may equal the key of
+    some other value, i.e. it is not matched by identity anywhere."""
+    if isinstance(key, Identity):
+        return False
+    if isinstance(key, tuple):
+        return all(map(compares_by_value, key))
+    return True
+
+
+def specifier_cache_key(specifier):
+    """A hashable key for specifier such that two specifiers with the same
+    key will always produce equivalent strategies.
+
+    Containers are compared structurally and in iteration order, types by
+    identity, and anything we do not understand by identity.
+
+    """
+    t = type(specifier)
+    if t in ATOMIC_SPECIFIER_TYPES:
+        return (t, specifier)
+    if t in (float, complex):
+        return (t, repr(specifier))
+    if isinstance(specifier, type):
+        return specifier
+    if t is Just:
+        return (t, value_cache_key(specifier.value))
+    if t is SampledFrom:
+        return (t, tuple(map(value_cache_key, specifier.elements)))
+    if isinstance(specifier, dict):
+        return (t, tuple(
+            (specifier_cache_key(k), specifier_cache_key(v))
+            for k, v in specifier.items()
+        ))
+    if isinstance(specifier, (tuple, list, set, frozenset)):
+        return (t, tuple(map(specifier_cache_key, specifier)))
+    return Identity(specifier)
+
+
 class StrategyExtMethod(ExtMethod):
 
+    """Builds a SearchStrategy for a specifier.
+
+    Strategies are cached on a key of the specifier and the values of the
+    settings named in settings_that_affect_strategies, so repeated calls
+    with the same specifier (including ones made for parts of a larger
+    specifier) share a single strategy. The cache is thrown away whenever
+    a new definition is registered.
+
+    If there is no definition for a specifier, any hypothesis.extra packages
+    that have not been loaded yet are loaded before giving up.
+
+    """
+
+    settings_that_affect_strategies = ('average_list_length',)
+    max_cache_size = 1024
+
+    def __init__(self):
+        super(StrategyExtMethod, self).__init__()
+        self.cache = {}
+        self.cache_version = None
+
     def __call__(self, specifier, settings=None):
         if settings is None:
             settings = Settings()
-        result = super(StrategyExtMethod, self).__call__(specifier, settings)
+        version = (self.mapping.version, self.static_mapping.version)
+        if version != self.cache_version:
+            self.cache.clear()
+            self.cache_version = version
+        try:
+            key = (specifier_cache_key(specifier), tuple(
+                getattr(settings, name)
+                for name in self.settings_that_affect_strategies
+            ))
+            hash(key)
+        except TypeError:
+            key = None
+        if key is not None:
+            try:
+                return self.cache[key]
+            except KeyError:
+                pass
+        try:
+            result = super(StrategyExtMethod, self).__call__(
+                specifier, settings)
+        except NotImplementedError:
+            # The specifier may belong to an extra that has not been loaded
+            # yet.
+            if not load_entry_points():
+                raise
+            return self(specifier, settings)
         assert isinstance(result, SearchStrategy)
+        if key is not None:
+            if len(self.cache) >= self.max_cache_size:
+                self.cache.clear()
+            self.cache[key] = result
         return result
 
 
@@ -82,6 +247,37 @@ def check_length(l, value, e=BadData):
         ))
 
 
+def simplicity_ranks(strategy, templates):
+    """Return a list of ints such that ranks[i] < ranks[j] exactly when
+    templates[i] has a smaller simplicity key for strategy than templates[j].
+
+    This sorts the templates once, after which comparing any two of them is
+    just comparing two ints.
+
+    """
+    keys = list(map(strategy.simplicity_key, templates))
+    order = sorted(hrange(len(keys)), key=keys.__getitem__)
+    ranks = [0] * len(keys)
+    rank = 0
+    for i, j in zip(order, order[1:]):
+        if keys[i] < keys[j]:
+            rank += 1
+        ranks[j] = rank
+    return ranks
+
+
+def length_simplicity_key(strategy, template):
+    """Return a simplicity key for a collection template of strategy which
+    orders it by length, then by strategy's strictly_simpler.
+
+    Collections of the same length are only compared element by element if
+    it comes to it, as working out a key for every element of every
+    collection costs far more than that usually does.
+
+    """
+    return (len(template), StrictlySimplerKey(strategy, template))
+
+
 def one_of_strategies(xs):
     """Helper function for unioning multiple strategies."""
     xs = tuple(xs)
@@ -97,6 +293,30 @@ def strategy_for_one_of(oneof, settings):
     return one_of_strategies([strategy(d, settings) for d in oneof.elements])
 
 
+def defining_class(cls, name):
+    for base in cls.__mro__:
+        if name in base.__dict__:
+            return base
+
+
+consistent_batching = {}
+
+
+def batches_consistently(cls):
+    """Is cls's produce_templates defined no higher up the class hierarchy
+    than its produce_template, so that it produces the same distribution?"""
+    try:
+        return consistent_batching[cls]
+    except KeyError:
+        pass
+    result = issubclass(
+        defining_class(cls, 'produce_templates'),
+        defining_class(cls, 'produce_template'),
+    )
+    consistent_batching[cls] = result
+    return result
+
+
 class SearchStrategy(object):
 
     """A SearchStrategy is an object that knows how to explore data of a given
@@ -195,16 +415,25 @@ class SearchStrategy(object):
             pack=pack, strategy=self
         )
 
-    def flatmap(self, expand):
+    def flatmap(self, expand, cache_by_value=False):
         """Returns a new strategy that generates values by generating a value
         from this strategy, say x, then generating a value from
         strategy(expand(x))
 
+        If cache_by_value is True, equal values of x share a single
+        strategy(expand(x)) rather than each template of this strategy
+        getting its own. This is worth doing when expanding is expensive and
+        many different templates produce the same value. It means reifying
+        the template of x each time its strategy is looked up, and only
+        numbers, strings, None and tuples of them are compared by equality.
+        Templates for any other value are cached as if cache_by_value were
+        False.
+
         This method is part of the  public API.
 
         """
         return FlatMapStrategy(
-            expand=expand, strategy=self
+            expand=expand, strategy=self, cache_by_value=cache_by_value
         )
 
     def filter(self, condition):
@@ -257,6 +486,23 @@ class SearchStrategy(object):
         raise NotImplementedError(  # pragma: no cover
             '%s.produce_template()' % (self.__class__.__name__))
 
+    def produce_templates(self, context, parameter_value, n):
+        """Given this build context and this parameter value, produce a list
+        of n random valid templates for this strategy, distributed as n calls
+        to produce_template would be.
+
+        The default implementation just calls produce_template n times.
+        Strategies which can produce many templates at once more cheaply than
+        that should override it.
+
+        Note: You should not call this directly. Call draw_templates instead.
+
+        """
+        return [
+            self.produce_template(context, parameter_value)
+            for _ in hrange(n)
+        ]
+
     def reify(self, template):
         """Given a template value, deterministically convert it into a value of
         the desired final type."""
@@ -335,6 +581,23 @@ class SearchStrategy(object):
         """
         return self.produce_template(context, parameter_value)
 
+    def draw_templates(self, context, parameter_value, n):
+        """Draw a list of n new template values given this build context and
+        parameter value.
+
+        You should not override this method. Override produce_templates
+        instead. If a subclass overrides produce_template but not
+        produce_templates, this will ignore any produce_templates it
+        inherits and call its produce_template n times instead.
+
+        """
+        if batches_consistently(type(self)):
+            return self.produce_templates(context, parameter_value, n)
+        return [
+            self.produce_template(context, parameter_value)
+            for _ in hrange(n)
+        ]
+
     def strictly_simpler(self, x, y):
         """
         Is the left hand argument *strictly* simpler than the right hand side.
@@ -354,6 +617,22 @@ class SearchStrategy(object):
         """
         return False
 
+    def simplicity_key(self, template):
+        """Return a key for template such that if strictly_simpler(x, y) then
+        simplicity_key(x) < simplicity_key(y). Keys for templates of the same
+        strategy must all be comparable with each other.
+
+        This lets simplifiers which need to rank many templates sort them
+        once instead of comparing them pairwise. The default implementation
+        works for any strategy, but each comparison between its keys calls
+        strictly_simpler, so strategies which can cheaply compute a number or
+        a tuple of them that orders their templates should override it.
+        Collections such as lists and strings order their templates by
+        length and fall back to this lazy comparison for templates of the
+        same length, using length_simplicity_key.
+        """
+        return StrictlySimplerKey(self, template)
+
     def simplifiers(self, random, template):
         """Yield a sequence of functions which each take a Random object and a
         single template and produce a generator over "simpler" versions of that
@@ -462,6 +741,10 @@ class OneOfStrategy(SearchStrategy):
             return False
         return self.element_strategies[lx].strictly_simpler(vx, vy)
 
+    def simplicity_key(self, template):
+        i, value = template
+        return (i, self.element_strategies[i].simplicity_key(value))
+
     def reify(self, value):
         s, x = value
         return self.element_strategies[s].reify(x)
@@ -482,6 +765,17 @@ class OneOfStrategy(SearchStrategy):
             self.element_strategies[child].draw_template(
                 context, pv.child_parameters[child]))
 
+    def produce_templates(self, context, pv, n):
+        children = pv.chooser.choose_many(context.random, n)
+        counts = {}
+        for child in children:
+            counts[child] = counts.get(child, 0) + 1
+        drawn = {}
+        for child, count in counts.items():
+            drawn[child] = iter(self.element_strategies[child].draw_templates(
+                context, pv.child_parameters[child], count))
+        return [(child, next(drawn[child])) for child in children]
+
     def element_simplifier(self, s, simplifier):
         def accept(random, template):
             if template[0] != s:
@@ -547,6 +841,9 @@ class MappedSearchStrategy(SearchStrategy):
     def produce_template(self, context, pv):
         return self.mapped_strategy.produce_template(context, pv)
 
+    def produce_templates(self, context, pv, n):
+        return self.mapped_strategy.draw_templates(context, pv, n)
+
     def pack(self, x):
         """Take a value produced by the underlying mapped_strategy and turn it
         into a value suitable for outputting from this strategy."""
@@ -562,6 +859,9 @@ class MappedSearchStrategy(SearchStrategy):
     def strictly_simpler(self, x, y):
         return self.mapped_strategy.strictly_simpler(x, y)
 
+    def simplicity_key(self, template):
+        return self.mapped_strategy.simplicity_key(template)
+
     def to_basic(self, template):
         return self.mapped_strategy.to_basic(template)
 
@@ -581,6 +881,23 @@ class FilteredStrategy(MappedSearchStrategy):
 
 
 class FlatMapStrategy(SearchStrategy):
+
+    """A strategy which generates a value from strategy and then a value from
+    the strategy that expand turns it into.
+
+    The strategies expand returns are kept in an LRUCache of at most
+    max_strategy_cache_size entries, keyed by the template they were built
+    from or, if cache_by_value is set and the value it reifies to can be
+    compared by equality, by that value, so that equal values share one
+    expanded strategy. Templates whose strategy has
+    been evicted are still valid: Their strategy is built again when it is
+    next needed, and until then they're treated as if they had only their
+    seeds to go on.
+
+    """
+
+    max_strategy_cache_size = 256
+
     TemplateFromSeed = namedtuple(
         'TemplateFromSeed', (
             'source_template', 'parameter_seed', 'template_seed',
@@ -605,11 +922,40 @@ class FlatMapStrategy(SearchStrategy):
         )
 
     def __init__(
-        self, strategy, expand
+        self, strategy, expand, cache_by_value=False
     ):
         self.flatmapped_strategy = strategy
         self.expand = expand
-        self.strategy_cache = {}
+        self.cache_by_value = cache_by_value
+        self.strategy_cache = LRUCache(self.max_strategy_cache_size)
+
+    def strategy_cache_key(self, source_template):
+        if self.cache_by_value:
+            key = value_cache_key(
+                self.flatmapped_strategy.reify(source_template))
+            # A key matched by identity would never be found again, as each
+            # reify produces a fresh value.
+            if compares_by_value(key):
+                return (True, key)
+        return (False, source_template)
+
+    def cached_strategy(self, source_template):
+        """The strategy expand gave for source_template if it is still in the
+        cache, else None."""
+        return self.strategy_cache.get(
+            self.strategy_cache_key(source_template))
+
+    def target_strategy(self, source_template):
+        """The strategy expand gives for source_template, building it if it is
+        not in the cache."""
+        key = self.strategy_cache_key(source_template)
+        result = self.strategy_cache.get(key)
+        if result is None:
+            result = strategy(self.expand(
+                self.flatmapped_strategy.reify(source_template)
+            ))
+            self.strategy_cache[key] = result
+        return result
 
     def produce_parameter(self, random):
         return (
@@ -623,8 +969,8 @@ class FlatMapStrategy(SearchStrategy):
         parameter_seed = context.random.getrandbits(64)
         template_seed = context.random.getrandbits(64)
 
-        if source_template in self.strategy_cache:
-            target = self.strategy_cache[source_template]
+        target = self.cached_strategy(source_template)
+        if target is not None:
             target_parameter = target.draw_parameter(Random(parameter_seed))
             target_template = target.draw_template(
                 BuildContext(Random(template_seed)),
@@ -653,11 +999,11 @@ class FlatMapStrategy(SearchStrategy):
         ):
             return False
         if x.source_template == y.source_template:
-            if x.source_template in self.strategy_cache:
-                strat = self.strategy_cache[x.source_template]
+            strat = self.cached_strategy(x.source_template)
+            if strat is not None:
                 return strat.strictly_simpler(
-                    self.target_template(x),
-                    self.target_template(y),
+                    self.target_template(strat, x),
+                    self.target_template(strat, y),
                 )
             else:
                 return x.template_seed < y.template_seed
@@ -669,14 +1015,14 @@ class FlatMapStrategy(SearchStrategy):
             template.source_template
         ):
             yield self.left_simplifier(simplify)
-        if template.source_template in self.strategy_cache:
-            target_strategy = self.strategy_cache[template.source_template]
-            target_template = self.target_template(template)
+        target_strategy = self.cached_strategy(template.source_template)
+        if target_strategy is not None:
+            target_template = self.target_template(target_strategy, template)
             for simplify in target_strategy.simplifiers(
                 random, target_template
             ):
                 yield self.right_simplifier(
-                    template.source_template, simplify
+                    template.source_template, target_strategy, simplify
                 )
 
     def left_simplifier(self, simplify):
@@ -692,11 +1038,13 @@ class FlatMapStrategy(SearchStrategy):
         )
         return accept
 
-    def right_simplifier(self, source_template, simplify):
+    def right_simplifier(self, source_template, target_strategy, simplify):
         def accept(random, template):
             if template.source_template != source_template:
                 return
-            for simpler in simplify(random, self.target_template(template)):
+            for simpler in simplify(
+                random, self.target_template(target_strategy, template)
+            ):
                 yield self.TemplateFromTemplate(
                     source_template=source_template,
                     parameter_seed=template.parameter_seed,
@@ -708,9 +1056,7 @@ class FlatMapStrategy(SearchStrategy):
         )
         return accept
 
-    def target_template(self, template):
-        assert template.source_template in self.strategy_cache
-        target_strategy = self.strategy_cache[template.source_template]
+    def target_template(self, target_strategy, template):
         if isinstance(template, self.TemplateFromTemplate):
             return template.target_template
         elif isinstance(template, self.TemplateFromBasic):
@@ -729,15 +1075,9 @@ class FlatMapStrategy(SearchStrategy):
         )
 
     def reify(self, template):
-        source_template = template.source_template
-        if source_template not in self.strategy_cache:
-            target_strategy = strategy(self.expand(
-                self.flatmapped_strategy.reify(source_template)
-            ))
-            self.strategy_cache[source_template] = target_strategy
-        else:
-            target_strategy = self.strategy_cache[source_template]
-        return target_strategy.reify(self.target_template(template))
+        target_strategy = self.target_strategy(template.source_template)
+        return target_strategy.reify(
+            self.target_template(target_strategy, template))
 
     def to_basic(self, template):
         bits = [
@@ -747,7 +1087,7 @@ class FlatMapStrategy(SearchStrategy):
         if isinstance(template, self.TemplateFromBasic):
             bits.append(listize_basic(template.basic_data))
         elif isinstance(template, self.TemplateFromTemplate):
-            target_strategy = self.strategy_cache[template.source_template]
+            target_strategy = self.target_strategy(template.source_template)
             bits.append(target_strategy.to_basic(template.target_template))
         else:
             assert isinstance(template, self.TemplateFromSeed)
@@ -13,69 +13,125 @@
 from __future__ import division, print_function, absolute_import, \
     unicode_literals
 
-import sys
 import base64
-import unicodedata
+from collections import namedtuple
 
 import hypothesis.specifiers as specifiers
+import hypothesis.internal.charmap as charmap
 import hypothesis.internal.distributions as dist
+from hypothesis.errors import InvalidArgument
+from hypothesis.internal.ddmin import chunk_simplifier
 from hypothesis.internal.compat import hrange, hunichr, text_type, \
     binary_type
 from hypothesis.searchstrategy.strategies import BadData, SearchStrategy, \
-    MappedSearchStrategy, strategy, check_type, check_length, \
-    check_data_type
+    strategy, check_type, check_length, check_data_type, \
+    length_simplicity_key
 
 
 class OneCharStringStrategy(SearchStrategy):
 
-    """A strategy which generates single character strings of text type."""
+    """A strategy which generates single character strings of text type.
+
+    If categories is None any character other than a surrogate may be
+    generated, otherwise only characters in those Unicode categories. A
+    single letter such as 'L' stands for every category starting with it.
+
+    Characters are drawn and simplified by their index among all the
+    allowed characters, which avoids ever generating one that then has to
+    be rejected.
+
+    """
     specifier = text_type
-    ascii_characters = ''.join(
-        chr(i) for i in hrange(128)
-    )
-    zero_point = ord('0')
+
+    default_categories = frozenset(
+        c for c in charmap.CATEGORIES if c != 'Cs')
+
+    def __init__(self, categories=None):
+        SearchStrategy.__init__(self)
+        if categories is None:
+            categories = self.default_categories
+        self.categories = charmap.expand_categories(categories)
+        self.codepoints = charmap.intervals_for_categories(self.categories)
+        if not self.codepoints:
+            raise InvalidArgument('No characters in categories %r' % (
+                sorted(self.categories),))
+        # The simplest character is '0' if we can generate it, otherwise the
+        # first one after it.
+        self.zero_point = min(
+            self.codepoints.index_above(ord('0')), len(self.codepoints) - 1)
+        self.zero_codepoint = self.codepoints[self.zero_point]
+        self.ascii_limit = self.codepoints.index_above(128)
+
+    def __repr__(self):
+        if self.categories == self.default_categories:
+            return 'OneCharStringStrategy()'
+        return 'OneCharStringStrategy(%r)' % (sorted(self.categories),)
+
+    def character(self, i):
+        return hunichr(self.codepoints[i])
+
+    def index(self, c):
+        return self.codepoints.index(ord(c))
 
     def produce_parameter(self, random):
+        codepoints = self.codepoints
+        size = len(codepoints)
         alphabet_size = 1 + dist.geometric(random, 0.1)
         alphabet = []
-        while len(alphabet) < alphabet_size:
-            if random.randint(0, 10):
-                codepoint = random.randint(0, sys.maxunicode)
+        for _ in hrange(alphabet_size):
+            # Mostly pick characters uniformly, but sometimes bias towards
+            # the simple end of the range.
+            if random.random() >= 1.0 / 11:
+                i = int(random.random() * size)
             else:
-                codepoint = dist.geometric(random, 1.0 / 127)
-
-            char = hunichr(codepoint)
-            if unicodedata.category(char) != 'Cs':
-                alphabet.append(char)
+                i = min(dist.geometric(random, 1.0 / 127), size - 1)
+            alphabet.append(hunichr(codepoints[i]))
         return tuple(alphabet)
 
     def produce_template(self, context, p):
         return context.random.choice(p)
 
+    def produce_templates(self, context, p, n):
+        choice = context.random.choice
+        return [choice(p) for _ in hrange(n)]
+
     def reify(self, value):
         return value
 
+    def strictly_simpler(self, x, y):
+        # Characters are simpler the closer they are to the zero point,
+        # which is what the simplifiers shrink towards.
+        return (
+            abs(ord(x) - self.zero_codepoint), x
+        ) < (
+            abs(ord(y) - self.zero_codepoint), y
+        )
+
+    def simplicity_key(self, template):
+        return (abs(ord(template) - self.zero_codepoint), template)
+
     def simplifiers(self, random, template):
         yield self.try_ascii
-        i = self.zero_point
-        while i < ord(template):
+        i = max(self.zero_point, 1)
+        x = self.index(template)
+        while i < x:
             yield self.try_shrink(i, 2 * i)
             i *= 2
 
     def try_shrink(self, lo, hi):
         def accept(random, template):
-            x = ord(template)
+            x = self.index(template)
             if x <= lo:
                 return
 
             lb = lo
             while True:
-                yield hunichr(lb)
+                yield self.character(lb)
                 new_lb = (lb + x) // 2
                 if new_lb <= lb or new_lb >= hi:
                     return
                 if new_lb > lb + 2:
-                    yield hunichr(random.randint(lb + 1, new_lb - 1))
+                    yield self.character(random.randint(lb + 1, new_lb - 1))
                 lb = new_lb
         accept.__name__ = str(
             'try_shrink(%d, %d)' % (lo, hi)
@@ -83,16 +139,13 @@ class OneCharStringStrategy(SearchStrategy):
         return accept
 
     def try_ascii(self, random, template):
-        if template < '0':
-            for i in hrange(ord(template) + 1, self.zero_point + 1):
-                yield hunichr(i)
+        x = self.index(template)
+        if x < self.zero_point:
+            for i in hrange(x + 1, self.zero_point + 1):
+                yield self.character(i)
 
-        for i in self.ascii_characters:
-            if i < '0':
-                continue
-            if i >= template:
-                break
-            yield i
+        for i in hrange(self.zero_point, min(x, self.ascii_limit)):
+            yield self.character(i)
 
     def to_basic(self, template):
         return template
@@ -100,69 +153,319 @@ class OneCharStringStrategy(SearchStrategy):
     def from_basic(self, data):
         check_data_type(text_type, data)
         check_length(1, data)
+        if ord(data) not in self.codepoints:
+            raise BadData('Character %r not in categories %r' % (
+                data, sorted(self.categories)))
         return data
 
 
-class StringStrategy(MappedSearchStrategy):
+class FlatStringStrategy(SearchStrategy):
 
-    """A strategy for text strings, defined in terms of a strategy for lists of
-    single character text strings."""
+    """Base class for strategies for strings whose templates are the strings
+    themselves rather than tuples of characters, so that a template takes up
+    no more memory than the string it represents and is simplified with
+    string operations.
 
-    def __init__(self, list_of_one_char_strings_strategy):
-        super(StringStrategy, self).__init__(
-            strategy=list_of_one_char_strings_strategy
+    Characters are drawn from character_strategy, and subclasses define how
+    to convert between its templates and strings. If character_strategy is
+    None the only string generated is the empty one.
+
+    """
+
+    Parameter = namedtuple(
+        'Parameter', ('character_parameter', 'average_length')
+    )
+
+    def __init__(self, character_strategy, average_length=50.0):
+        SearchStrategy.__init__(self)
+        self.character_strategy = character_strategy
+        self.average_length = average_length
+        if character_strategy is None:
+            self.size_lower_bound = 1
+            self.size_upper_bound = 1
+
+    def join(self, characters):
+        """The string whose characters have these templates."""
+        raise NotImplementedError(  # pragma: no cover
+            '%s.join()' % (self.__class__.__name__))
+
+    def characters(self, template):
+        """A sequence of the templates of this string's characters."""
+        raise NotImplementedError(  # pragma: no cover
+            '%s.characters()' % (self.__class__.__name__))
+
+    def reify(self, template):
+        return template
+
+    def produce_parameter(self, random):
+        if self.character_strategy is None:
+            return None
+        return self.Parameter(
+            average_length=random.expovariate(1.0 / self.average_length),
+            character_parameter=self.character_strategy.draw_parameter(
+                random),
         )
 
+    def produce_template(self, context, pv):
+        if self.character_strategy is None:
+            return self.join(())
+        length = dist.geometric(context.random, 1.0 / (1 + pv.average_length))
+        return self.join(self.character_strategy.draw_templates(
+            context, pv.character_parameter, length))
+
+    def strictly_simpler(self, x, y):
+        if len(x) != len(y):
+            return len(x) < len(y)
+        if not x:
+            return False
+        simpler = self.character_strategy.strictly_simpler
+        for u, v in zip(self.characters(x), self.characters(y)):
+            if u == v:
+                continue
+            if simpler(u, v):
+                return True
+            if simpler(v, u):
+                return False
+        return False
+
+    def simplicity_key(self, template):
+        return length_simplicity_key(self, template)
+
+    def simplifiers(self, random, template):
+        if not template:
+            return
+        yield self.simplify_to_empty
+        yield self.simplify_to_singletons
+        yield self.simplify_with_character_cloning
+        yield chunk_simplifier(len, self.delete_chunk)
+        yield self.simplify_runs
+        yield self.simplify_shared_characters
+        for i in self.indices_roughly_from_worst_to_best(random, template):
+            yield self.simplifier_for_index(i)
+
+    def simplify_to_empty(self, random, template):
+        if template:
+            yield self.join(())
+
+    def delete_chunk(self, template, start, end):
+        return template[:start] + template[end:]
+
+    def simplify_to_singletons(self, random, template):
+        if len(template) <= 1:
+            return
+        seen = set()
+        for c in self.characters(template):
+            if c not in seen:
+                seen.add(c)
+                yield self.join((c,))
+
+    def simplest_character(self, template):
+        """The simplest character in template, and whether any of its other
+        characters are strictly less simple."""
+        characters = self.characters(template)
+        keys = list(map(self.character_strategy.simplicity_key, characters))
+        best = min(hrange(len(keys)), key=keys.__getitem__)
+        return characters[best], keys[best] < max(keys)
+
+    def simplify_with_character_cloning(self, random, template):
+        """Replace every character with the simplest one in the string."""
+        if not template:
+            return
+        best, any_shrinks = self.simplest_character(template)
+        if any_shrinks:
+            yield self.join((best,)) * len(template)
+
+    def runs(self, template):
+        """Return (start, end, character) for each maximal run of at least
+        two copies of the same character in template, longest runs first."""
+        characters = self.characters(template)
+        runs = []
+        start = 0
+        for i in hrange(1, len(characters) + 1):
+            if i == len(characters) or characters[i] != characters[start]:
+                if i - start > 1:
+                    runs.append((start, i, characters[start]))
+                start = i
+        runs.sort(key=lambda run: run[0] - run[1])
+        return runs
+
+    def simplify_runs(self, random, template):
+        """Collapse each run of the same character down to a single copy of
+        it, or replace the whole run with the simplest character in the
+        string."""
+        if not template:
+            return
+        best, _ = self.simplest_character(template)
+        simpler = self.character_strategy.strictly_simpler
+        for start, end, c in self.runs(template):
+            yield template[:start + 1] + template[end:]
+            if simpler(best, c):
+                yield (
+                    template[:start] +
+                    self.join((best,)) * (end - start) +
+                    template[end:]
+                )
+
+    def simplify_shared_characters(self, random, template):
+        """Replace every copy of a character that appears more than once with
+        a simpler character, most common characters first."""
+        counts = {}
+        for c in self.characters(template):
+            counts[c] = counts.get(c, 0) + 1
+        shared = [c for c, k in counts.items() if k > 1]
+        shared.sort(key=lambda c: -counts[c])
+        for c in shared:
+            old = self.join((c,))
+            for simpler in self.character_strategy.full_simplify(random, c):
+                yield template.replace(old, self.join((simpler,)))
+
+    def indices_roughly_from_worst_to_best(self, random, template):
+        keys = list(map(
+            self.character_strategy.simplicity_key,
+            self.characters(template)))
+        indices = list(hrange(len(keys)))
+        random.shuffle(indices)
+        indices.sort(key=keys.__getitem__, reverse=True)
+        return indices
+
+    def simplifier_for_index(self, i):
+        def accept(random, template):
+            if i >= len(template):
+                return
+            c, = self.characters(template[i:i + 1])
+            for simpler in self.character_strategy.full_simplify(random, c):
+                yield template[:i] + self.join((simpler,)) + template[i + 1:]
+        accept.__name__ = str('simplifier_for_index(%d)' % (i,))
+        return accept
+
+
+class StringStrategy(FlatStringStrategy):
+
+    """A strategy for text strings.
+
+    If alphabet is None characters come from a OneCharStringStrategy for
+    categories. Otherwise they are drawn from alphabet, with characters
+    earlier in it considered simpler.
+
+    """
+
+    def __init__(self, alphabet=None, average_length=50.0, categories=None):
+        if alphabet is None:
+            self.alphabet = None
+            character_strategy = OneCharStringStrategy(categories)
+        else:
+            self.alphabet = []
+            self.indices = {}
+            for c in alphabet:
+                if c not in self.indices:
+                    self.indices[c] = len(self.alphabet)
+                    self.alphabet.append(c)
+            self.alphabet = tuple(self.alphabet)
+            if self.alphabet:
+                character_strategy = strategy(
+                    specifiers.sampled_from(self.alphabet))
+            else:
+                character_strategy = None
+        super(StringStrategy, self).__init__(
+            character_strategy, average_length=average_length)
+
     def __repr__(self):
-        return 'StringStrategy()'
+        if self.alphabet is None:
+            if self.character_strategy.categories != (
+                OneCharStringStrategy.default_categories
+            ):
+                return 'StringStrategy(categories=%r)' % (
+                    sorted(self.character_strategy.categories),)
+            return 'StringStrategy()'
+        return 'StringStrategy(%r)' % (''.join(self.alphabet),)
+
+    def join(self, characters):
+        if self.alphabet is None:
+            return ''.join(characters)
+        alphabet = self.alphabet
+        return ''.join([alphabet[i] for i in characters])
+
+    def characters(self, template):
+        if self.alphabet is None:
+            return template
+        indices = self.indices
+        return [indices[c] for c in template]
 
-    def pack(self, ls):
-        return ''.join(ls)
+    def to_basic(self, template):
+        check_type(text_type, template)
+        return template
+
+    def from_basic(self, data):
+        if isinstance(data, list):
+            # Strings used to be saved as lists of characters.
+            for c in data:
+                check_data_type(text_type, c)
+                check_length(1, c)
+            data = ''.join(data)
+        check_data_type(text_type, data)
+        if self.alphabet is None:
+            codepoints = self.character_strategy.codepoints
+            for c in data:
+                if ord(c) not in codepoints:
+                    raise BadData('Character %r not in categories %r' % (
+                        c, sorted(self.character_strategy.categories)))
+        else:
+            for c in data:
+                if c not in self.indices:
+                    raise BadData('Character %r not in alphabet %r' % (
+                        c, ''.join(self.alphabet)))
+        return data
 
 
-class BinaryStringStrategy(MappedSearchStrategy):
+class BinaryStringStrategy(FlatStringStrategy):
 
-    """A strategy for strings of bytes, defined in terms of a strategy for
-    lists of bytes."""
+    """A strategy for strings of bytes."""
+
+    def __init__(self, average_length=50.0):
+        super(BinaryStringStrategy, self).__init__(
+            strategy(specifiers.integers_in_range(0, 255)),
+            average_length=average_length,
+        )
 
     def __repr__(self):
         return 'BinaryStringStrategy()'
 
-    def pack(self, x):
-        assert isinstance(x, list), repr(x)
-        ba = bytearray(x)
-        return binary_type(ba)
+    def join(self, characters):
+        return binary_type(bytearray(characters))
+
+    def characters(self, template):
+        return bytearray(template)
 
-    def to_basic(self, value):
-        check_type(tuple, value)
-        if value:
-            check_type(int, value[0])
-        packed = binary_type(bytearray(value))
-        return base64.b64encode(packed).decode('utf-8')
+    def to_basic(self, template):
+        check_type(binary_type, template)
+        return base64.b64encode(template).decode('utf-8')
 
     def from_basic(self, data):
         check_data_type(text_type, data)
         try:
-            return tuple(bytearray(base64.b64decode(data.encode('utf-8'))))
+            return binary_type(base64.b64decode(data.encode('utf-8')))
         except Exception as e:
             raise BadData(*e.args)
 
 
 @strategy.extend(specifiers.Strings)
 def define_text_type_from_alphabet(specifier, settings):
-    if not specifier.alphabet:
-        return StringStrategy(strategy([], settings))
-    return StringStrategy(strategy(
-        [specifiers.sampled_from(specifier.alphabet)], settings))
+    return StringStrategy(
+        specifier.alphabet, average_length=settings.average_list_length)
+
+
+@strategy.extend(specifiers.StringsInCategories)
+def define_text_type_from_categories(specifier, settings):
+    return StringStrategy(
+        categories=specifier.categories,
+        average_length=settings.average_list_length)
 
 
 @strategy.extend_static(text_type)
 def define_text_type_strategy(specifier, settings):
-    return StringStrategy(strategy([OneCharStringStrategy()], settings))
+    return StringStrategy(average_length=settings.average_list_length)
 
 
 @strategy.extend_static(binary_type)
 def define_binary_strategy(specifier, settings):
-    return BinaryStringStrategy(
-        strategy=strategy([specifiers.integers_in_range(0, 255)], settings),
-    )
+    return BinaryStringStrategy(average_length=settings.average_list_length)
@@ -224,14 +224,20 @@ class Settings(object):
         value will be used (even if it was None). If not and the
         database_file setting is not None this will be lazily loaded as
         an SQLite backed ExampleDatabase using that file the first time
-        this property is accessed.
+        this property is accessed. If database_file is a directory then
+        the ExampleDatabase stores its examples as files in there instead.
 
         """
         if self._database is not_set and self.database_file is not None:
             from hypothesis.database import ExampleDatabase
-            from hypothesis.database.backend import SQLiteBackend
+            from hypothesis.database.backend import SQLiteBackend, \
+                DirectoryBackend
+            if os.path.isdir(self.database_file):
+                backend = DirectoryBackend(self.database_file)
+            else:
+                backend = SQLiteBackend(self.database_file)
             self._database = databases.get(self.database_file) or (
-                ExampleDatabase(backend=SQLiteBackend(self.database_file)))
+                ExampleDatabase(backend=backend))
             databases[self.database_file] = self._database
         return self._database
 
@@ -295,6 +301,72 @@ applied.
 """
 )
 
+Settings.define_setting(
+    'workers',
+    default=1,
+    description="""
+If this is greater than 1 then Hypothesis will search for a falsifying example
+in this many forked processes at once, each with its own source of randomness.
+The max_examples and timeout limits apply to the search as a whole, and the
+first falsifying example found by any process is the one that gets shrunk.
+If calls to your test are slow enough for it to be worthwhile, shrinking then
+tries candidate simplifications in this many worker processes, which gives the
+same result as trying them one at a time. This is only supported on platforms
+with os.fork and is otherwise ignored.
+"""
+)
+
+Settings.define_setting(
+    'vectorize_parameters',
+    default=False,
+    description="""
+If this is True then, for runs with enough examples that it is worth it,
+Hypothesis will use NumPy (which must be installed) to choose between the
+parameters it generates examples from. This is much faster when max_examples is
+large, but draws different random numbers, so derandomized runs will not give
+the same examples as they do when this is False.
+"""
+)
+
+Settings.define_setting(
+    'max_exact_tracking',
+    default=None,
+    description="""
+Hypothesis remembers every example it has tried in a run so that it never
+tries the same one twice. If this is not None then once it has seen this many
+it switches to a probabilistic set for the rest of the run, which takes a few
+bytes per example rather than a copy of it, but will very occasionally skip an
+example it has not actually tried.
+"""
+)
+
+Settings.define_setting(
+    'adaptive_simplification',
+    default=False,
+    description="""
+If this is True then rather than always running simplification passes in the
+same order, Hypothesis will keep track of how many successful shrinks each pass
+produces per call to your test and try the most productive passes first. These
+statistics are saved in the example database, if there is one, so that later
+runs of the same test start out with a good order.
+"""
+)
+
+Settings.define_setting(
+    'replay_only',
+    default=lambda: os.getenv(
+        'HYPOTHESIS_REPLAY_ONLY', ''
+    ).strip().lower() in ('true', '1', 'yes'),
+    description="""
+If this is True then tests decorated with @given will only replay the examples
+saved for them in the database, without generating any new ones, and pass if
+none of those fail. This makes for a quick check that previously found bugs
+have not come back. A test with no saved examples to replay reports that it
+did not run any. It defaults to True if the HYPOTHESIS_REPLAY_ONLY
+environment variable is set to true, 1 or yes (in any case).
+"""
+)
+
 Settings.define_setting(
     'derandomize',
     default=False,
@@ -85,3 +85,14 @@ Strings = namedtuple('Strings', ('alphabet',))
 
 def strings(alphabet):
     return Strings(text_type(alphabet))
+
+
+StringsInCategories = namedtuple('StringsInCategories', ('categories',))
+
+
+def strings_in_categories(categories):
+    """Text strings containing only characters in these Unicode categories,
+    where a single letter such as 'L' stands for every category starting
+    with it."""
+    from hypothesis.internal.charmap import expand_categories
+    return StringsInCategories(expand_categories(categories))
@@ -34,6 +34,7 @@ from hypothesis.errors import Flaky, NoSuchExample, InvalidDefinition, \
 from hypothesis.settings import Settings, Verbosity
 from hypothesis.reporting import report, verbose_report, current_verbosity
 from hypothesis.utils.show import show
+from hypothesis.internal.ddmin import chunk_simplifier
 from hypothesis.internal.compat import hrange, integer_types
 from hypothesis.searchstrategy.misc import JustStrategy, \
     SampledFromStrategy
@@ -331,8 +332,7 @@ class StateMachineSearchStrategy(SearchStrategy):
 
     def simplifiers(self, random, template):
         yield self.cut_steps
-        yield self.random_discards
-        yield self.delete_elements
+        yield chunk_simplifier(self.count_live_steps, self.delete_steps)
         for i in hrange(len(template.record)):
             if template.record[i] != TOMBSTONE:
                 strategy, data = template.record[i]
@@ -368,28 +368,6 @@ class StateMachineSearchStrategy(SearchStrategy):
         ))
         return accept
 
-    def random_discards(self, random, template):
-        live = len([
-            r for r in template.record if r != TOMBSTONE
-        ])
-        if live < 10:
-            return
-
-        for k in hrange(1, 8):
-            for _ in hrange(10):
-                new_record = list(template.record)
-                for i in hrange(len(template.record)):
-                    if new_record[i] != TOMBSTONE:
-                        if random.randint(0, 9) <= k:
-                            new_record[i] = TOMBSTONE
-                yield StateMachineRunner(
-                    parameter_seed=template.parameter_seed,
-                    template_seed=template.template_seed,
-                    templates=template.templates,
-                    n_steps=template.n_steps,
-                    record=new_record,
-                )
-
     def cut_steps(self, random, template):
         if len(template.record) < template.n_steps:
             yield StateMachineRunner(
@@ -423,24 +401,27 @@ class StateMachineSearchStrategy(SearchStrategy):
                 record=new_record,
             )
 
-    def delete_elements(self, random, template):
-        deletes = 0
-        indices = list(hrange(len(template.record)))
-        random.shuffle(indices)
-        for i in indices:
-            if deletes >= 10:
-                break
-            if template.record[i] != TOMBSTONE:
-                deletes += 1
-                new_record = list(template.record)
-                new_record[i] = TOMBSTONE
-                yield StateMachineRunner(
-                    parameter_seed=template.parameter_seed,
-                    template_seed=template.template_seed,
-                    templates=template.templates,
-                    n_steps=template.n_steps,
-                    record=new_record,
-                )
+    def live_steps(self, template):
+        return [
+            i for i, r in enumerate(template.record) if r != TOMBSTONE
+        ]
+
+    def count_live_steps(self, template):
+        return len(self.live_steps(template))
+
+    def delete_steps(self, template, start, end):
+        """Delete the steps from the start'th to the end'th of those which
+        have not already been deleted."""
+        new_record = list(template.record)
+        for i in self.live_steps(template)[start:end]:
+            new_record[i] = TOMBSTONE
+        return StateMachineRunner(
+            parameter_seed=template.parameter_seed,
+            template_seed=template.template_seed,
+            templates=template.templates,
+            n_steps=template.n_steps,
+            record=new_record,
+        )
 
 
 Rule = namedtuple(
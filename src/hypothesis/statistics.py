@@ -0,0 +1,251 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+"""Opt-in collection of statistics about where Hypothesis spends its time.
+
+Every @given test and find call that runs inside a collect_statistics()
+block records a RunStatistics object into the active collector:
+
+.. code:: python
+
+    with collect_statistics() as collector:
+        test_something()
+    for run in collector.runs:
+        print(run.name, run.phases['test'].total)
+    collector.dump(open('statistics.json', 'w'))
+
+Work done in worker processes (see the workers setting) is not included.
+
+This API is experimental and should be considered semi-public.
+
+"""
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+import json
+import math
+import time
+from random import Random
+from contextlib import contextmanager
+
+from hypothesis.utils.dynamicvariables import DynamicVariable
+
+
+class PhaseTimings(object):
+
+    """The durations, in seconds, of every recorded occurrence of a single
+    phase of a run.
+
+    The count, total, min and max are exact. Percentiles are taken from a
+    uniform sample of at most max_samples of the durations, so they are exact
+    until more than that many have been recorded, and a long run doesn't keep
+    every duration in memory.
+
+    """
+
+    max_samples = 1000
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.samples = []
+        self.random = Random(0)
+
+    def __repr__(self):
+        return 'PhaseTimings(count=%d, total=%.6f)' % (
+            self.count, self.total)
+
+    def record(self, duration):
+        self.count += 1
+        self.total += duration
+        if self.min is None or duration < self.min:
+            self.min = duration
+        if self.max is None or duration > self.max:
+            self.max = duration
+        if len(self.samples) < self.max_samples:
+            self.samples.append(duration)
+        else:
+            i = self.random.randint(0, self.count - 1)
+            if i < self.max_samples:
+                self.samples[i] = duration
+
+    @property
+    def mean(self):
+        if not self.count:
+            return 0.0
+        return self.total / self.count
+
+    def percentile(self, p):
+        """Returns the duration below which p percent of the recorded
+        durations fall, using the nearest rank method."""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        rank = int(math.ceil(p / 100.0 * len(ordered)))
+        return ordered[max(rank, 1) - 1]
+
+    def as_basic(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.mean,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'min': self.min if self.count else 0.0,
+            'max': self.max if self.count else 0.0,
+        }
+
+
+class RunStatistics(object):
+
+    """Statistics about a single run of a @given test or find call.
+
+    phases maps phase names to PhaseTimings. The phases recorded are:
+
+    * produce_parameter: Drawing a new parameter from the strategy.
+    * produce_template: Drawing a template from a parameter.
+    * track: Checking templates for duplicates.
+    * reify: Turning templates into the values passed to the test.
+    * test: Running the test body (or the condition passed to find).
+    * shrink: The whole of simplification, recorded once per run.
+
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.phases = {}
+        self.examples = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.shrink_calls = 0
+        self.successful_shrinks = 0
+
+    def __repr__(self):
+        return 'RunStatistics(%r)' % (self.name,)
+
+    def record(self, phase, duration):
+        try:
+            timings = self.phases[phase]
+        except KeyError:
+            timings = PhaseTimings()
+            self.phases[phase] = timings
+        timings.record(duration)
+
+    @contextmanager
+    def timing(self, phase):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.record(phase, time.time() - start)
+
+    @property
+    def rejection_rate(self):
+        """The fraction of generated examples rejected by assume()."""
+        if not self.examples:
+            return 0.0
+        return self.rejected / self.examples
+
+    @property
+    def duplicate_rate(self):
+        """The fraction of generated templates that had already been seen."""
+        total = self.examples + self.duplicates
+        if not total:
+            return 0.0
+        return self.duplicates / total
+
+    @property
+    def calls_per_shrink(self):
+        """The average number of calls made while shrinking per successful
+        shrink, or None if there were no successful shrinks."""
+        if not self.successful_shrinks:
+            return None
+        return self.shrink_calls / self.successful_shrinks
+
+    def as_basic(self):
+        return {
+            'name': self.name,
+            'examples': self.examples,
+            'duplicates': self.duplicates,
+            'rejected': self.rejected,
+            'rejection_rate': self.rejection_rate,
+            'duplicate_rate': self.duplicate_rate,
+            'shrink_calls': self.shrink_calls,
+            'successful_shrinks': self.successful_shrinks,
+            'calls_per_shrink': self.calls_per_shrink,
+            'phases': dict(
+                (phase, timings.as_basic())
+                for phase, timings in self.phases.items()
+            ),
+        }
+
+
+class NoStatistics(RunStatistics):
+
+    """A RunStatistics that throws everything recorded into it away, used when
+    no collector is active."""
+
+    def __init__(self):
+        super(NoStatistics, self).__init__(None)
+
+    def record(self, phase, duration):
+        pass
+
+    @contextmanager
+    def timing(self, phase):
+        yield
+
+
+class StatisticsCollector(object):
+
+    """Gathers the RunStatistics of every run made while it is active."""
+
+    def __init__(self):
+        self.runs = []
+
+    def as_basic(self):
+        return [run.as_basic() for run in self.runs]
+
+    def to_json(self):
+        return json.dumps(self.as_basic())
+
+    def dump(self, f):
+        """Write these statistics as JSON to the file-like object f."""
+        json.dump(self.as_basic(), f)
+
+
+collector = DynamicVariable(None)
+
+
+@contextmanager
+def collect_statistics(statistics_collector=None):
+    """Make statistics_collector (or a new StatisticsCollector if it is None)
+    the active collector for the duration of the block, yielding it."""
+    if statistics_collector is None:
+        statistics_collector = StatisticsCollector()
+    with collector.with_value(statistics_collector):
+        yield statistics_collector
+
+
+def new_run_statistics(name):
+    """Create the RunStatistics for a new run and register it with the active
+    collector. If there is no active collector the result does nothing."""
+    current = collector.value
+    if current is None:
+        return NoStatistics()
+    result = RunStatistics(name)
+    current.runs.append(result)
+    return result
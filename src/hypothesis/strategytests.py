@@ -49,6 +49,9 @@ class TemplatesStrategy(SearchStrategy):
     def strictly_simpler(self, x, y):
         return self.base_strategy.strictly_simpler(x, y)
 
+    def simplicity_key(self, template):
+        return self.base_strategy.simplicity_key(template)
+
     def produce_template(self, context, pv):
         return self.base_strategy.produce_template(context, pv)
 
@@ -220,6 +223,14 @@ def strategy_test_suite(
                 strat.strictly_simpler(y, x)
             )
 
+        @given(
+            TemplatesFor(specifier), TemplatesFor(specifier),
+            settings=settings
+        )
+        def test_simplicity_key_agrees_with_strictly_simpler(self, x, y):
+            if strat.strictly_simpler(x, y):
+                assert strat.simplicity_key(x) < strat.simplicity_key(y)
+
         def test_will_handle_a_really_weird_failure(self):
             db = ExampleDatabase()
 
@@ -339,4 +350,13 @@ def strategy_test_suite(
             parameter = strat.draw_parameter(random)
             strat.draw_template(BuildContext(random), parameter)
 
+        @given(Random, settings=settings)
+        def test_can_create_many_templates(self, random):
+            parameter = strat.draw_parameter(random)
+            templates = strat.draw_templates(
+                BuildContext(random), parameter, 5)
+            assert len(templates) == 5
+            for template in templates:
+                hash(template)
+
     return ValidationSuite
@@ -9,3 +9,5 @@
 # obtain one at http://mozilla.org/MPL/2.0/.
 
 # END HEADER
+
+
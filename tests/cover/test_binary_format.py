@@ -0,0 +1,89 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+import json
+
+import pytest
+from hypothesis import given
+from hypothesis.errors import BadData
+from tests.common import settings
+from hypothesis.internal.compat import text_type, binary_type
+from hypothesis.database.formats import JSONFormat, BinaryFormat
+
+basic = [
+    None, True, False, 0, 1, -1, 127, 128, -129, 2 ** 64, -(10 ** 50),
+    '', 'hello', '☃', '\ud800', [], [[]], [1, [None, 'a', [True]]],
+]
+
+
+@pytest.mark.parametrize('value', basic)
+def test_round_trips_basic_data(value):
+    format = BinaryFormat()
+    data = format.serialize_basic(value)
+    assert isinstance(data, binary_type)
+    assert format.deserialize_data(data) == value
+
+
+@given([(int, text_type, [bool], None)], settings=settings)
+def test_round_trips_generated_data(xs):
+    value = [[x, s, bs, n] for x, s, bs, n in xs]
+    format = BinaryFormat(compression_threshold=16)
+    assert format.deserialize_data(format.serialize_basic(value)) == value
+
+
+def test_is_smaller_than_json():
+    value = [list('hello world') for _ in range(10)]
+    assert len(BinaryFormat().serialize_basic(value)) < len(
+        JSONFormat().serialize_basic(value)) // 2
+
+
+def test_compresses_large_values():
+    value = ['a'] * 10000
+    small = BinaryFormat().serialize_basic(value)
+    big = BinaryFormat(compression_threshold=10 ** 6).serialize_basic(value)
+    assert len(small) < len(big) // 10
+    assert BinaryFormat().deserialize_data(small) == value
+
+
+def test_does_not_compress_when_it_would_not_help():
+    format = BinaryFormat(compression_threshold=0)
+    assert format.serialize_basic(None) == b'\x00\x00'
+
+
+def test_rejects_non_basic_data():
+    with pytest.raises(ValueError):
+        BinaryFormat().serialize_basic({})
+
+
+@pytest.mark.parametrize('data', [
+    b'', b'\x02', b'\x00', b'\x00\x07', b'\x00\x03', b'\x00\x03\x80',
+    b'\x00\x22a', b'\x00\x85\x01', b'\x00\xc0',
+    b'\x00\x05\x02a', b'\x00\x05\x01\xff', b'\x00\x06\x05', b'\x00\x00\x00',
+    b'\x01not zlib',
+])
+def test_rejects_corrupt_data(data):
+    with pytest.raises(BadData):
+        BinaryFormat().deserialize_data(data)
+
+
+def test_repr_is_nice():
+    assert repr(BinaryFormat()) == 'BinaryFormat()'
+
+
+def test_json_and_binary_agree():
+    value = [1, ['a', None, [True, False]]]
+    assert BinaryFormat().deserialize_data(
+        BinaryFormat().serialize_basic(value)
+    ) == json.loads(JSONFormat().serialize_basic(value))
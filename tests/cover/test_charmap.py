@@ -0,0 +1,123 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+import os
+import sys
+import unicodedata
+
+import pytest
+import hypothesis.internal.charmap as cm
+from hypothesis import given, strategy
+from hypothesis.errors import InvalidArgument
+from hypothesis.specifiers import strings_in_categories
+from hypothesis.internal.compat import hunichr
+from hypothesis.searchstrategy.strategies import BadData
+
+
+def test_charmap_covers_every_codepoint_once():
+    intervals = sorted(
+        interval for intervals in cm.charmap().values()
+        for interval in intervals)
+    assert intervals[0][0] == 0
+    assert intervals[-1][1] == sys.maxunicode
+    for (_, end), (start, _) in zip(intervals, intervals[1:]):
+        assert start == end + 1
+
+
+def test_charmap_has_right_categories():
+    for category, intervals in cm.charmap().items():
+        for start, end in intervals:
+            assert unicodedata.category(hunichr(start)) == category
+            assert unicodedata.category(hunichr(end)) == category
+
+
+def test_charmap_is_reloaded_from_file():
+    table = cm.charmap()
+    assert os.path.exists(cm.charmap_file())
+    cm._charmap = None
+    assert cm.charmap() == table
+
+
+def test_rebuilds_corrupt_charmap_file():
+    table = cm.charmap()
+    with open(cm.charmap_file(), 'w') as f:
+        f.write('[')
+    cm._charmap = None
+    assert cm.charmap() == table
+
+
+def test_expands_major_categories():
+    assert cm.expand_categories(['N', 'Lu']) == frozenset(
+        ('Nd', 'Nl', 'No', 'Lu'))
+
+
+@pytest.mark.parametrize('category', ['', 'X', 'Lx', 'Lul'])
+def test_rejects_unknown_categories(category):
+    with pytest.raises(InvalidArgument):
+        cm.expand_categories([category])
+
+
+def test_interval_set_indexing():
+    intervals = cm.IntervalSet([(10, 12), (0, 2), (3, 4), (20, 20)])
+    assert intervals.intervals == ((0, 4), (10, 12), (20, 20))
+    assert len(intervals) == 9
+    elements = [0, 1, 2, 3, 4, 10, 11, 12, 20]
+    assert [intervals[i] for i in range(len(intervals))] == elements
+    assert intervals[-1] == 20
+    for i, x in enumerate(elements):
+        assert intervals.index(x) == i
+        assert x in intervals
+    for x in (-1, 5, 9, 13, 21):
+        assert x not in intervals
+        with pytest.raises(ValueError):
+            intervals.index(x)
+    with pytest.raises(IndexError):
+        intervals[9]
+
+
+def test_interval_set_index_above():
+    intervals = cm.IntervalSet([(3, 4), (10, 12)])
+    assert intervals.index_above(0) == 0
+    assert intervals.index_above(4) == 1
+    assert intervals.index_above(5) == 2
+    assert intervals.index_above(11) == 3
+    assert intervals.index_above(13) == 5
+
+
+def test_intervals_for_categories_are_cached():
+    assert cm.intervals_for_categories(['L']) is cm.intervals_for_categories(
+        ['Ll', 'Lm', 'Lo', 'Lt', 'Lu'])
+
+
+@given(strings_in_categories(['Lu', 'Nd']))
+def test_only_generates_characters_in_categories(s):
+    for c in s:
+        assert unicodedata.category(c) in ('Lu', 'Nd')
+
+
+@given(strings_in_categories(['Sm']))
+def test_generates_characters_in_categories_without_a_zero(s):
+    for c in s:
+        assert unicodedata.category(c) == 'Sm'
+
+
+def test_rejects_saved_characters_outside_categories():
+    with pytest.raises(BadData):
+        strategy(strings_in_categories(['Lu'])).from_basic('Aa')
+
+
+def test_cannot_ask_for_text_in_no_categories():
+    with pytest.raises(InvalidArgument):
+        strategy(strings_in_categories([]))
@@ -41,3 +41,11 @@ def test_cannot_choose_all_zero_weights():
 
 def test_can_choose_one():
     chooser([1]).choose(random) == 0
+
+
+def test_choose_many_only_chooses_non_zero_weights():
+    assert chooser([0, 1, 0]).choose_many(random, 10) == [1] * 10
+
+
+def test_choose_many_can_choose_everything():
+    assert set(chooser([1, 2, 3]).choose_many(random, 1000)) == set([0, 1, 2])
@@ -84,3 +84,19 @@ def test_all_mappings_yields_all_mappings():
     x[C] = 4
     x[A] = 5
     assert list(x.all_mappings(BC)) == [2, 3, 4, 5, 1]
+
+
+def test_resolution_is_invalidated_by_setting():
+    x = ClassMap()
+    x[A] = 1
+    assert x[D] == 1
+    x[C] = 3
+    assert x[D] == 3
+
+
+def test_caches_missing_resolutions():
+    x = ClassMap()
+    with pytest.raises(KeyError):
+        x[D]
+    x[A] = 1
+    assert x[D] == 1
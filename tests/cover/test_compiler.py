@@ -0,0 +1,111 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+from random import Random
+
+import pytest
+from hypothesis import Settings, given, strategy
+from tests.common import standard_types
+from hypothesis.utils.show import show
+from hypothesis.internal.compat import hrange, text_type
+from hypothesis.searchstrategy.misc import BoolStrategy
+from hypothesis.searchstrategy.compiler import MAX_DEPTH, compile_strategy
+from hypothesis.searchstrategy.strategies import BuildContext
+
+
+compiled_specifiers = standard_types + [
+    [(int, float, text_type)], [{bool}], ([int], {'a': [bool]}),
+]
+
+
+@pytest.mark.parametrize('specifier', compiled_specifiers, ids=[
+    '%d:%s' % (i, show(s)) for i, s in enumerate(compiled_specifiers)])
+def test_compiled_strategy_agrees_with_strategy(specifier):
+    strat = strategy(specifier, Settings(average_list_length=5.0))
+    compiled = compile_strategy(strat)
+    random = Random(show(specifier))
+    for _ in hrange(20):
+        parameter = strat.draw_parameter(random)
+        template = compiled.produce_template(BuildContext(random), parameter)
+        hash(template)
+        try:
+            expected = show(strat.reify(template))
+        except Exception as e:
+            expected = type(e)
+        try:
+            actual = show(compiled.reify(template))
+        except Exception as e:
+            actual = type(e)
+        assert actual == expected
+
+
+def test_compilation_is_cached():
+    strat = strategy([bool])
+    assert compile_strategy(strat) is compile_strategy(strat)
+
+
+def test_falls_back_to_methods_of_unknown_strategies():
+    class ConstantBools(BoolStrategy):
+
+        def produce_template(self, context, parameter):
+            return True
+
+        def reify(self, template):
+            return 'yes'
+
+    strat = strategy([ConstantBools()])
+    compiled = compile_strategy(strat)
+    random = Random(0)
+    for _ in hrange(10):
+        template = compiled.produce_template(
+            BuildContext(random), strat.draw_parameter(random))
+        assert all(template)
+        assert set(compiled.reify(template)) <= set(['yes'])
+
+
+def test_uses_methods_directly_if_nothing_can_be_compiled():
+    class Weird(BoolStrategy):
+
+        def produce_template(self, context, parameter):
+            return False
+
+        def reify(self, template):
+            return template
+
+    strat = Weird()
+    assert compile_strategy(strat).reify == strat.reify
+
+
+def test_handles_deeply_nested_strategies():
+    specifier = bool
+    for _ in hrange(MAX_DEPTH + 5):
+        specifier = (specifier,)
+    strat = strategy(specifier)
+    compiled = compile_strategy(strat)
+    random = Random(0)
+    template = compiled.produce_template(
+        BuildContext(random), strat.draw_parameter(random))
+    assert compiled.reify(template) == strat.reify(template)
+
+
+def test_given_uses_compiled_strategies():
+    seen = []
+
+    @given([(int, bool)], settings=Settings(max_examples=10))
+    def test_things(xs):
+        seen.append(xs)
+        assert all(isinstance(x, tuple) for x in xs)
+    test_things()
+    assert seen
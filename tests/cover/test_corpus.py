@@ -0,0 +1,173 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+import io
+
+import pytest
+from hypothesis.errors import BadData
+from hypothesis.database import ExampleDatabase
+from hypothesis.database.corpus import BINARY_HEADER, main, prune, \
+    read_keys, write_keys, database_at, read_corpus, export_corpus, \
+    import_corpus
+from hypothesis.database.server import SocketBackend, ExampleDatabaseServer
+from hypothesis.internal.compat import text_type
+from hypothesis.database.backend import SQLiteBackend, DirectoryBackend, \
+    BinarySQLiteBackend
+
+
+def populated_database(backend=None):
+    db = ExampleDatabase(backend=backend)
+    db.storage_for(text_type).save('hi')
+    db.storage_for(text_type).save('☃')
+    db.storage_for([bool]).save((True, False))
+    db.storage_for([bool]).save_metadata('stats', [1, 2])
+    return db
+
+
+def exported(db, binary=False):
+    stream = io.BytesIO()
+    export_corpus(db, stream, binary=binary)
+    return stream.getvalue()
+
+
+def contents(db):
+    return sorted(
+        (key, sorted(map(repr, db.backend.fetch(key))))
+        for key in db.backend.keys()
+    )
+
+
+@pytest.mark.parametrize('binary', [False, True])
+def test_round_trips_through_an_archive(binary):
+    source = populated_database()
+    target = ExampleDatabase(backend=BinarySQLiteBackend())
+    data = exported(source, binary=binary)
+    assert data.startswith(BINARY_HEADER) == binary
+    assert import_corpus(target, io.BytesIO(data)) == 4
+    assert list(target.storage_for(text_type).fetch()) == list(
+        source.storage_for(text_type).fetch())
+    assert target.storage_for([bool]).fetch_metadata('stats') == [1, 2]
+
+
+def test_merging_archives_does_not_duplicate_examples():
+    first = populated_database()
+    second = ExampleDatabase()
+    second.storage_for(text_type).save('hi')
+    second.storage_for(text_type).save('yo')
+    target = ExampleDatabase()
+    import_corpus(
+        target, io.BytesIO(exported(first)), io.BytesIO(exported(second)),
+        io.BytesIO(exported(first, binary=True)))
+    assert len(list(target.storage_for(text_type).fetch())) == 3
+    assert len(list(target.storage_for([bool]).fetch())) == 1
+
+
+def test_exports_nothing_from_an_empty_database():
+    data = exported(ExampleDatabase())
+    assert list(read_corpus(io.BytesIO(data))) == []
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'{"hypothesis-corpus": 2}\n',
+    b'not an archive\n',
+    b'{"hypothesis-corpus": 1}\n{"key": "foo"}\n',
+    b'{"hypothesis-corpus": 1}\n[1, 2]\n',
+    b'{"hypothesis-corpus": 1}\n{"key": 1, "value": 2}\n',
+    BINARY_HEADER + b'\x05ab',
+    BINARY_HEADER + b'\x81',
+])
+def test_rejects_bad_archives(data):
+    with pytest.raises(BadData):
+        list(read_corpus(io.BytesIO(data)))
+
+
+def test_prune_keeps_live_keys_and_their_metadata():
+    db = populated_database()
+    live = db.storage_for([bool]).key
+    assert prune(db, [live]) == 2
+    assert list(db.storage_for(text_type).fetch()) == []
+    assert list(db.storage_for([bool]).fetch()) == [(True, False)]
+    assert db.storage_for([bool]).fetch_metadata('stats') == [1, 2]
+
+
+def test_records_used_keys():
+    db = ExampleDatabase()
+    db.storage_for(text_type)
+    db.storage_for([bool])
+    assert db.used_keys == set([
+        db.storage_for(text_type).key, db.storage_for([bool]).key])
+
+
+def test_prune_with_used_keys_keeps_everything_used():
+    db = populated_database()
+    before = contents(db)
+    assert prune(db, db.used_keys) == 0
+    assert contents(db) == before
+
+
+def test_used_keys_round_trip_through_a_keys_file():
+    db = populated_database()
+    stream = io.BytesIO()
+    write_keys(stream, db.used_keys | set(['☃']))
+    stream.seek(0)
+    assert set(read_keys(stream)) == db.used_keys | set(['☃'])
+
+
+def test_backends_list_their_keys(tmpdir):
+    for backend in (BinarySQLiteBackend(), DirectoryBackend(str(tmpdir))):
+        backend.save('foo', b'1')
+        backend.save('☃', b'2')
+        backend.save('bar', b'3')
+        backend.delete('bar', b'3')
+        assert sorted(backend.keys()) == ['foo', '☃']
+
+
+def test_socket_backend_lists_keys():
+    server = ExampleDatabaseServer(BinarySQLiteBackend(), ('127.0.0.1', 0))
+    server.serve_in_background()
+    try:
+        backend = SocketBackend(server.address)
+        with backend.batch():
+            backend.save('foo', b'1')
+            backend.save('☃', b'2')
+            assert sorted(backend.keys()) == ['foo', '☃']
+        backend.close()
+    finally:
+        server.shutdown()
+
+
+def test_command_line(tmpdir):
+    source = str(tmpdir.join('source.db'))
+    target = tmpdir.mkdir('target')
+    archive = str(tmpdir.join('examples.corpus'))
+    keys_file = tmpdir.join('keys')
+    db = populated_database(SQLiteBackend(source))
+    live = db.storage_for(text_type).key
+    db.close()
+    assert main(['export', source, archive, '--binary']) == 0
+    assert main(['import', str(target), archive]) == 0
+    keys_file.write(live + '\n')
+    assert main(['prune', str(target), str(keys_file)]) == 0
+    copy = database_at(str(target))
+    assert len(list(copy.storage_for(text_type).fetch())) == 2
+    assert list(copy.storage_for([bool]).fetch()) == []
+
+
+@pytest.mark.parametrize('argv', [
+    [], ['export', 'a'], ['frobnicate', 'a', 'b'], ['prune', 'a', 'b', 'c'],
+])
+def test_command_line_rejects_bad_usage(argv):
+    assert main(argv) == 1
@@ -13,16 +13,24 @@
 from __future__ import division, print_function, absolute_import, \
     unicode_literals
 
+import os
 import time
+import itertools
+from random import Random
+from tempfile import mkdtemp
 
 import pytest
 import hypothesis.settings as hs
 from hypothesis import given, strategy
 from hypothesis.errors import Timeout
+from tests.common.utils import capture_out
 from hypothesis.database import ExampleDatabase
-from hypothesis.internal.compat import hrange, text_type, integer_types
-from hypothesis.database.backend import Backend, SQLiteBackend
-from hypothesis.database.formats import Format, JSONFormat
+from hypothesis.internal.compat import hrange, text_type, binary_type, \
+    integer_types
+from hypothesis.database.backend import Backend, SQLiteBackend, \
+    DirectoryBackend, BinarySQLiteBackend
+from hypothesis.database.formats import Format, JSONFormat, \
+    BinaryFormat
 
 
 def run_round_trip(specifier, value, format=None, backend=None):
@@ -53,6 +61,9 @@ class InMemoryBackend(Backend):
     def save(self, key, value):
         self.data.setdefault(key, set()).add(value)
 
+    def delete(self, key, value):
+        self.data.get(key, set()).discard(value)
+
     def fetch(self, key):
         for v in self.data.get(key, ()):
             yield v
@@ -85,6 +96,8 @@ class ObjectFormat(Format):
 
 backend_format_pairs = (
     (SQLiteBackend, None),
+    (BinarySQLiteBackend, None),
+    (lambda: DirectoryBackend(mkdtemp()), None),
     (InMemoryBackend, ObjectFormat()),
 )
 
@@ -122,7 +135,7 @@ def test_storage_cleans_up_invalid_data_from_the_db():
 def test_can_save_all_strings(s):
     db = ExampleDatabase()
     storage = db.storage_for(text_type)
-    storage.save(tuple(s))
+    storage.save(s)
 
 
 def test_db_has_path_in_repr():
@@ -220,3 +233,309 @@ def test_can_handle_more_than_max_examples_values_in_db():
         assert len(seen) == 1
     finally:
         db.close()
+
+
+def test_storage_can_fetch_a_limited_number_of_smallest_examples():
+    db = ExampleDatabase()
+    storage = db.storage_for(text_type)
+    for s in ('abc', 'a', 'ab'):
+        storage.save(s)
+    assert list(storage.fetch(order='smallest', limit=2)) == ['a', 'ab']
+
+
+def test_fetch_ordered_falls_back_to_fetch():
+    backend = InMemoryBackend()
+    for value in ('ccc', 'a', 'bb'):
+        backend.save('foo', value)
+    assert list(backend.fetch_ordered('foo', order='smallest')) == [
+        'a', 'bb', 'ccc']
+    assert len(list(backend.fetch_ordered('foo', limit=2))) == 2
+
+
+@pytest.mark.parametrize(('backend', 'format'), backend_format_pairs)
+@pytest.mark.parametrize('specifier', [
+    int, [bool], text_type, {'a': (int, [text_type])}, [[float]],
+])
+def test_round_trips_through_each_backend(backend, format, specifier):
+    template = strategy(specifier).draw_and_produce_from_random(Random(0))
+    run_round_trip(specifier, template, format=format, backend=backend)
+
+
+def test_binary_backend_defaults_to_binary_format():
+    db = ExampleDatabase(backend=BinarySQLiteBackend())
+    assert isinstance(db.format, BinaryFormat)
+    storage = db.storage_for([int])
+    random = Random(1)
+    template = ()
+    while not template:
+        template = storage.strategy.draw_and_produce_from_random(random)
+    storage.save(template)
+    assert list(storage.fetch()) == [template]
+
+
+def test_directory_backend_does_not_duplicate_values():
+    backend = DirectoryBackend(mkdtemp())
+    backend.save('foo', b'bar')
+    backend.save('foo', b'bar')
+    backend.save('foo', b'baz')
+    backend.save('qux', b'bar')
+    assert sorted(backend.fetch('foo')) == [b'bar', b'baz']
+    assert list(backend.fetch('qux')) == [b'bar']
+
+
+def test_directory_backend_deletes_silently():
+    backend = DirectoryBackend(mkdtemp())
+    backend.delete('foo', b'bar')
+    backend.save('foo', b'bar')
+    backend.delete('foo', b'bar')
+    backend.delete('foo', b'bar')
+    assert list(backend.fetch('foo')) == []
+
+
+def test_directory_backend_ignores_partially_written_values():
+    backend = DirectoryBackend(mkdtemp())
+    backend.save('foo', b'bar')
+    with open(os.path.join(backend.key_path('foo'), '.partial'), 'wb') as f:
+        f.write(b'ba')
+    assert list(backend.fetch('foo')) == [b'bar']
+
+
+def test_directory_backend_fetches_in_order():
+    backend = DirectoryBackend(mkdtemp())
+    for i, value in enumerate((b'ccc', b'a', b'bb')):
+        backend.save('foo', value)
+        os.utime(backend.value_path('foo', value), (i, i))
+    assert list(backend.fetch_ordered('foo', order='smallest')) == [
+        b'a', b'bb', b'ccc']
+    assert list(backend.fetch_ordered('foo', order='recent', limit=2)) == [
+        b'bb', b'a']
+    backend.save('foo', b'ccc')
+    assert list(backend.fetch_ordered('foo', order='recent', limit=1)) == [
+        b'ccc']
+
+
+def test_database_file_may_be_a_directory():
+    path = mkdtemp()
+    db = hs.Settings(database_file=path).database
+    assert isinstance(db.backend, DirectoryBackend)
+    assert isinstance(db.format, BinaryFormat)
+
+
+eviction_backends = (
+    SQLiteBackend,
+    lambda: DirectoryBackend(mkdtemp()),
+    InMemoryBackend,
+)
+
+
+def backend_values(backend, *values):
+    if backend.data_type() == binary_type:
+        return [v.encode('ascii') for v in values]
+    return list(values)
+
+
+clock = itertools.count(1)
+
+
+def age(backend, key, values):
+    """Make each of values look older than the ones after it, and all of them
+    older than anything aged before."""
+    for value in values:
+        now = next(clock)
+        if isinstance(backend, DirectoryBackend):
+            os.utime(backend.value_path(key, value), (now, now))
+        elif isinstance(backend, SQLiteBackend):
+            backend.flush()
+            with backend.cursor() as cursor:
+                cursor.execute("""
+                    update hypothesis_data_mapping set saved_at = ?
+                    where key = ? and value = ?
+                """, (now, key, value))
+
+
+@pytest.mark.parametrize('make_backend', eviction_backends)
+def test_evict_keeps_the_most_recent_values(make_backend):
+    backend = make_backend()
+    values = backend_values(backend, 'a', 'b', 'c', 'd')
+    for value in values:
+        backend.save('foo', value)
+    backend.save('bar', values[0])
+    age(backend, 'foo', values)
+    backend.evict('foo', 2)
+    remaining = sorted(backend.fetch('foo'))
+    assert len(remaining) == 2
+    if not isinstance(backend, InMemoryBackend):
+        assert remaining == values[2:]
+    assert list(backend.fetch('bar')) == values[:1]
+
+
+@pytest.mark.parametrize('make_backend', eviction_backends[:2])
+def test_touching_a_value_protects_it_from_eviction(make_backend):
+    backend = make_backend()
+    values = backend_values(backend, 'a', 'b', 'c')
+    for value in values:
+        backend.save('foo', value)
+    age(backend, 'foo', values)
+    backend.touch('foo', values[0])
+    backend.touch('foo', backend_values(backend, 'z')[0])
+    backend.evict('foo', 1)
+    assert list(backend.fetch('foo')) == values[:1]
+
+
+@pytest.mark.parametrize('make_backend', eviction_backends[:2])
+def test_compact_evicts_least_recent_values_across_keys(make_backend):
+    backend = make_backend()
+    values = backend_values(backend, 'aa', 'bb', 'cc')
+    for key, value in zip(('x', 'y', 'z'), values):
+        backend.save(key, value)
+        age(backend, key, [value])
+    assert backend.compact() == 0
+    assert backend.compact(max_size=10) == 0
+    assert backend.compact(max_size=3) == 2
+    assert list(backend.fetch('x')) == []
+    assert list(backend.fetch('y')) == []
+    assert list(backend.fetch('z')) == values[2:]
+
+
+def test_compact_is_a_no_op_by_default():
+    backend = InMemoryBackend()
+    backend.save('foo', 'bar')
+    assert backend.compact(max_size=0) == 0
+    assert list(backend.fetch('foo')) == ['bar']
+
+
+def test_directory_backend_compact_removes_abandoned_temporary_files():
+    backend = DirectoryBackend(mkdtemp())
+    backend.save('foo', b'bar')
+    directory = backend.key_path('foo')
+    abandoned = os.path.join(directory, '.abandoned')
+    in_progress = os.path.join(directory, '.in-progress')
+    for path in (abandoned, in_progress):
+        with open(path, 'wb') as f:
+            f.write(b'ba')
+    os.utime(abandoned, (0, 0))
+    backend.compact()
+    assert not os.path.exists(abandoned)
+    assert os.path.exists(in_progress)
+    assert list(backend.fetch('foo')) == [b'bar']
+
+
+def test_sqlite_backend_upgrades_tables_without_hit_columns():
+    backend = SQLiteBackend()
+    with backend.cursor() as cursor:
+        cursor.execute("""
+            create table hypothesis_data_mapping(
+                key text, value text, unique(key, value)
+            )
+        """)
+        cursor.execute(
+            "insert into hypothesis_data_mapping values('foo', 'bar')")
+    backend.touch('foo', 'bar')
+    backend.evict('foo', 1)
+    assert list(backend.fetch('foo')) == ['bar']
+
+
+def test_database_caps_examples_per_key():
+    db = ExampleDatabase(max_examples_per_key=2)
+    storage = db.storage_for(text_type)
+    for i in hrange(5):
+        storage.save('a' * i)
+    assert len(list(storage.fetch())) == 2
+
+
+def test_database_compacts_to_max_size():
+    db = ExampleDatabase(max_size=0)
+    storage = db.storage_for(text_type)
+    storage.save('a')
+    assert db.compact() == 1
+    assert list(storage.fetch()) == []
+
+
+def test_replay_touches_examples_that_still_fail():
+    db = ExampleDatabase()
+
+    @given([bool], settings=hs.Settings(database=db))
+    def test_no_true(xs):
+        assert not any(xs)
+
+    def hits():
+        with db.backend.cursor() as cursor:
+            cursor.execute("""
+                select hits from hypothesis_data_mapping
+                where key not like 'hypothesis-metadata:%'
+            """)
+            return [row[0] for row in cursor.fetchall()]
+
+    for _ in hrange(2):
+        with pytest.raises(AssertionError):
+            test_no_true()
+    assert hits() == [1]
+
+
+def test_replay_only_runs_only_saved_examples():
+    db = ExampleDatabase()
+    calls = []
+
+    def make_test(settings):
+        @given([bool], settings=settings)
+        def test_no_true(xs):
+            calls.append(xs)
+            assert not any(xs)
+        return test_no_true
+
+    replay_settings = hs.Settings(database=db, replay_only=True)
+    make_test(replay_settings)()
+    assert calls == []
+
+    with pytest.raises(AssertionError):
+        make_test(hs.Settings(database=db))()
+    del calls[:]
+    with pytest.raises(AssertionError):
+        make_test(replay_settings)()
+    assert calls[0] == [True]
+
+
+def test_replay_only_passes_if_saved_examples_now_pass():
+    db = ExampleDatabase()
+    fail = [True]
+
+    def make_test(settings):
+        @given(int, settings=settings)
+        def test_positive(x):
+            assert not fail[0] or x > 0
+        return test_positive
+
+    with pytest.raises(AssertionError):
+        make_test(hs.Settings(database=db))()
+    fail[0] = False
+    make_test(hs.Settings(database=db, replay_only=True))()
+
+
+@pytest.mark.parametrize('database', [None, ExampleDatabase()])
+def test_replay_only_reports_when_there_is_nothing_to_replay(database):
+    @given(int, settings=hs.Settings(database=database, replay_only=True))
+    def test_nothing_saved(x):
+        assert False
+
+    with capture_out() as out:
+        test_nothing_saved()
+    assert 'No examples of test_nothing_saved were replayed' in out.getvalue()
+
+
+def test_replay_only_defaults_from_the_environment(monkeypatch):
+    monkeypatch.setenv('HYPOTHESIS_REPLAY_ONLY', '1')
+    assert hs.Settings().replay_only
+    monkeypatch.delenv('HYPOTHESIS_REPLAY_ONLY')
+    assert not hs.Settings().replay_only
+
+
+@pytest.mark.parametrize('value', ['true', 'TRUE', 'Yes', ' 1 '])
+def test_replay_only_accepts_true_values(monkeypatch, value):
+    monkeypatch.setenv('HYPOTHESIS_REPLAY_ONLY', value)
+    assert hs.Settings().replay_only
+
+
+@pytest.mark.parametrize('value', ['', '0', 'false', 'no', 'off'])
+def test_replay_only_rejects_other_values(monkeypatch, value):
+    monkeypatch.setenv('HYPOTHESIS_REPLAY_ONLY', value)
+    assert not hs.Settings().replay_only
@@ -13,10 +13,17 @@
 from __future__ import division, print_function, absolute_import, \
     unicode_literals
 
+import time
+import sqlite3
+import threading
+
+import pytest
+
 from hypothesis import given
 from tests.common import settings as small_settings
 from hypothesis.internal.compat import text_type
-from hypothesis.database.backend import SQLiteBackend
+from hypothesis.database import ExampleDatabase
+from hypothesis.database.backend import SQLiteBackend, WriteBehindBackend
 
 
 @given([(text_type, text_type)], settings=small_settings)
@@ -46,7 +53,7 @@ def test_does_not_commit_in_error_state():
     except ValueError:
         pass
 
-    assert backend.fetch('a') == []
+    assert list(backend.fetch('a')) == []
 
 
 def test_can_double_close():
@@ -62,3 +69,306 @@ def test_can_delete_keys():
     backend.save('foo', 'baz')
     backend.delete('foo', 'bar')
     assert list(backend.fetch('foo')) == ['baz']
+
+
+def count_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(
+            'select count(*) from hypothesis_data_mapping').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_batches_writes_until_the_end_of_the_block(tmpdir):
+    path = str(tmpdir.join('examples.db'))
+    backend = SQLiteBackend(path, flush_interval=1000)
+    with backend.batch():
+        backend.save('foo', 'bar')
+        backend.save('foo', 'baz')
+        backend.delete('foo', 'bar')
+        with backend.batch():
+            backend.save('foo', 'qux')
+        assert count_rows(path) == 0
+    assert count_rows(path) == 2
+    assert sorted(backend.fetch('foo')) == ['baz', 'qux']
+
+
+def test_save_outside_a_batch_is_a_single_transaction():
+    transactions = []
+
+    class CountingBackend(SQLiteBackend):
+
+        def cursor(self):
+            transactions.append(None)
+            return super(CountingBackend, self).cursor()
+
+    backend = CountingBackend()
+    backend.create_db_if_needed()
+    del transactions[:]
+    backend.save('foo', 'bar')
+    assert len(transactions) == 1
+    assert list(backend.fetch('foo')) == ['bar']
+
+
+def test_fetch_sees_buffered_writes():
+    backend = SQLiteBackend(flush_interval=1000)
+    with backend.batch():
+        backend.save('foo', 'bar')
+        assert list(backend.fetch('foo')) == ['bar']
+        backend.delete('foo', 'bar')
+        assert list(backend.fetch('foo')) == []
+
+
+def test_flushes_batches_that_run_for_too_long(tmpdir):
+    path = str(tmpdir.join('examples.db'))
+    backend = SQLiteBackend(path, flush_interval=0)
+    with backend.batch():
+        backend.save('foo', 'bar')
+        assert count_rows(path) == 1
+
+
+def test_close_flushes_pending_writes(tmpdir):
+    path = str(tmpdir.join('examples.db'))
+    backend = SQLiteBackend(path, flush_interval=1000)
+    with backend.batch():
+        backend.save('foo', 'bar')
+        backend.close()
+        assert count_rows(path) == 1
+
+
+def test_uses_write_ahead_logging(tmpdir):
+    backend = SQLiteBackend(str(tmpdir.join('examples.db')))
+    with backend.cursor() as cursor:
+        cursor.execute('pragma journal_mode')
+        assert cursor.fetchone()[0].lower() == 'wal'
+
+
+def test_can_use_default_journal_mode(tmpdir):
+    backend = SQLiteBackend(
+        str(tmpdir.join('examples.db')), journal_mode=None)
+    with backend.cursor() as cursor:
+        cursor.execute('pragma journal_mode')
+        assert cursor.fetchone()[0].lower() != 'wal'
+
+
+def test_can_reopen_after_close(tmpdir):
+    backend = SQLiteBackend(str(tmpdir.join('examples.db')))
+    backend.save('foo', 'bar')
+    backend.close()
+    assert list(backend.fetch('foo')) == ['bar']
+
+
+def test_uses_a_connection_per_thread(tmpdir):
+    backend = SQLiteBackend(str(tmpdir.join('examples.db')))
+    connections = []
+
+    def run():
+        backend.save('foo', 'bar')
+        connections.append(backend.connection())
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(set(map(id, connections))) == 3
+    assert list(backend.fetch('foo')) == ['bar']
+    backend.close()
+
+
+def test_in_memory_databases_share_a_connection():
+    backend = SQLiteBackend()
+    backend.save('foo', 'bar')
+    results = []
+    thread = threading.Thread(target=lambda: results.extend(
+        backend.fetch('foo')))
+    thread.start()
+    thread.join()
+    assert results == ['bar']
+
+
+def test_fetches_most_recently_saved_first():
+    backend = SQLiteBackend()
+    for value in ('a', 'b', 'c'):
+        backend.save('foo', value)
+        time.sleep(0.01)
+    backend.save('foo', 'a')
+    assert list(backend.fetch_ordered('foo', order='recent')) == [
+        'a', 'c', 'b']
+
+
+def test_fetches_smallest_first():
+    backend = SQLiteBackend()
+    for value in ('ccc', 'a', 'bb', 'dd'):
+        backend.save('foo', value)
+    assert list(backend.fetch_ordered('foo', order='smallest')) == [
+        'a', 'bb', 'dd', 'ccc']
+
+
+@pytest.mark.parametrize('order', [None, 'recent', 'smallest'])
+@pytest.mark.parametrize('limit', [None, 0, 1, 150, 250, 1000])
+def test_pages_through_many_values(order, limit):
+    backend = SQLiteBackend()
+    values = [text_type(i) for i in range(250)]
+    with backend.batch():
+        for value in values:
+            backend.save('foo', value)
+    fetched = list(backend.fetch_ordered('foo', order=order, limit=limit))
+    assert len(fetched) == len(set(fetched))
+    assert set(fetched) <= set(values)
+    assert len(fetched) == min(len(values), 1000 if limit is None else limit)
+
+
+def test_fetch_is_lazy():
+    backend = SQLiteBackend()
+    for i in range(250):
+        backend.save('foo', text_type(i))
+    values = backend.fetch('foo')
+    next(values)
+    backend.save('foo', 'bar')
+    assert len(list(values)) == 250
+
+
+def test_can_delete_while_fetching():
+    backend = SQLiteBackend()
+    for i in range(250):
+        backend.save('foo', text_type(i))
+    for value in backend.fetch('foo'):
+        backend.delete('foo', value)
+    assert list(backend.fetch('foo')) == []
+
+
+def test_rejects_unknown_orders():
+    with pytest.raises(ValueError):
+        list(SQLiteBackend().fetch_ordered('foo', order='random'))
+
+
+def test_upgrades_databases_without_metadata(tmpdir):
+    path = str(tmpdir.join('examples.db'))
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        create table hypothesis_data_mapping(
+            key text, value text, unique(key, value)
+        )
+    """)
+    conn.execute("""
+        insert into hypothesis_data_mapping(key, value)
+        values('foo', 'bar'), ('foo', 'a')
+    """)
+    conn.commit()
+    conn.close()
+    backend = SQLiteBackend(path)
+    assert list(backend.fetch_ordered('foo', order='smallest')) == [
+        'a', 'bar']
+    backend.save('foo', 'bar')
+    assert list(backend.fetch_ordered('foo', order='recent'))[0] == 'bar'
+
+
+class BlockingBackend(SQLiteBackend):
+
+    """An SQLiteBackend whose writes wait until they are allowed to
+    proceed."""
+
+    def __init__(self, *args, **kwargs):
+        super(BlockingBackend, self).__init__(*args, **kwargs)
+        self.allowed = threading.Event()
+
+    def write(self, operation, arguments):
+        assert self.allowed.wait(10)
+        super(BlockingBackend, self).write(operation, arguments)
+
+
+def test_write_behind_does_not_wait_for_writes(tmpdir):
+    path = str(tmpdir.join('examples.db'))
+    wrapped = BlockingBackend(path)
+    wrapped.create_db_if_needed()
+    backend = WriteBehindBackend(wrapped)
+    backend.save('foo', 'bar')
+    backend.save('foo', 'baz')
+    assert count_rows(path) == 0
+    wrapped.allowed.set()
+    backend.flush()
+    assert count_rows(path) == 2
+    backend.close()
+
+
+def test_write_behind_fetch_sees_queued_writes():
+    wrapped = BlockingBackend()
+    wrapped.allowed.set()
+    wrapped.save('foo', 'a')
+    wrapped.save('foo', 'b')
+    wrapped.allowed.clear()
+    backend = WriteBehindBackend(wrapped)
+    backend.save('foo', 'c')
+    backend.delete('foo', 'a')
+    backend.save('foo', 'd')
+    backend.save('bar', 'e')
+    assert list(backend.fetch_ordered('foo', order='recent')) == [
+        'd', 'c', 'b']
+    assert list(backend.fetch_ordered('foo', limit=1)) == ['d']
+    wrapped.allowed.set()
+    assert list(backend.fetch_ordered('foo', order='smallest')) == [
+        'b', 'c', 'd']
+    backend.close()
+
+
+def test_write_behind_coalesces_writes_to_the_same_value():
+    wrapped = BlockingBackend()
+    backend = WriteBehindBackend(wrapped)
+    for _ in range(10):
+        backend.save('foo', 'bar')
+        backend.delete('foo', 'bar')
+    backend.save('foo', 'bar')
+    assert len(backend.pending) + len(backend.writing) <= 2
+    wrapped.allowed.set()
+    backend.flush()
+    assert list(wrapped.fetch('foo')) == ['bar']
+
+
+def test_write_behind_blocks_when_the_queue_is_full():
+    wrapped = BlockingBackend()
+    backend = WriteBehindBackend(wrapped, max_pending=2)
+    backend.save('foo', 'first')
+    while not backend.writing:
+        time.sleep(0.001)
+    for i in range(2):
+        backend.save('foo', text_type(i))
+    done = threading.Event()
+
+    def save_more():
+        backend.save('foo', 'more')
+        done.set()
+
+    thread = threading.Thread(target=save_more)
+    thread.start()
+    assert not done.wait(0.1)
+    wrapped.allowed.set()
+    thread.join()
+    backend.flush()
+    assert len(list(wrapped.fetch('foo'))) == 4
+
+
+class FailingBackend(SQLiteBackend):
+
+    def save(self, key, value):
+        raise ValueError('Nope')
+
+
+def test_write_behind_reraises_errors_from_the_background():
+    backend = WriteBehindBackend(FailingBackend())
+    backend.save('foo', 'bar')
+    with pytest.raises(ValueError):
+        backend.close()
+
+
+def test_database_can_write_behind(tmpdir):
+    path = str(tmpdir.join('examples.db'))
+    db = ExampleDatabase(
+        backend=SQLiteBackend(path), write_behind=True)
+    assert isinstance(db.backend, WriteBehindBackend)
+    storage = db.storage_for(text_type)
+    storage.save('hi')
+    assert list(storage.fetch()) == ['hi']
+    db.close()
+    assert len(list(SQLiteBackend(path).fetch(storage.key))) == 1
@@ -0,0 +1,117 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+from collections import namedtuple
+
+import hypothesis.database
+from hypothesis import strategy
+from hypothesis.database import ExampleDatabase
+from hypothesis.specifiers import Just, integers_in_range
+from hypothesis.database.keys import KEY_VERSION, database_key, \
+    legacy_database_key
+from hypothesis.internal.compat import text_type, binary_type
+
+Pair = namedtuple('Pair', ('a', 'b'))
+
+
+class Point(object):
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+distinct_specifiers = [
+    int, bool, text_type, binary_type, None, 0, 1, -1, 0.0, -0.0, '', '1',
+    b'1', True, [int], (int,), [int, bool], [bool, int], {int}, {int, bool},
+    frozenset({int}), {'a': int}, {'a': bool}, {'b': int}, Pair(int, bool),
+    (int, bool), integers_in_range(0, 1), integers_in_range(0, 2),
+    Just([]), Point(int, bool), Point(bool, int), strategy(int),
+    [[int]], [[]], [], (), ((),),
+]
+
+
+def test_distinct_specifiers_have_distinct_keys():
+    keys = [database_key(s) for s in distinct_specifiers]
+    assert len(set(keys)) == len(keys)
+
+
+def test_keys_are_versioned_and_stable():
+    for specifier in distinct_specifiers:
+        key = database_key(specifier)
+        assert key.startswith('v%d:' % (KEY_VERSION,))
+        assert database_key(specifier) == key
+
+
+def test_keys_do_not_depend_on_set_or_dict_order():
+    names = ['foo%d' % (i,) for i in range(100)]
+    assert database_key(set(names)) == database_key(set(reversed(names)))
+    assert database_key(dict((n, int) for n in names)) == database_key(
+        dict((n, int) for n in reversed(names)))
+
+
+def test_keys_are_structural():
+    assert database_key([{'a': (int, [bool])}]) == database_key(
+        [{'a': (int, [bool])}])
+    assert database_key(Point(int, [bool])) == database_key(
+        Point(int, [bool]))
+
+
+def test_keys_handle_cycles():
+    x = []
+    x.append(x)
+    assert database_key(x) != database_key([[]])
+
+
+def test_functions_are_keyed_by_their_code():
+    add = lambda x: x + 1  # noqa
+    double = lambda x: x * 2  # noqa
+    assert database_key(add) != database_key(double)
+    assert database_key([add]) == database_key([add])
+
+
+def test_key_is_cached_on_the_strategy():
+    s = strategy([int, bool])
+    key = database_key([int, bool], s)
+    assert s.database_key == key
+    assert database_key('something else', s) == key
+
+
+def test_storage_uses_the_database_key():
+    db = ExampleDatabase()
+    assert db.storage_for([int]).key == database_key([int])
+
+
+def test_migrates_examples_saved_under_legacy_keys():
+    db = ExampleDatabase()
+    storage = db.storage_for(text_type)
+    legacy_key = legacy_database_key(text_type)
+    db.backend.save(legacy_key, db.format.serialize_basic(
+        storage.strategy.to_basic('hi')))
+    assert list(storage.fetch()) == ['hi']
+    assert list(db.backend.fetch(legacy_key)) == []
+    assert list(db.backend.fetch(storage.key)) != []
+
+
+def test_only_migrates_legacy_examples_once_per_database(monkeypatch):
+    db = ExampleDatabase()
+    list(db.storage_for(text_type).fetch())
+    # A new process would start with no record of migrated keys
+    db.migrated_keys.clear()
+    calls = []
+    monkeypatch.setattr(
+        hypothesis.database, 'legacy_database_key', calls.append)
+    assert list(db.storage_for(text_type).fetch()) == []
+    assert calls == []
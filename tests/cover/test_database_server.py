@@ -0,0 +1,185 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+import io
+import socket
+
+import pytest
+from hypothesis.errors import DatabaseServerError
+from hypothesis.database import ExampleDatabase
+from hypothesis.internal.compat import text_type
+from hypothesis.database.server import SocketBackend, \
+    ExampleDatabaseServer, main, read_message, parse_address, \
+    encode_message
+from hypothesis.database.backend import SQLiteBackend, \
+    BinarySQLiteBackend
+
+
+@pytest.fixture(params=['tcp', 'unix'])
+def server(request, tmpdir):
+    if request.param == 'tcp':
+        address = ('127.0.0.1', 0)
+    else:
+        if not hasattr(socket, 'AF_UNIX'):
+            pytest.skip('Unix sockets are not supported here')
+        address = str(tmpdir.join('examples.sock'))
+    server = ExampleDatabaseServer(BinarySQLiteBackend(), address)
+    server.serve_in_background()
+    request.addfinalizer(server.shutdown)
+    return server
+
+
+def test_messages_round_trip():
+    fields = [b'', b'a', b'\x00' * 200]
+    stream = io.BytesIO(encode_message(fields) * 2)
+    assert read_message(stream) == fields
+    assert read_message(stream) == fields
+    assert read_message(stream) is None
+
+
+@pytest.mark.parametrize('data', [b'\x01', b'\x01\x05ab', b'\x81'])
+def test_rejects_truncated_messages(data):
+    with pytest.raises(EOFError):
+        read_message(io.BytesIO(data))
+
+
+def test_backend_round_trips_through_server(server):
+    backend = SocketBackend(server.address)
+    backend.save('foo', b'bar')
+    backend.save('foo', b'bar')
+    backend.save('foo', b'ba\x00z')
+    backend.save('☃', b'qux')
+    assert sorted(backend.fetch('foo')) == [b'ba\x00z', b'bar']
+    backend.delete('foo', b'bar')
+    assert list(backend.fetch('foo')) == [b'ba\x00z']
+    assert list(backend.fetch('☃')) == [b'qux']
+    backend.close()
+
+
+def test_clients_share_examples(server):
+    first = SocketBackend(server.address)
+    second = SocketBackend(server.address)
+    first.save('foo', b'bar')
+    assert list(second.fetch('foo')) == [b'bar']
+    first.close()
+    second.close()
+
+
+def test_supports_ordering_limits_and_eviction(server):
+    backend = SocketBackend(server.address)
+    with backend.batch():
+        for value in (b'ccc', b'a', b'bb'):
+            backend.save('foo', value)
+    assert list(backend.fetch_ordered('foo', order='smallest', limit=2)) == [
+        b'a', b'bb']
+    backend.touch('foo', b'ccc')
+    backend.evict('foo', 2)
+    assert len(list(backend.fetch('foo'))) == 2
+    assert backend.compact(max_size=0) == 2
+    assert list(backend.fetch('foo')) == []
+
+
+def test_batches_writes_into_one_round_trip(server):
+    backend = SocketBackend(server.address)
+    round_trips = []
+    request_many = backend.request_many
+
+    def counting_request_many(requests):
+        if requests:
+            round_trips.append(len(requests))
+        return request_many(requests)
+    backend.request_many = counting_request_many
+    with backend.batch():
+        for i in range(10):
+            backend.save('foo', text_type(i).encode('ascii'))
+    assert round_trips == [10]
+    assert len(backend.fetch_many(['foo', 'bar', 'baz'])['foo']) == 10
+    assert round_trips == [10, 3]
+
+
+def test_caches_fetches_until_written(server):
+    backend = SocketBackend(server.address, cache_ttl=1000)
+    other = SocketBackend(server.address)
+    backend.save('foo', b'bar')
+    assert list(backend.fetch('foo')) == [b'bar']
+    other.save('foo', b'baz')
+    assert list(backend.fetch('foo')) == [b'bar']
+    backend.save('foo', b'qux')
+    assert len(list(backend.fetch('foo'))) == 3
+
+
+def test_does_not_cache_without_a_ttl(server):
+    backend = SocketBackend(server.address, cache_ttl=-1)
+    other = SocketBackend(server.address)
+    assert list(backend.fetch('foo')) == []
+    other.save('foo', b'bar')
+    assert list(backend.fetch('foo')) == [b'bar']
+
+
+def test_reuses_connections(server):
+    backend = SocketBackend(server.address, pool_size=1)
+    backend.save('foo', b'bar')
+    connection = backend.pool[0]
+    backend.fetch('foo')
+    assert backend.pool == [connection]
+
+
+def test_reconnects_if_a_pooled_connection_was_closed(server):
+    backend = SocketBackend(server.address)
+    backend.save('foo', b'bar')
+    backend.pool[0].socket.shutdown(socket.SHUT_RDWR)
+    backend.save('foo', b'baz')
+    assert len(list(backend.fetch('foo'))) == 2
+
+
+def test_does_not_resend_touches_on_a_closed_connection(server):
+    backend = SocketBackend(server.address)
+    backend.save('foo', b'bar')
+    backend.pool[0].socket.shutdown(socket.SHUT_RDWR)
+    with pytest.raises((EOFError, socket.error)):
+        backend.touch('foo', b'bar')
+    assert backend.pool == []
+
+
+def test_raises_errors_from_the_server(server):
+    backend = SocketBackend(server.address)
+    with pytest.raises(DatabaseServerError):
+        backend.request_many([[b'frobnicate', b'foo']])
+    with pytest.raises(DatabaseServerError):
+        backend.request_many([[b'save', b'foo']])
+    backend.save('foo', b'bar')
+    assert list(backend.fetch('foo')) == [b'bar']
+
+
+def test_can_use_server_as_example_database(server):
+    db = ExampleDatabase(backend=SocketBackend(server.address))
+    storage = db.storage_for(text_type)
+    storage.save('hi')
+    assert list(storage.fetch()) == ['hi']
+    db.close()
+
+
+def test_only_serves_binary_backends():
+    with pytest.raises(ValueError):
+        ExampleDatabaseServer(SQLiteBackend(), ('127.0.0.1', 0))
+
+
+def test_parses_addresses():
+    assert parse_address('localhost:1234') == ('localhost', 1234)
+    assert parse_address('/tmp/examples.sock') == '/tmp/examples.sock'
+
+
+def test_main_requires_two_arguments():
+    assert main([]) == 1
@@ -0,0 +1,104 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+from random import Random
+
+from hypothesis import Settings, find
+from hypothesis.internal.ddmin import chunk_simplifier
+
+
+def delete_chunk(x, start, end):
+    return x[:start] + x[end:]
+
+
+def test_does_nothing_to_empty_templates():
+    simplifier = chunk_simplifier(len, delete_chunk)
+    assert list(simplifier(Random(0), [])) == []
+
+
+def test_tries_large_blocks_from_the_end_first():
+    simplifier = chunk_simplifier(len, delete_chunk)
+    assert list(simplifier(Random(0), [0, 1, 2, 3])) == [
+        [0, 1], [2, 3],
+        [0, 1, 2], [0, 1, 3], [0, 2, 3], [1, 2, 3],
+    ]
+
+
+def test_tries_single_elements_when_blocks_start_at_size_one():
+    simplifier = chunk_simplifier(len, delete_chunk)
+    assert list(simplifier(Random(0), [0, 1, 2])) == [
+        [0, 1], [0, 2], [1, 2],
+    ]
+
+
+def test_resumes_from_where_an_accepted_result_was_yielded():
+    simplifier = chunk_simplifier(len, delete_chunk)
+    candidates = simplifier(Random(0), list(range(8)))
+    assert next(candidates) == [0, 1, 2, 3]
+    assert next(candidates) == [4, 5, 6, 7]
+    assert next(candidates) == [0, 1, 2, 3, 4, 5]
+    accepted = next(candidates)
+    assert accepted == [0, 1, 2, 3, 6, 7]
+    assert list(simplifier(Random(0), accepted)) == [
+        [0, 1, 6, 7], [2, 3, 6, 7], [0, 1, 2, 3, 6],
+        [0, 1, 2, 3, 7], [0, 1, 2, 6, 7], [0, 1, 3, 6, 7],
+        [0, 2, 3, 6, 7], [1, 2, 3, 6, 7],
+    ]
+
+
+def test_starts_again_for_templates_it_did_not_produce():
+    simplifier = chunk_simplifier(len, delete_chunk)
+    list(simplifier(Random(0), [0, 1, 2, 3]))
+    assert next(simplifier(Random(0), [0, 1, 2, 3])) == [0, 1]
+
+
+def test_resumes_from_a_template_drawn_before_the_last():
+    simplifier = chunk_simplifier(len, delete_chunk)
+    candidates = list(simplifier(Random(0), list(range(8))))
+    assert list(simplifier(Random(0), candidates[2]))[0] == [0, 1, 2, 3]
+
+
+def test_does_not_resume_from_an_equal_template_it_did_not_yield():
+    simplifier = chunk_simplifier(len, delete_chunk)
+    candidates = simplifier(Random(0), list(range(8)))
+    for _ in range(3):
+        next(candidates)
+    template = [0, 1, 2, 3, 6, 7]
+    assert next(simplifier(Random(0), template)) == [0, 1, 2]
+
+
+def test_can_replace_instead_of_deleting():
+    simplifier = chunk_simplifier(
+        len, lambda x, i, j: x[:i] + [0] * (j - i) + x[j:])
+    assert next(simplifier(Random(0), [1, 1, 1, 1])) == [1, 1, 0, 0]
+
+
+def zero_chunk(x, start, end):
+    if not any(x[start:end]):
+        return x
+    return x[:start] + [0] * (end - start) + x[end:]
+
+
+def test_skips_blocks_that_would_not_change():
+    simplifier = chunk_simplifier(len, zero_chunk)
+    assert list(simplifier(Random(0), [0, 0, 1, 0])) == [[0, 0, 0, 0]] * 2
+    assert list(simplifier(Random(0), [0, 0, 0, 0])) == []
+
+
+def test_deletes_everything_but_the_needles_in_a_long_list():
+    x = find(
+        [bool], lambda x: x.count(True) >= 2,
+        settings=Settings(average_list_length=1000.0))
+    assert x == [True, True]
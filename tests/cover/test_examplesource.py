@@ -17,15 +17,25 @@ import random
 from itertools import islice
 
 import pytest
+import hypothesis.internal.examplesource as examplesource
+from hypothesis.errors import InvalidArgument
 from hypothesis.internal.compat import hrange
-from hypothesis.internal.examplesource import ParameterSource
+from hypothesis.internal.examplesource import ParameterSource, \
+    VectorizedParameterSource, load_numpy, new_parameter_source
 from hypothesis.searchstrategy.strategies import BuildContext, strategy
 
 N_EXAMPLES = 2500
 
+source_classes = [ParameterSource]
+if load_numpy() is not None:
+    source_classes.append(VectorizedParameterSource)
 
-def test_negative_is_not_too_far_off_mean():
-    source = ParameterSource(
+with_each_source = pytest.mark.parametrize('source_class', source_classes)
+
+
+@with_each_source
+def test_negative_is_not_too_far_off_mean(source_class):
+    source = source_class(
         context=BuildContext(random.Random()),
         strategy=strategy(int),
     )
@@ -40,12 +50,13 @@ def test_negative_is_not_too_far_off_mean():
     assert 0.3 <= float(positive) / N_EXAMPLES <= 0.7
 
 
-def test_marking_negative_avoids_similar_examples():
+@with_each_source
+def test_marking_negative_avoids_similar_examples(source_class):
     positive = 0
     k = 10
 
     for _ in hrange(k):
-        source = ParameterSource(
+        source = source_class(
             context=BuildContext(random.Random()),
             strategy=strategy(int),
         )
@@ -58,11 +69,14 @@ def test_marking_negative_avoids_similar_examples():
     assert float(positive) / N_EXAMPLES >= 0.7
 
 
-def test_can_grow_the_set_of_available_parameters_if_doing_badly():
+@with_each_source
+def test_can_grow_the_set_of_available_parameters_if_doing_badly(
+    source_class
+):
     runs = 10
     number_grown = 0
     for _ in hrange(runs):
-        source = ParameterSource(
+        source = source_class(
             context=BuildContext(random.Random()),
             strategy=strategy(int),
             min_parameters=1,
@@ -79,8 +93,9 @@ def test_can_grow_the_set_of_available_parameters_if_doing_badly():
         assert len(source.parameters) < 100
 
 
-def test_errors_if_you_mark_bad_twice():
-    source = ParameterSource(
+@with_each_source
+def test_errors_if_you_mark_bad_twice(source_class):
+    source = source_class(
         context=BuildContext(random.Random()),
         strategy=strategy(int),
     )
@@ -90,8 +105,9 @@ def test_errors_if_you_mark_bad_twice():
         source.mark_bad()
 
 
-def test_errors_if_you_mark_bad_before_fetching():
-    source = ParameterSource(
+@with_each_source
+def test_errors_if_you_mark_bad_before_fetching(source_class):
+    source = source_class(
         context=BuildContext(random.Random()),
         strategy=strategy(int),
     )
@@ -99,8 +115,9 @@ def test_errors_if_you_mark_bad_before_fetching():
         source.mark_bad()
 
 
-def test_tries_each_parameter_at_least_min_index_times():
-    source = ParameterSource(
+@with_each_source
+def test_tries_each_parameter_at_least_min_index_times(source_class):
+    source = source_class(
         context=BuildContext(random.Random()),
         strategy=strategy(int),
         min_tries=5
@@ -116,8 +133,9 @@ def test_tries_each_parameter_at_least_min_index_times():
     assert all(c >= 5 for c in source.counts[:-1])
 
 
-def test_culls_valid_parameters_if_lots_are_bad():
-    source = ParameterSource(
+@with_each_source
+def test_culls_valid_parameters_if_lots_are_bad(source_class):
+    source = source_class(
         context=BuildContext(random.Random()),
         strategy=strategy(int),
         min_tries=5
@@ -134,8 +152,9 @@ def test_culls_valid_parameters_if_lots_are_bad():
     assert len(source.valid_parameters) <= 1
 
 
-def test_caps_number_of_parameters_tried():
-    source = ParameterSource(
+@with_each_source
+def test_caps_number_of_parameters_tried(source_class):
+    source = source_class(
         context=BuildContext(random.Random()),
         strategy=strategy(bool),
         max_tries=1,
@@ -147,8 +166,9 @@ def test_caps_number_of_parameters_tried():
     assert all(t <= 1 for t in source.counts)
 
 
-def test_eventually_culls_parameters_which_stop_being_valid():
-    source = ParameterSource(
+@with_each_source
+def test_eventually_culls_parameters_which_stop_being_valid(source_class):
+    source = source_class(
         context=BuildContext(random.Random()),
         strategy=strategy(bool),
         min_tries=5
@@ -167,3 +187,60 @@ def test_eventually_culls_parameters_which_stop_being_valid():
         assert source.counts[i] == source.bad_counts[i] + 1
 
     assert len(source.valid_parameters) <= len(source.parameters) // 2
+
+
+@with_each_source
+def test_copes_with_many_parameters(source_class):
+    source = source_class(
+        context=BuildContext(random.Random(0)),
+        strategy=strategy(int),
+        min_parameters=200,
+    )
+    for x in islice(source.examples(), 1000):
+        if x < 0:
+            source.mark_bad()
+    assert len(source.parameters) >= 200
+    assert len(source.counts) == len(source.parameters)
+    assert len(source.valid_parameters) <= len(source.parameters)
+
+
+@with_each_source
+def test_is_deterministic_given_a_seed(source_class):
+    def run():
+        source = source_class(
+            context=BuildContext(random.Random(1)),
+            strategy=strategy(int),
+            min_parameters=5,
+        )
+        result = []
+        for x in islice(source.examples(), 200):
+            if x < 0:
+                source.mark_bad()
+            result.append(x)
+        return result
+    assert run() == run()
+
+
+def test_does_not_vectorize_unless_asked_to():
+    source = new_parameter_source(
+        BuildContext(random.Random()), strategy(int), min_parameters=1000)
+    assert type(source) is ParameterSource
+
+
+@pytest.mark.skipif(load_numpy() is None, reason='Requires NumPy')
+def test_only_vectorizes_large_sources():
+    small = new_parameter_source(
+        BuildContext(random.Random()), strategy(int), min_parameters=2,
+        vectorize=True)
+    assert type(small) is ParameterSource
+    large = new_parameter_source(
+        BuildContext(random.Random()), strategy(int), min_parameters=1000,
+        vectorize=True)
+    assert type(large) is VectorizedParameterSource
+
+
+def test_vectorizing_without_numpy_is_an_error(monkeypatch):
+    monkeypatch.setattr(examplesource, 'numpy_module', None)
+    with pytest.raises(InvalidArgument):
+        new_parameter_source(
+            BuildContext(random.Random()), strategy(int), vectorize=True)
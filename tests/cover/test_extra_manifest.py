@@ -0,0 +1,175 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+import os
+import sys
+import json
+
+import subprocess
+
+import pytest
+import hypothesis
+import hypothesis.extra as extra
+from hypothesis import strategy
+
+fingerprint = extra.path_fingerprint()
+
+
+def entry(name, path=()):
+    return {'name': name, 'module': name, 'attrs': [], 'path': list(path)}
+
+
+def test_round_trips_manifest(tmpdir):
+    path = str(tmpdir.join('manifest.json'))
+    entries = [entry('foo', ['/bar'])]
+    extra.write_manifest(path, fingerprint, entries)
+    assert extra.read_manifest(path, fingerprint) == entries
+
+
+def test_ignores_manifest_for_other_fingerprint(tmpdir):
+    path = str(tmpdir.join('manifest.json'))
+    extra.write_manifest(path, fingerprint, [entry('foo')])
+    assert extra.read_manifest(path, fingerprint + ['other']) is None
+
+
+def test_ignores_missing_manifest(tmpdir):
+    assert extra.read_manifest(
+        str(tmpdir.join('manifest.json')), fingerprint) is None
+
+
+@pytest.mark.parametrize('data', [
+    'not json',
+    json.dumps([]),
+    json.dumps({'fingerprint': fingerprint}),
+    json.dumps({'fingerprint': fingerprint, 'entry_points': [1]}),
+    json.dumps({'fingerprint': fingerprint, 'entry_points': [{}]}),
+    json.dumps({'fingerprint': fingerprint, 'entry_points': [
+        {'name': 'foo', 'module': 'foo', 'attrs': [], 'path': 'bar'}]}),
+])
+def test_ignores_corrupt_manifest(tmpdir, data):
+    path = tmpdir.join('manifest.json')
+    path.write(data)
+    assert extra.read_manifest(str(path), fingerprint) is None
+
+
+def test_fingerprint_changes_when_path_entries_change(tmpdir, monkeypatch):
+    monkeypatch.setattr(sys, 'path', [str(tmpdir)])
+    os.utime(str(tmpdir), (1000, 1000))
+    before = extra.path_fingerprint()
+    assert extra.path_fingerprint() == before
+    os.utime(str(tmpdir), (2000, 2000))
+    assert extra.path_fingerprint() != before
+
+
+def test_fingerprint_ignores_current_directory(tmpdir, monkeypatch):
+    monkeypatch.setattr(sys, 'path', ['', str(tmpdir)])
+    monkeypatch.chdir(str(tmpdir))
+    assert extra.path_fingerprint()[-1] == []
+
+
+def test_importing_hypothesis_does_not_touch_storage(tmpdir):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [os.path.dirname(os.path.dirname(hypothesis.__file__))] +
+        [p for p in sys.path if p]
+    )
+    env.pop('HYPOTHESIS_STORAGE_DIRECTORY', None)
+    subprocess.check_call(
+        [sys.executable, '-c', 'import hypothesis'],
+        cwd=str(tmpdir), env=env,
+    )
+    assert not tmpdir.listdir()
+
+
+extra_dir = os.path.dirname(extra.__file__)
+
+LAZY_EXTRA = '''
+def load():
+    from hypothesis import strategy
+    from lazyextra.things import Thing
+
+    @strategy.extend_static(Thing)
+    def define_thing_strategy(cls, settings):
+        return strategy(bool)
+'''
+
+
+def forget_modules():
+    for name in ('lazyextra', 'lazyextra.things', 'hypothesis.extra.things'):
+        sys.modules.pop(name, None)
+
+
+@pytest.fixture
+def lazy_extra(request, tmpdir, monkeypatch):
+    request.addfinalizer(forget_modules)
+    package = tmpdir.mkdir('lazyextra')
+    package.join('__init__.py').write(LAZY_EXTRA)
+    package.join('things.py').write('class Thing(object):\n    pass\n')
+    monkeypatch.syspath_prepend(str(tmpdir))
+    monkeypatch.setattr(extra, 'manifest', [])
+    monkeypatch.setattr(extra, 'loaded', set())
+    monkeypatch.setattr(extra, '__path__', list(extra.__path__))
+    monkeypatch.setattr(extra, 'initialized', True)
+    extra.register_entry_points([entry('lazyextra', [str(package)])])
+
+
+def test_extra_modules_are_importable_before_loading(lazy_extra):
+    from hypothesis.extra.things import Thing
+    assert Thing.__name__ == 'Thing'
+
+
+@pytest.fixture
+def unread_manifest(lazy_extra, monkeypatch):
+    registered = list(extra.manifest)
+    monkeypatch.setattr(extra, 'manifest', [])
+    monkeypatch.setattr(extra, 'initialized', False)
+    monkeypatch.setattr(
+        extra, '__path__', [p for p in extra.__path__ if p == extra_dir])
+    monkeypatch.setattr(sys, 'path_hooks', list(sys.path_hooks))
+    monkeypatch.setattr(
+        extra, 'read_manifest', lambda path, fingerprint: registered)
+    extra.install_manifest_finder()
+
+
+def test_importing_an_extra_module_reads_the_manifest(unread_manifest):
+    from hypothesis.extra.things import Thing
+    assert Thing.__name__ == 'Thing'
+    assert extra.initialized
+    assert extra.MANIFEST_PATH_ENTRY not in extra.__path__
+    assert extra.ManifestFinder.path_hook not in sys.path_hooks
+
+
+def test_only_looks_in_the_manifest_for_hypothesis_extra(unread_manifest):
+    with pytest.raises(ImportError):
+        __import__('hypothesis_no_such_module')
+    assert not extra.initialized
+
+
+def test_does_not_hook_every_import():
+    assert not any(
+        'hypothesis' in type(finder).__module__ for finder in sys.meta_path)
+
+
+def test_extras_are_loaded_on_first_unknown_specifier(lazy_extra):
+    from lazyextra.things import Thing
+    assert not extra.loaded
+    assert strategy(Thing) is strategy(bool)
+    assert len(extra.loaded) == 1
+    assert not extra.load_entry_points()
+
+
+def test_unknown_specifiers_still_error_after_loading(lazy_extra):
+    with pytest.raises(NotImplementedError):
+        strategy(object())
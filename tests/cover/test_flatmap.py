@@ -21,6 +21,7 @@ from tests.common import Bitfields
 from hypothesis.database import ExampleDatabase
 from hypothesis.specifiers import just, floats_in_range, integers_in_range
 from hypothesis.internal.debug import some_template
+from hypothesis.internal.lrucache import LRUCache
 from hypothesis.searchstrategy.narytree import Leaf, NAryTree
 from hypothesis.searchstrategy.strategies import BuildContext
 
@@ -150,3 +151,77 @@ def test_two_incompatible_unreified_templates():
     assert x.source_template != y.source_template
     assert not strat.strictly_simpler(x, y)
     assert not strat.strictly_simpler(y, x)
+
+
+def test_strategy_cache_is_bounded():
+    strat = strategy(int).flatmap(lambda n: just(n))
+    strat.strategy_cache = LRUCache(3)
+    r = Random(1)
+    templates = [some_template(strat, r) for _ in range(20)]
+    values = [strat.reify(t) for t in templates]
+    assert len(strat.strategy_cache) == 3
+    assert [strat.reify(t) for t in templates] == values
+
+
+def test_templates_outlive_their_cached_strategy():
+    r = Random(2)
+    template = some_template(OrderedPairs, r)
+    OrderedPairs.reify(template)
+    simplified = [
+        s for s in OrderedPairs.full_simplify(r, template)
+        if isinstance(s, OrderedPairs.TemplateFromTemplate)
+    ]
+    assert simplified
+    OrderedPairs.strategy_cache.clear()
+    for s in simplified:
+        x, y = OrderedPairs.reify(s)
+        assert x < y
+        OrderedPairs.from_basic(OrderedPairs.to_basic(s))
+
+
+def test_right_simplifiers_survive_eviction():
+    r = Random(3)
+    template = some_template(OrderedPairs, r)
+    OrderedPairs.reify(template)
+    simplifiers = list(OrderedPairs.simplifiers(r, template))
+    OrderedPairs.strategy_cache.clear()
+    for simplify in simplifiers:
+        for s in simplify(r, template):
+            x, y = OrderedPairs.reify(s)
+            assert x < y
+
+
+def test_can_share_expanded_strategies_between_equal_values():
+    expansions = []
+
+    def expand(n):
+        expansions.append(n)
+        return just(n)
+
+    source = strategy(int).map(lambda n: n % 3)
+    strat = source.flatmap(expand, cache_by_value=True)
+    r = Random(4)
+    for _ in range(50):
+        template = some_template(strat, r)
+        assert strat.reify(template) == source.reify(template.source_template)
+    assert sorted(expansions) == sorted(set(expansions))
+    assert strat.strategy_cache.hits > 0
+
+
+def test_caches_by_template_when_values_are_not_comparable():
+    strat = strategy([bool]).flatmap(
+        lambda xs: just(len(xs)), cache_by_value=True)
+    r = Random(6)
+    template = some_template(strat, r)
+    strat.target_strategy(template.source_template)
+    assert strat.cached_strategy(template.source_template) is not None
+    assert list(strat.simplifiers(r, template))
+
+
+def test_counts_strategy_cache_hits_and_misses():
+    strat = strategy(integers_in_range(0, 1)).flatmap(lambda n: just(n))
+    r = Random(5)
+    for _ in range(10):
+        strat.reify(some_template(strat, r))
+    assert strat.strategy_cache.misses >= 2
+    assert strat.strategy_cache.hits >= 8
@@ -0,0 +1,71 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+import pytest
+from hypothesis.internal.lrucache import LRUCache
+
+
+def test_evicts_least_recently_used_entry():
+    cache = LRUCache(2)
+    cache[1] = 'a'
+    cache[2] = 'b'
+    assert cache.get(1) == 'a'
+    cache[3] = 'c'
+    assert len(cache) == 2
+    assert 2 not in cache
+    assert 1 in cache
+    assert 3 in cache
+
+
+def test_counts_hits_and_misses():
+    cache = LRUCache(2)
+    cache[1] = 'a'
+    assert cache.get(1) == 'a'
+    assert cache.get(2) is None
+    assert cache.get(2, 'b') == 'b'
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert 'hits=1' in repr(cache)
+
+
+def test_checking_membership_does_not_count_as_use():
+    cache = LRUCache(2)
+    cache[1] = 'a'
+    cache[2] = 'b'
+    assert 1 in cache
+    cache[3] = 'c'
+    assert 1 not in cache
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_replacing_an_entry_does_not_evict_another():
+    cache = LRUCache(2)
+    cache[1] = 'a'
+    cache[2] = 'b'
+    cache[1] = 'c'
+    assert len(cache) == 2
+    assert cache.get(1) == 'c'
+    assert cache.get(2) == 'b'
+
+
+def test_clear_empties_the_cache():
+    cache = LRUCache(2)
+    cache[1] = 'a'
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_rejects_non_positive_sizes():
+    with pytest.raises(ValueError):
+        LRUCache(0)
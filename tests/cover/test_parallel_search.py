@@ -0,0 +1,244 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+import os
+import time
+from random import Random
+
+import pytest
+import hypothesis.core as core
+from hypothesis import Settings, find, given, assume, strategy
+from hypothesis.core import ShrinkPool, simplify_template_such_that
+from hypothesis.errors import AbnormalExit, NoSuchExample, \
+    Unsatisfiable, DefinitelyNoSuchExample
+from tests.common.utils import capture_out
+from hypothesis.reporting import report
+from hypothesis.internal.compat import text_type
+from hypothesis.internal.tracker import Tracker
+from hypothesis.internal.parallel import Worker, ForkedCall, as_completed
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(os, 'fork'), reason='Parallel search requires fork')
+
+parallel_settings = Settings(workers=4, max_examples=200, timeout=10)
+
+
+def test_forked_call_returns_result():
+    assert ForkedCall(lambda: os.getpid()).result() != os.getpid()
+
+
+def test_forked_call_raises_errors():
+    def boom():
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        ForkedCall(boom).result()
+
+
+def test_forked_call_raises_abnormal_exit_on_death():
+    with pytest.raises(AbnormalExit):
+        ForkedCall(lambda: os._exit(1)).result()
+
+
+def test_forked_call_relays_reports():
+    def chatty():
+        report('Hello from the other side')
+
+    with capture_out() as out:
+        ForkedCall(chatty).result()
+    assert 'Hello from the other side' in out.getvalue()
+
+
+def test_as_completed_yields_every_call():
+    calls = [ForkedCall(lambda i=i: i) for i in range(5)]
+    assert sorted(c.result() for c in as_completed(calls)) == list(range(5))
+
+
+def test_can_kill_a_running_call():
+    call = ForkedCall(lambda: time.sleep(100))
+    call.kill()
+    assert call.finished
+
+
+def test_worker_returns_results_in_order():
+    worker = Worker(lambda x: x * 2)
+    try:
+        worker.send([1, 2])
+        worker.send([3])
+        assert [worker.result() for _ in range(3)] == [2, 4, 6]
+    finally:
+        worker.close()
+
+
+def test_worker_skips_discarded_results():
+    worker = Worker(lambda x: x)
+    try:
+        worker.send([1, 2, 3])
+        assert worker.result() == 1
+        worker.discard_pending()
+        worker.send([4])
+        assert worker.result() == 4
+    finally:
+        worker.close()
+
+
+def test_worker_raises_errors_and_carries_on():
+    def invert(x):
+        return 1 // x
+
+    worker = Worker(invert)
+    try:
+        worker.send([0, 1])
+        with pytest.raises(ZeroDivisionError):
+            worker.result()
+        assert worker.result() == 1
+    finally:
+        worker.close()
+
+
+def test_worker_raises_abnormal_exit_on_death():
+    worker = Worker(lambda x: os._exit(1))
+    worker.send([1])
+    with pytest.raises(AbnormalExit):
+        worker.result()
+    assert worker.finished
+
+
+@pytest.fixture
+def eager_pool(monkeypatch):
+    monkeypatch.setattr(ShrinkPool, 'warmup_calls', 0)
+    monkeypatch.setattr(ShrinkPool, 'min_call_time', 0)
+
+
+def shrink_large_sum(settings):
+    search = strategy([int])
+
+    def condition(template):
+        return sum(search.reify(template)) >= 1000
+
+    random = Random(0)
+    template = None
+    while template is None or not condition(template):
+        template = search.draw_and_produce_from_random(random)
+    return [
+        search.reify(t) for t in simplify_template_such_that(
+            search, Random(1), template, condition, Tracker(), settings,
+            time.time(),
+        )
+    ]
+
+
+def test_shrinking_reuses_the_same_workers(eager_pool, monkeypatch):
+    started = []
+
+    class CountingWorker(Worker):
+
+        def __init__(self, function):
+            started.append(self)
+            super(CountingWorker, self).__init__(function)
+
+    monkeypatch.setattr(core, 'Worker', CountingWorker)
+    shrinks = shrink_large_sum(Settings(workers=4, timeout=-1))
+    assert shrinks[-1] == [1000]
+    assert len(started) == 4
+    assert all(w.finished for w in started)
+
+
+def test_does_not_start_workers_for_cheap_tests(monkeypatch):
+    monkeypatch.setattr(core, 'Worker', None)
+    shrinks = shrink_large_sum(Settings(workers=4, timeout=-1))
+    assert shrinks[-1] == [1000]
+
+
+def test_finds_minimal_example_with_workers():
+    assert find(
+        int, lambda x: x >= 100, settings=parallel_settings) == 100
+
+
+def test_finds_minimal_list_with_workers():
+    assert find(
+        [int], lambda xs: sum(xs) >= 10, settings=parallel_settings
+    ) == [10]
+
+
+def test_given_shrinks_failures_found_in_workers():
+    @given(int, settings=parallel_settings)
+    def test_is_small(x):
+        assert x < 10
+
+    with capture_out() as out:
+        with pytest.raises(AssertionError):
+            test_is_small()
+    assert 'test_is_small(x=10)' in out.getvalue()
+
+
+def test_passing_test_runs_in_workers():
+    @given(int, settings=parallel_settings)
+    def test_anything(x):
+        pass
+
+    test_anything()
+
+
+def test_propagates_unsatisfiable_from_workers():
+    @given(int, settings=parallel_settings)
+    def test_never_satisfied(x):
+        assume(False)
+
+    with pytest.raises(Unsatisfiable):
+        test_never_satisfied()
+
+
+def test_still_detects_exhaustion_of_small_spaces():
+    with pytest.raises(DefinitelyNoSuchExample):
+        find(bool, lambda x: False, settings=parallel_settings)
+
+
+def test_workers_share_the_max_examples_budget(tmpdir):
+    calls = str(tmpdir.join('calls'))
+
+    def never(x):
+        with open(calls, 'a') as f:
+            f.write('.')
+        return False
+
+    with pytest.raises(NoSuchExample):
+        find(int, never, settings=Settings(
+            workers=4, max_examples=100, min_satisfying_examples=0,
+        ))
+    with open(calls) as f:
+        assert len(f.read()) <= 100
+
+
+@pytest.mark.parametrize('spec', [[int], (int, [bool]), {text_type}])
+def test_parallel_shrinking_matches_serial_shrinking(spec, eager_pool):
+    search = strategy(spec)
+
+    def condition(template):
+        return len(repr(search.reify(template))) >= 10
+
+    template = None
+    random = Random(0)
+    while template is None or not condition(template):
+        template = search.draw_and_produce_from_random(random)
+
+    results = []
+    for workers in (1, 4):
+        shrinks = list(simplify_template_such_that(
+            search, Random(1), template, condition, Tracker(),
+            Settings(workers=workers, timeout=-1), time.time(),
+        ))
+        results.append(shrinks)
+    assert results[0] == results[1]
@@ -23,10 +23,12 @@ import hypothesis.specifiers as specifiers
 from hypothesis.types import RandomWithSeed
 from hypothesis.errors import NoExamples
 from hypothesis.internal.compat import hrange, text_type
+from hypothesis.searchstrategy.misc import BoolStrategy
 from hypothesis.searchstrategy.numbers import BoundedIntStrategy, \
     RandomGeometricIntStrategy
 from hypothesis.searchstrategy.strategies import BuildContext, \
-    OneOfStrategy, strategy, one_of_strategies
+    OneOfStrategy, SearchStrategy, strategy, simplicity_ranks, \
+    one_of_strategies
 
 
 def test_or_errors_when_given_non_strategy():
@@ -159,3 +161,94 @@ def test_can_map_nameless():
 def test_can_flatmap_nameless():
     assert '0x' not in repr(strategy(int).flatmap(
         nameless_const(specifiers.just(3))))
+
+
+batched_specifiers = [
+    bool, int, float, text_type, specifiers.IntegerRange(1, 10),
+    specifiers.IntegerRange(3, 3), specifiers.FloatRange(0, 1),
+    specifiers.sampled_from(('a', 'b', 'c')), specifiers.just(1),
+    (int, bool), (), SomeNamedTuple(int, text_type), [int], {bool},
+    specifiers.one_of((int, bool)), complex,
+]
+
+
+@pytest.mark.parametrize(
+    'specifier', batched_specifiers, ids=list(map(repr, batched_specifiers)))
+def test_draw_templates_produces_valid_templates(specifier):
+    strat = strategy(specifier)
+    rnd = random.Random(0)
+    for _ in hrange(20):
+        pv = strat.draw_parameter(rnd)
+        templates = strat.draw_templates(BuildContext(rnd), pv, 10)
+        assert len(templates) == 10
+        for template in templates:
+            basic = strat.to_basic(template)
+            assert strat.to_basic(strat.from_basic(basic)) == basic
+            strat.reify(template)
+        assert strat.draw_templates(BuildContext(rnd), pv, 0) == []
+
+
+def test_draw_templates_is_deterministic():
+    strat = strategy([(int, float, text_type, bool)])
+    pv = strat.draw_parameter(random.Random(1))
+    assert strat.draw_templates(BuildContext(random.Random(2)), pv, 10) == (
+        strat.draw_templates(BuildContext(random.Random(2)), pv, 10))
+
+
+def test_geometric_int_batches_match_single_draws():
+    strat = RandomGeometricIntStrategy()
+    pv = strat.draw_parameter(random.Random(1))
+    single = random.Random(2)
+    assert strat.draw_templates(BuildContext(random.Random(2)), pv, 50) == [
+        strat.draw_template(BuildContext(single), pv) for _ in hrange(50)]
+
+
+def test_draw_templates_respects_overridden_produce_template():
+    class AlwaysTrue(BoolStrategy):
+
+        def produce_template(self, context, p):
+            return True
+
+    strat = AlwaysTrue()
+    assert strat.draw_templates(BuildContext(random), 0.0, 10) == [True] * 10
+
+
+def test_simplicity_ranks_share_ranks_between_equally_simple_templates():
+    strat = RandomGeometricIntStrategy()
+    assert simplicity_ranks(strat, [3, 0, -1, 3, 1]) == [2, 0, 3, 2, 1]
+    assert simplicity_ranks(strat, []) == []
+
+
+def test_default_simplicity_key_orders_by_strictly_simpler():
+    class Lengths(SearchStrategy):
+
+        def strictly_simpler(self, x, y):
+            return len(x) < len(y)
+
+    strat = Lengths()
+    assert simplicity_ranks(strat, ['ab', 'c', 'de', '']) == [2, 1, 2, 0]
+    assert strat.simplicity_key('ab') == strat.simplicity_key('cd')
+    assert strat.simplicity_key('a') <= strat.simplicity_key('cd')
+    assert strat.simplicity_key('abc') > strat.simplicity_key('cd')
+
+
+def test_simplicity_keys_of_collections_combine_their_elements():
+    strat = strategy([(bool, specifiers.integers_in_range(0, 10))])
+    assert strat.simplicity_key(((True, 1), (False, 2))) < (
+        strat.simplicity_key(((True, 1), (True, 0)))
+    )
+    assert strat.simplicity_key(()) < strat.simplicity_key(((False, 0),))
+
+
+@pytest.mark.parametrize('x', [
+    0.5, -0.5, 1.5, 2.0, -3.0, float('inf'), float('-inf'), float('nan'),
+])
+def test_float_simplicity_is_a_total_order(x):
+    strat = strategy(float)
+    for y in (0.0, -1.5, 2.5, float('inf'), float('nan')):
+        if x is y or x == y:
+            continue
+        assert (
+            strat.strictly_simpler(x, y) or strat.strictly_simpler(y, x) or
+            (math.isnan(x) and math.isnan(y))
+        )
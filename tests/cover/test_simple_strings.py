@@ -15,8 +15,12 @@ from __future__ import division, print_function, absolute_import, \
 
 from random import Random
 
-from hypothesis import find
-from hypothesis.internal.compat import text_type
+import pytest
+from hypothesis import Settings, find, strategy
+from hypothesis.specifiers import strings, strings_in_categories
+from hypothesis.internal.debug import some_template
+from hypothesis.internal.compat import text_type, binary_type
+from hypothesis.searchstrategy.strategies import BadData
 
 
 def test_can_minimize_up_to_zero():
@@ -51,3 +55,49 @@ def test_will_find_ascii_examples_given_the_chance():
 
 def test_finds_single_element_strings():
     assert find(text_type, bool, random=Random(4)) == '0'
+
+
+def test_templates_are_strings():
+    random = Random(0)
+    for specifier, string_type in (
+        (text_type, text_type), (binary_type, binary_type),
+        (strings('abc'), text_type),
+    ):
+        assert isinstance(
+            some_template(specifier, random), string_type)
+
+
+def test_minimizes_long_strings_by_deleting_chunks():
+    s = find(text_type, lambda x: len(x) >= 30, settings=Settings(
+        average_list_length=1000.0))
+    assert s == '0' * 30
+
+
+def test_simplifies_runs_of_characters():
+    simplified = list(strategy(text_type).simplify_runs(
+        Random(0), 'ab☃☃☃c00'))
+    assert simplified == ['ab☃c00', 'ab000c00', 'ab☃☃☃c0']
+
+
+def test_minimizes_binary_strings():
+    s = find(binary_type, lambda x: len(x) >= 3)
+    assert s == b'\0\0\0'
+
+
+def test_minimizes_towards_start_of_alphabet():
+    s = find(strings('abc'), lambda x: len(x) >= 2 and 'c' in x)
+    assert sorted(s) == ['a', 'c']
+
+
+def test_reads_strings_saved_as_lists_of_characters():
+    assert strategy(text_type).from_basic(['a', '☃']) == 'a☃'
+
+
+def test_rejects_characters_outside_alphabet():
+    with pytest.raises(BadData):
+        strategy(strings('ab')).from_basic('abc')
+
+
+def test_minimizes_towards_start_of_categories():
+    assert find(strings_in_categories(['Lu']), bool) == 'A'
+    assert find(strings_in_categories(['Sm']), bool) == '<'
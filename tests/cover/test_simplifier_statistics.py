@@ -0,0 +1,111 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+from random import Random
+
+import pytest
+from hypothesis import Settings, find, given
+from hypothesis.core import load_simplifier_statistics
+from hypothesis.errors import BadData
+from hypothesis.database import ExampleDatabase
+from hypothesis.internal.simplifierstats import SimplifierStatistics
+
+adaptive = Settings(adaptive_simplification=True)
+
+
+def named(name):
+    def simplify(random, template):
+        return iter(())
+    simplify.__name__ = str(name)
+    return simplify
+
+
+def test_unknown_passes_run_first_in_original_order():
+    stats = SimplifierStatistics()
+    stats.record('b', calls=10, successes=10)
+    passes = [named('a'), named('b'), named('c')]
+    ordered = stats.order(Random(0), passes)
+    assert [p.__name__ for p in ordered] == ['a', 'c', 'b']
+
+
+def test_prefers_passes_with_better_payoff():
+    stats = SimplifierStatistics()
+    stats.record('bad', calls=1000, successes=0)
+    stats.record('good', calls=1000, successes=900)
+    ordered = stats.order(Random(0), [named('bad'), named('good')])
+    assert [p.__name__ for p in ordered] == ['good', 'bad']
+
+
+def test_accumulates_records():
+    stats = SimplifierStatistics()
+    stats.record('a', calls=3, successes=1)
+    stats.record('a', calls=1, successes=1)
+    assert stats.success_rate('a') == 0.5
+    assert stats.success_rate('b') is None
+
+
+def test_round_trips_through_basic_data():
+    stats = SimplifierStatistics()
+    stats.record('a', calls=3, successes=1)
+    stats.record('b', calls=5, successes=0)
+    copy = SimplifierStatistics()
+    copy.merge_basic(stats.to_basic())
+    assert copy.calls == stats.calls
+    assert copy.successes == stats.successes
+
+
+def test_only_persists_most_used_passes():
+    stats = SimplifierStatistics(max_persisted=2)
+    for i in range(5):
+        stats.record('pass%d' % (i,), calls=i, successes=0)
+    assert [n for n, _, _ in stats.to_basic()] == ['pass4', 'pass3']
+
+
+@pytest.mark.parametrize('data', [
+    None, [1], [['a', 1]], [['a', 1, 2]], [[1, 1, 1]], [['a', 'b', 0]],
+])
+def test_rejects_bad_data(data):
+    with pytest.raises(BadData):
+        SimplifierStatistics().merge_basic(data)
+
+
+def test_finds_minimal_examples_adaptively():
+    assert find([int], lambda xs: sum(xs) >= 10, settings=adaptive) == [10]
+
+
+def test_ignores_corrupt_saved_statistics():
+    db = ExampleDatabase()
+    storage = db.storage_for(int)
+    storage.save_metadata('simplifier-statistics', 'nonsense')
+    assert len(load_simplifier_statistics(storage)) == 0
+
+
+def test_persists_statistics_in_database():
+    db = ExampleDatabase()
+    settings = Settings(adaptive_simplification=True, database=db)
+
+    @given([int], settings=settings)
+    def test_sums_are_small(xs):
+        assert sum(xs) < 10
+
+    with pytest.raises(AssertionError):
+        test_sums_are_small()
+
+    # given keys its specifier by the argument names, which are native
+    # strings even on Python 2.
+    storage = db.storage_for(((), {str('xs'): [int]}))
+    stats = load_simplifier_statistics(storage)
+    assert len(stats) > 0
+    assert sum(stats.successes.values()) > 0
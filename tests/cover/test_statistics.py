@@ -0,0 +1,136 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+import json
+
+import pytest
+from hypothesis import Settings, find, given, assume
+from hypothesis.statistics import PhaseTimings, RunStatistics, \
+    StatisticsCollector, collect_statistics, new_run_statistics
+
+settings = Settings(max_examples=50, database=None)
+
+
+def test_nothing_is_collected_without_a_collector():
+    stats = new_run_statistics('foo')
+    stats.record('test', 1.0)
+    assert not stats.phases
+
+
+def test_collects_one_run_per_given_call():
+    @given(int, settings=settings)
+    def test_ints(x):
+        pass
+
+    with collect_statistics() as collector:
+        test_ints()
+        test_ints()
+    assert len(collector.runs) == 2
+    run = collector.runs[0]
+    assert run.name.endswith('test_ints')
+    assert run.examples > 0
+    for phase in ('produce_parameter', 'produce_template', 'track', 'reify',
+                  'test'):
+        assert run.phases[phase].count > 0
+    assert run.phases['test'].count == run.examples
+
+
+def test_records_assumption_rejections():
+    @given(int, settings=settings)
+    def test_positive(x):
+        assume(x > 0)
+
+    with collect_statistics() as collector:
+        test_positive()
+    run = collector.runs[0]
+    assert 0 < run.rejected < run.examples
+    assert 0 < run.rejection_rate < 1
+
+
+def test_records_duplicates():
+    with collect_statistics() as collector:
+        with pytest.raises(Exception):
+            find([bool], lambda x: False, settings=Settings(
+                max_examples=200, min_satisfying_examples=0))
+    assert collector.runs[0].duplicates > 0
+    assert 0 < collector.runs[0].duplicate_rate < 1
+
+
+def test_records_shrinking():
+    with collect_statistics() as collector:
+        assert find([int], lambda xs: sum(xs) >= 10) == [10]
+    run = collector.runs[0]
+    assert run.phases['shrink'].count == 1
+    assert run.successful_shrinks > 0
+    assert run.calls_per_shrink >= 1
+
+
+def test_calls_per_shrink_is_none_without_shrinks():
+    assert RunStatistics('foo').calls_per_shrink is None
+
+
+def test_rates_are_zero_without_examples():
+    stats = RunStatistics('foo')
+    assert stats.rejection_rate == 0
+    assert stats.duplicate_rate == 0
+
+
+def test_percentiles():
+    timings = PhaseTimings()
+    assert timings.percentile(50) == 0.0
+    assert timings.mean == 0.0
+    for i in range(1, 101):
+        timings.record(float(i))
+    assert timings.percentile(50) == 50.0
+    assert timings.percentile(99) == 99.0
+    assert timings.percentile(0) == 1.0
+    assert timings.mean == 50.5
+    assert timings.as_basic()['max'] == 100.0
+    assert timings.as_basic()['min'] == 1.0
+
+
+def test_keeps_a_bounded_sample_of_durations():
+    timings = PhaseTimings()
+    n = PhaseTimings.max_samples * 3
+    for i in range(n):
+        timings.record(float(i))
+    assert len(timings.samples) == PhaseTimings.max_samples
+    assert timings.count == n
+    assert timings.total == sum(range(n))
+    assert (timings.min, timings.max) == (0.0, n - 1.0)
+    assert n * 0.4 <= timings.percentile(50) <= n * 0.6
+
+
+def test_can_use_an_existing_collector():
+    collector = StatisticsCollector()
+    with collect_statistics(collector):
+        find(int, lambda x: x >= 5)
+    with collect_statistics(collector):
+        find(int, lambda x: x >= 5)
+    assert len(collector.runs) == 2
+    assert 'lambda x: x >= 5' in collector.runs[0].name
+
+
+def test_dumps_as_json(tmpdir):
+    with collect_statistics() as collector:
+        find(int, lambda x: x >= 5)
+    path = str(tmpdir.join('statistics.json'))
+    with open(path, 'w') as f:
+        collector.dump(f)
+    with open(path) as f:
+        data = json.load(f)
+    assert data == json.loads(collector.to_json())
+    assert data[0]['phases']['shrink']['count'] == 1
+    assert data[0]['examples'] == collector.runs[0].examples
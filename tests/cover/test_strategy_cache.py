@@ -0,0 +1,85 @@
+# coding=utf-8
+
+# Copyright (C) 2013-2015 David R. MacIver (david@drmaciver.com)
+
+# This file is part of Hypothesis (https://github.com/DRMacIver/hypothesis)
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+# END HEADER
+
+from __future__ import division, print_function, absolute_import, \
+    unicode_literals
+
+from hypothesis import Settings, strategy
+from hypothesis.specifiers import just, sampled_from
+from hypothesis.searchstrategy.strategies import SearchStrategy, \
+    StrategyExtMethod
+
+
+def test_reuses_strategies_for_equal_specifiers():
+    assert strategy([(int, {bool})]) is strategy([(int, {bool})])
+
+
+def test_shares_strategies_for_sub_specifiers():
+    assert strategy((int, [bool])).element_strategies[1] is \
+        strategy([bool])
+
+
+def test_distinguishes_specifiers_that_compare_equal():
+    assert strategy(just(1)) is not strategy(just(True))
+    assert strategy(just(1)) is not strategy(just(1.0))
+    assert strategy(just(0.0)) is not strategy(just(-0.0))
+    assert strategy([int]) is not strategy((int,))
+
+
+def test_does_not_share_mutable_values():
+    x = []
+    y = []
+    assert strategy(just(x)).example() is x
+    assert strategy(just(y)).example() is y
+    assert strategy(sampled_from([x])).example() is x
+    assert strategy(sampled_from([y])).example() is y
+
+
+def test_keys_on_relevant_settings():
+    assert strategy([int], Settings(average_list_length=2)) is not \
+        strategy([int], Settings(average_list_length=3))
+    assert strategy([int], Settings(max_examples=2)) is \
+        strategy([int], Settings(max_examples=3))
+
+
+class Foo(object):
+    pass
+
+
+def test_new_definitions_invalidate_the_cache():
+    build = StrategyExtMethod()
+
+    @build.extend(object)
+    def first(specifier, settings):
+        return strategy(int)
+
+    foo = Foo()
+    assert build(foo) is strategy(int)
+
+    @build.extend(Foo)
+    def second(specifier, settings):
+        return strategy(bool)
+
+    assert build(foo) is strategy(bool)
+
+
+def test_cache_size_is_bounded():
+    build = StrategyExtMethod()
+    build.max_cache_size = 10
+
+    @build.extend(int)
+    def define(specifier, settings):
+        return strategy(bool)
+
+    for i in range(100):
+        assert isinstance(build(i), SearchStrategy)
+    assert len(build.cache) <= 10
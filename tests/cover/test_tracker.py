@@ -13,7 +13,11 @@
 from __future__ import division, print_function, absolute_import, \
     unicode_literals
 
-from hypothesis.internal.tracker import Tracker
+import hypothesis.core as core
+from hypothesis import Settings, find
+from hypothesis.internal.compat import hrange
+from hypothesis.internal.tracker import Tracker, BloomFilter, \
+    object_to_tracking_key
 
 
 class Foo(object):
@@ -80,3 +84,105 @@ def test_track_complex_with_nan():
     assert t.track(complex(0, nan)) == 2
     assert t.track(complex(nan, nan)) == 1
     assert t.track(complex(nan, nan)) == 2
+
+
+def test_distinguishes_bools_from_ints():
+    t = Tracker()
+    assert t.track([1]) == 1
+    assert t.track([True]) == 1
+    assert t.track(1) == 1
+    assert t.track(True) == 1
+
+
+def test_distinguishes_large_structures():
+    t = Tracker()
+    xs = list(hrange(1000))
+    assert t.track(xs) == 1
+    assert t.track(list(xs)) == 2
+    xs[500] = -1
+    assert t.track(xs) == 1
+
+
+def test_large_structures_have_compact_keys():
+    assert len(object_to_tracking_key(list(hrange(10000)))) == 20
+
+
+def test_small_ints_are_their_own_key():
+    assert object_to_tracking_key(7) == 7
+    assert object_to_tracking_key(2 ** 100) != 2 ** 100
+
+
+def test_contains_does_not_track():
+    t = Tracker()
+    assert [1] not in t
+    t.track([1])
+    assert [1] in t
+    assert len(t) == 1
+
+
+def test_switches_to_a_filter_after_max_exact_size():
+    t = Tracker(max_exact_size=10, capacity=1000)
+    for i in hrange(10):
+        assert t.track([i]) == 1
+    assert t.exact
+    assert t.track([10]) == 1
+    assert not t.exact
+    assert not t.contents
+    for i in hrange(11):
+        assert [i] in t
+        assert t.track([i]) == 2
+    assert len(t) == 11
+
+
+def test_adds_bigger_filters_as_each_fills_up():
+    t = Tracker(max_exact_size=10, capacity=20)
+    for i in hrange(200):
+        t.track([i])
+    assert len(t.filters) == 4
+    assert [f.capacity for f in t.filters] == [20, 40, 80, 160]
+    assert t.filters[-1].false_positive_rate < t.false_positive_rate
+    for i in hrange(200):
+        assert t.track([i]) == 2
+
+
+def test_is_exact_by_default():
+    t = Tracker()
+    for i in hrange(1000):
+        t.track(i)
+    assert t.exact
+
+
+def test_bloom_filter_has_no_false_negatives():
+    f = BloomFilter(capacity=1000, false_positive_rate=0.01)
+    digests = [object_to_tracking_key(['x', i]) for i in hrange(1000)]
+    for d in digests:
+        f.add(d)
+    for d in digests:
+        assert d in f
+
+
+def test_bloom_filter_false_positive_rate_is_bounded():
+    f = BloomFilter(capacity=1000, false_positive_rate=0.01)
+    for i in hrange(1000):
+        f.add(object_to_tracking_key(['x', i]))
+    false_positives = sum(
+        object_to_tracking_key(['y', i]) in f for i in hrange(10000))
+    assert false_positives < 300
+
+
+def test_find_switches_to_a_filter_after_max_exact_tracking(monkeypatch):
+    trackers = []
+
+    class RecordingTracker(Tracker):
+
+        def __init__(self, *args, **kwargs):
+            super(RecordingTracker, self).__init__(*args, **kwargs)
+            trackers.append(self)
+
+    monkeypatch.setattr(core, 'Tracker', RecordingTracker)
+    assert find(
+        [bool], lambda xs: len(xs) >= 3,
+        settings=Settings(max_exact_tracking=5),
+    ) == [False] * 3
+    assert trackers[0].max_exact_size == 5
+    assert not trackers[0].exact
@@ -24,7 +24,7 @@ from tests.common.basic import Bitfields, BoringBitfields, \
 from hypothesis.stateful import StateMachineSearchStrategy
 from hypothesis.specifiers import just, one_of, strings, streaming, \
     dictionary, sampled_from, integers_from, floats_in_range, \
-    integers_in_range
+    integers_in_range, strings_in_categories
 from tests.common.specifiers import Descriptor
 from hypothesis.strategytests import TemplatesFor, mutate_basic, \
     strategy_test_suite
@@ -67,6 +67,8 @@ TestEmptyString = strategy_test_suite(strings(alphabet=''))
 TestSingleString = strategy_test_suite(strategy(
     strings(alphabet='a'), Settings(average_list_length=10.0)))
 TestManyString = strategy_test_suite(strings(alphabet='abcdef☃'))
+TestCategoryString = strategy_test_suite(
+    strings_in_categories(['Lu', 'Sm']))
 
 Stuff = namedtuple('Stuff', ('a', 'b'))
 TestNamedTuple = strategy_test_suite(Stuff(int, int))